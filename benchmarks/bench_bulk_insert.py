@@ -0,0 +1,72 @@
+# benchmarks/bench_bulk_insert.py
+"""
+题目入库基准测试：逐行 create_question (add+commit+refresh) 对比 bulk_create_questions。
+
+默认连接 .env 中的 DATABASE_URL，测试数据挂在一个临时知识源下，结束后会被删除。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_bulk_insert --rows 10000
+    python -m benchmarks.bench_bulk_insert --rows 10000 --url sqlite:///bench.db
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.tutor_app.core.config import settings
+from src.tutor_app.db.models import Base, KnowledgeSource
+from src.tutor_app.crud.crud_question import (
+    create_question, bulk_create_questions, count_questions_by_source, delete_source_and_related_data
+)
+
+
+def make_question(i: int) -> dict:
+    return {
+        "question_type": "单项选择题",
+        "content": {"question": f"基准测试题目 {i}", "options": ["A. 1", "B. 2", "C. 3", "D. 4"]},
+        "answer": {"correct_option_index": i % 4},
+        "analysis": "基准测试生成的题目。",
+        "knowledge_tag": f"标签{i % 50}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    questions = [make_question(i) for i in range(args.rows)]
+
+    db = Session()
+    source = KnowledgeSource(filename=f"__bench_bulk_insert_{time.time()}", status="completed")
+    db.add(source)
+    db.commit()
+    source_id = source.id
+    try:
+        start = time.perf_counter()
+        for q in questions:
+            create_question(db, source_id, q)
+        per_row = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_ids = bulk_create_questions(db, source_id, questions)
+        bulk = time.perf_counter() - start
+
+        assert len(new_ids) == args.rows
+        assert count_questions_by_source(db, source_id) == 2 * args.rows
+        print(f"rows={args.rows} url={engine.url.render_as_string(hide_password=True)}")
+        print(f"create_question 逐行提交: {per_row:.2f}s ({args.rows / per_row:.0f} 行/秒)")
+        print(f"bulk_create_questions:    {bulk:.2f}s ({args.rows / bulk:.0f} 行/秒)")
+        print(f"加速比: {per_row / bulk:.1f}x")
+    finally:
+        delete_source_and_related_data(db, source_id)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
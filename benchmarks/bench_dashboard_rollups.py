@@ -0,0 +1,180 @@
+# benchmarks/bench_dashboard_rollups.py
+"""
+看板统计基准测试：对比逐条扫描 practice_logs（旧实现）与读按日汇总表 practice_daily_rollup 的耗时，
+并逐项核对两者结果完全一致。
+
+数据灌入方式与 bench_sampling 相同（PostgreSQL generate_series，挂在临时知识源下，结束后删除）。
+灌数后用 rebuild_practice_rollups 重建汇总表并计时；随后再通过 create_practice_log 写入若干条练习记录，
+确认增量累加后的汇总仍与原始数据一致。
+
+用法（在项目根目录执行，需先 python init_db.py 建表）:
+    python -m benchmarks.bench_dashboard_rollups --questions 1000000 --logs 10000000
+    python -m benchmarks.bench_dashboard_rollups --source-id 3     # 复用 bench_sampling --keep 保留的数据
+"""
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+import pandas as pd
+from sqlalchemy import Integer, create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_sampling import populate
+from src.tutor_app.analytics import dashboard_data
+from src.tutor_app.core.config import settings
+from src.tutor_app.crud import crud_question
+from src.tutor_app.crud.crud_question import delete_source_and_related_data, rebuild_practice_rollups
+from src.tutor_app.db.migrate import run_migrations
+from src.tutor_app.db.models import Base, KnowledgeSource, PracticeLog, Question
+
+
+# --- 旧实现（按原样保留，用于对比） ---
+
+def _legacy_filters(query, start_date, end_date):
+    if start_date:
+        query = query.filter(PracticeLog.timestamp >= start_date)
+    if end_date:
+        query = query.filter(PracticeLog.timestamp < end_date + datetime.timedelta(days=1))
+    return query
+
+def legacy_practice_summary(db, source_ids=None, start_date=None, end_date=None):
+    query = db.query(PracticeLog)
+    if source_ids:
+        query = query.join(Question, PracticeLog.question_id == Question.id).filter(Question.source_id.in_(source_ids))
+    query = _legacy_filters(query, start_date, end_date)
+    total_practices = query.count()
+    correct_practices = query.filter(PracticeLog.is_correct == True).count()
+    accuracy = (correct_practices / total_practices * 100) if total_practices > 0 else 0
+    return {"total": total_practices, "correct": correct_practices, "accuracy": round(accuracy, 2)}
+
+def legacy_performance_by_source(db, source_ids=None, start_date=None, end_date=None):
+    query = db.query(
+        KnowledgeSource.filename,
+        func.count(PracticeLog.id).label('total'),
+        func.sum(func.cast(PracticeLog.is_correct, Integer)).label('correct')
+    ).join(Question, Question.source_id == KnowledgeSource.id)\
+     .join(PracticeLog, PracticeLog.question_id == Question.id)
+    if source_ids:
+        query = query.filter(KnowledgeSource.id.in_(source_ids))
+    results = _legacy_filters(query, start_date, end_date).group_by(KnowledgeSource.filename).all()
+    if not results: return pd.DataFrame()
+    df = pd.DataFrame(results, columns=['知识源', '练习次数', '正确次数'])
+    df['正确率'] = (df['正确次数'] / df['练习次数'] * 100).round(2)
+    return df
+
+def legacy_performance_by_tag(db, source_ids=None, start_date=None, end_date=None):
+    query = db.query(
+        Question.knowledge_tag,
+        func.count(PracticeLog.id).label('total'),
+        func.sum(func.cast(PracticeLog.is_correct, Integer)).label('correct')
+    ).join(PracticeLog, PracticeLog.question_id == Question.id)
+    if source_ids:
+        query = query.filter(Question.source_id.in_(source_ids))
+    query = _legacy_filters(query, start_date, end_date)
+    query = query.filter(Question.knowledge_tag.isnot(None)).filter(Question.knowledge_tag != '')
+    results = query.group_by(Question.knowledge_tag).all()
+    if not results: return pd.DataFrame()
+    df = pd.DataFrame(results, columns=['知识点', '练习次数', '正确次数'])
+    df['正确率'] = (df['正确次数'] / df['练习次数'] * 100).round(2)
+    return df
+
+
+def same_result(a, b) -> bool:
+    if isinstance(a, pd.DataFrame):
+        if a.empty or b.empty:
+            return a.empty and b.empty
+        key = a.columns[0]
+        a = a.sort_values(key).reset_index(drop=True).astype({a.columns[1]: "int64", a.columns[2]: "int64"})
+        b = b.sort_values(key).reset_index(drop=True).astype({b.columns[1]: "int64", b.columns[2]: "int64"})
+        return a.equals(b)
+    return a == b
+
+
+def median_seconds(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=1_000_000)
+    parser.add_argument("--logs", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--source-id", type=int, default=None)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("该基准测试使用 generate_series 灌数据，需要 PostgreSQL。")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    db = Session()
+
+    source_id = args.source_id
+    if source_id is None:
+        source = KnowledgeSource(filename=f"__bench_rollups_{time.time()}", status="completed")
+        db.add(source)
+        db.commit()
+        source_id = source.id
+    try:
+        if args.source_id is None:
+            populate(db, source_id, args.questions, args.logs)
+        start = time.perf_counter()
+        rows = rebuild_practice_rollups(db)
+        db.execute(text("ANALYZE practice_daily_rollup"))
+        db.commit()
+        print(f"practice_logs={db.query(PracticeLog).count()}，重建汇总表 {rows} 行，用时 {time.perf_counter() - start:.1f}s")
+
+        # 增量路径：再写入一些练习记录，汇总随之累加
+        question_ids = [qid for (qid,) in db.query(Question.id).filter(Question.source_id == source_id).limit(1000)]
+        for _ in range(200):
+            crud_question.create_practice_log(db, random.choice(question_ids), "bench", random.random() > 0.3)
+
+        today = datetime.date.today()
+        filters = [
+            ("全部", {}),
+            ("今天", {"start_date": today, "end_date": today}),
+            ("近30天", {"start_date": today - datetime.timedelta(days=30), "end_date": today}),
+            ("指定知识源 近90天", {"source_ids": [source_id], "start_date": today - datetime.timedelta(days=90)}),
+        ]
+        functions = [
+            ("总览", legacy_practice_summary, dashboard_data.get_practice_summary),
+            ("按知识源", legacy_performance_by_source, dashboard_data.get_performance_by_source),
+            ("按知识点", legacy_performance_by_tag, dashboard_data.get_performance_by_tag),
+        ]
+        print(f"{'统计':<8}{'筛选':<16}{'旧实现(ms)':>12}{'汇总表(ms)':>12}{'加速比':>10}  结果一致")
+        all_same = True
+        for func_name, legacy, rollup in functions:
+            for filter_name, kwargs in filters:
+                same = same_result(legacy(db, **kwargs), rollup(db, **kwargs))
+                all_same &= same
+                old = median_seconds(lambda: legacy(db, **kwargs), args.repeat)
+                new = median_seconds(lambda: rollup(db, **kwargs), args.repeat)
+                print(f"{func_name:<8}{filter_name:<16}{old * 1000:>12.1f}{new * 1000:>12.1f}{old / new:>9.0f}x  {'是' if same else '否'}")
+        if not all_same:
+            raise SystemExit("汇总表结果与逐条统计不一致！")
+    finally:
+        if args.keep or args.source_id is not None:
+            print(f"测试数据已保留，source_id={source_id}")
+            db.close()
+        else:
+            print("清理测试数据...")
+            db.rollback()
+            db.execute(text("DELETE FROM user_question_stats WHERE question_id IN (SELECT id FROM questions WHERE source_id = :s)"),
+                       {"s": source_id})
+            db.commit()
+            delete_source_and_related_data(db, source_id)
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
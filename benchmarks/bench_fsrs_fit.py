@@ -0,0 +1,123 @@
+# benchmarks/bench_fsrs_fit.py
+"""
+FSRS 调度器基准测试。
+
+1. 一致性：随机练习历史分别用 FSRSScheduler.replay 批量重放和逐条调用 FSRSScheduler.review，逐题比较结果。
+2. 拟合：用一组已知的“真实”参数模拟 --questions 道题、每题 --reviews 次复习（间隔随机，
+   是否记住按真实参数算出的回忆概率抽样），再从默认参数出发拟合，报告对数损失的改善和耗时。
+   真实参数下的损失是能达到的下限。
+3. （可选 --db）在数据库已有的练习记录上拟合（没有 quality 的记录按对错推断），不保存结果。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_fsrs_fit --questions 200000 --reviews 10
+    python -m benchmarks.bench_fsrs_fit --db
+"""
+import argparse
+import datetime
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.tutor_app.core import fsrs
+from src.tutor_app.core.config import settings
+from src.tutor_app.core.schedulers import FSRSScheduler
+from src.tutor_app.core.srs_replay import group_history
+from src.tutor_app.crud.crud_question import load_srs_history
+
+EPOCH = datetime.date(1970, 1, 1)
+# 模拟用的“真实”参数：与默认参数明显不同（记得更牢、遗忘后掉得更多）
+TRUE_PARAMETERS = [1.0, 2.0, 5.0, 12.0, 5.5, 1.2, 0.6, 0.05, 1.7, 0.2, 1.1, 1.6, 0.08, 0.25, 1.6, 0.4, 2.2]
+# FSRS 评分 1-4 对应写入练习记录的 quality
+RATING_TO_QUALITY = np.array([0, 1, 3, 4, 5])
+
+
+def simulate_history(rng, questions: int, reviews: int, parameters):
+    """每道题复习 reviews 次，间隔 1-60 天随机；答对时按 3:6:1 取“模糊/掌握/简单”。"""
+    w = list(parameters)
+    qids = np.repeat(np.arange(1, questions + 1), reviews).reshape(questions, reviews)
+    days = np.empty((questions, reviews), dtype=np.int64)
+    ratings = np.empty((questions, reviews), dtype=np.int64)
+
+    days[:, 0] = 19000 + rng.integers(0, 365, questions)
+    ratings[:, 0] = rng.choice([1, 2, 3, 4], questions, p=[0.3, 0.2, 0.4, 0.1])
+    stability, difficulty = fsrs.initial_state(w, ratings[:, 0])
+    for k in range(1, reviews):
+        elapsed = rng.integers(1, 61, questions)
+        days[:, k] = days[:, k - 1] + elapsed
+        recalled = rng.random(questions) < fsrs.retrievability(elapsed, stability)
+        ratings[:, k] = np.where(recalled, rng.choice([2, 3, 4], questions, p=[0.3, 0.6, 0.1]), 1)
+        stability, difficulty, _ = fsrs.next_state(w, stability, difficulty, ratings[:, k], elapsed)
+
+    # 按日期排序，不同题目的记录交错在一起，与数据库读出的顺序相同
+    order = np.argsort(days.ravel(), kind="stable")
+    return qids.ravel()[order], RATING_TO_QUALITY[ratings.ravel()[order]], days.ravel()[order]
+
+
+def check_consistency(rng, questions: int) -> bool:
+    question_ids, qualities, days = simulate_history(rng, questions, 8, fsrs.DEFAULT_PARAMETERS)
+    scheduler = FSRSScheduler()
+    columns = scheduler.replay(question_ids, qualities, days)
+
+    reference = {}
+    for qid, quality, day in zip(question_ids.tolist(), qualities.tolist(), days.tolist()):
+        stats = reference.setdefault(qid, SimpleNamespace(repetitions=0, stability=None, difficulty=None,
+                                                          last_review_date=None, next_review_date=None, interval=0))
+        scheduler.review(stats, quality, EPOCH + datetime.timedelta(days=day))
+
+    mismatches = 0
+    for i, qid in enumerate(columns["question_id"]):
+        stats = reference[qid]
+        same = (stats.repetitions == columns["repetitions"][i] and stats.interval == columns["interval"][i]
+                and stats.next_review_date == columns["next_review_date"][i]
+                and np.isclose(stats.stability, columns["stability"][i], rtol=1e-9)
+                and np.isclose(stats.difficulty, columns["difficulty"][i], rtol=1e-9))
+        mismatches += not same
+    print(f"一致性: {len(question_ids)} 条记录 / {len(columns['question_id'])} 道题，不一致 {mismatches} 道")
+    return mismatches == 0
+
+
+def report_fit(label: str, history, iterations: int, true_parameters=None):
+    result = fsrs.fit_fsrs(*history, iterations=iterations)
+    line = (f"{label}: {result.reviews} 次复习，{result.iterations} 轮用时 {result.seconds:.1f}s，"
+            f"对数损失 默认参数 {result.baseline_log_loss:.4f} -> 拟合 {result.log_loss:.4f}")
+    if true_parameters is not None:
+        batches = [group_history(*history)]
+        true_loss, _ = fsrs.log_loss(batches, np.asarray([true_parameters], dtype=np.float64))
+        line += f"（真实参数 {true_loss[0]:.4f}）"
+    print(line)
+    print(f"  拟合参数: {result.parameters}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=200_000)
+    parser.add_argument("--reviews", type=int, default=10, help="模拟时每道题的复习次数")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--db", action="store_true", help="在数据库已有的练习记录上拟合（不保存）")
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if not check_consistency(rng, 5_000):
+        raise SystemExit("FSRS 批量重放结果与逐条调度不一致！")
+
+    history = simulate_history(rng, args.questions, args.reviews, TRUE_PARAMETERS)
+    report_fit("模拟数据", history, args.iterations, TRUE_PARAMETERS)
+
+    if args.db:
+        engine = create_engine(args.url)
+        db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+        try:
+            start = time.perf_counter()
+            history = load_srs_history(db, infer_missing_quality=True)
+            print(f"数据库: 读出 {len(history[0])} 条记录 {time.perf_counter() - start:.1f}s")
+            report_fit("数据库", history, args.iterations)
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_generation_concurrency.py
+"""
+出题执行引擎基准测试：对比串行调用与 GenerationExecutor 并发调用的吞吐。
+
+本地启动一个模拟Ollama的HTTP服务（/api/chat），它有固定数量的“GPU并行槽位”，
+超出槽位的请求会排队，从而让自适应并发限制器能观测到真实的排队延迟。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_generation_concurrency --jobs 24 --latency 0.5 --slots 4
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_ollama import ChatOllama
+
+from src.tutor_app.tasks.executor import AdaptiveConcurrencyLimiter, GenerationExecutor
+
+FAKE_QUESTION = {
+    "question_type": "判断题",
+    "content": {"question": "Alembic是Django框架自带的数据库迁移工具。"},
+    "answer": {"correct_answer": False},
+    "analysis": "Alembic是SQLAlchemy的官方工具。",
+    "knowledge_tag": "Alembic数据库迁移",
+}
+
+
+def make_handler(latency: float, slots: threading.Semaphore):
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            with slots:  # 模拟GPU并行槽位，超出部分排队
+                time.sleep(latency)
+            chunk = {
+                "model": body.get("model", "fake"),
+                "created_at": "2025-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": json.dumps(FAKE_QUESTION, ensure_ascii=False)},
+                "done": True,
+                "done_reason": "stop",
+            }
+            payload = (json.dumps(chunk, ensure_ascii=False) + "\n").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return FakeOllamaHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.5, help="单个请求在模拟GPU上的耗时(秒)")
+    parser.add_argument("--slots", type=int, default=4, help="模拟Ollama的 OLLAMA_NUM_PARALLEL")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency, threading.Semaphore(args.slots)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    llm = ChatOllama(base_url=base_url, model="fake")
+
+    def job(_):
+        return llm.invoke("请生成一道“判断题”题目。").content
+
+    llm.invoke("warmup")
+
+    start = time.perf_counter()
+    for i in range(args.jobs):
+        job(i)
+    sequential = time.perf_counter() - start
+
+    limiter = AdaptiveConcurrencyLimiter(min_limit=1, max_limit=args.max_concurrency, initial_limit=2)
+    executor = GenerationExecutor(limiter)
+    start = time.perf_counter()
+    outcomes = list(executor.run(job, range(args.jobs)))
+    concurrent = time.perf_counter() - start
+    server.shutdown()
+
+    errors = sum(1 for o in outcomes if o.error is not None)
+    print(f"jobs={args.jobs} latency={args.latency}s slots={args.slots}")
+    print(f"串行 (旧gevent未打补丁时的实际行为): {sequential:.2f}s, {args.jobs / sequential * 60:.1f} 题/分钟")
+    print(f"GenerationExecutor 自适应并发:       {concurrent:.2f}s, {args.jobs / concurrent * 60:.1f} 题/分钟, errors={errors}")
+    print(f"加速比: {sequential / concurrent:.2f}x, 限制器状态: {limiter.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_json_repair.py
+"""
+JSON修复基准测试：在一份语料上对比旧的三级解析（提取 + 标准解析 + 移除结尾逗号，失败即调用LLM修复）
+与加入本地修复引擎后的新流程。
+
+默认语料 benchmarks/data/json_repair_corpus_synthetic.jsonl 是手写的合成样本，不是采集到的模型输出：
+按qwen3常见的出错类型（<think>前缀、全角标点、单引号、Python字面量、未转义引号、
+字符串内原始换行、结尾逗号、输出截断以及组合错误）每类构造几条。它只能说明每类错误能否被本地修复，
+得到的修复率和LLM调用次数不代表生产环境；要衡量真实效果，把采集到的模型原始输出整理成同样格式
+（每行 {"category", "raw", "expected"}，无法修复的样本 expected 为 null），用 --corpus 指定。
+基准测试不会真正调用大模型，第五级AI修复被替换为计数器，用来统计仍需LLM兜底的次数。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_json_repair
+    python -m benchmarks.bench_json_repair --repeat 1000 --verbose
+    python -m benchmarks.bench_json_repair --corpus captured_outputs.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from collections import defaultdict
+
+from src.tutor_app.core.metrics import get_hit_rates
+from src.tutor_app.rag import json_parser
+from src.tutor_app.rag.json_repair import repair_json_locally
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "json_repair_corpus_synthetic.jsonl")
+
+
+def legacy_parse(text: str):
+    """旧版第一到第三级，返回None表示会进入LLM修复。"""
+    json_string = json_parser.extract_json_from_text(text)
+    if not json_string:
+        return None
+    for candidate in (json_string, json_parser.remove_trailing_commas(json_string)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--repeat", type=int, default=200, help="计时时每条样本重复解析的次数")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    if os.path.abspath(args.corpus) == os.path.abspath(CORPUS_PATH):
+        print("注意：使用内置的合成语料（手写样本），以下数字只反映各类错误的覆盖情况，不代表生产环境的修复率。\n")
+
+    llm_calls = []
+    json_parser.repair_json_with_llm = lambda broken: llm_calls.append(broken) or ""
+
+    by_category = defaultdict(lambda: {"total": 0, "legacy": 0, "new": 0, "wrong": 0})
+    for sample in samples:
+        stats = by_category[sample["category"]]
+        stats["total"] += 1
+        expected = sample["expected"]
+        if expected is not None and legacy_parse(sample["raw"]) == expected:
+            stats["legacy"] += 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = json_parser.parse_json_with_ai_fallback(sample["raw"])
+        if expected is not None and result == expected:
+            stats["new"] += 1
+        elif result is not None:
+            stats["wrong"] += 1
+            if args.verbose:
+                print(f"[{sample['category']}] 结果与预期不符: {result}")
+
+    print(f"{'类别':<16}{'样本':>6}{'旧流程':>8}{'新流程':>8}{'误修复':>8}")
+    totals = defaultdict(int)
+    for category, stats in by_category.items():
+        print(f"{category:<16}{stats['total']:>6}{stats['legacy']:>8}{stats['new']:>8}{stats['wrong']:>8}")
+        for key, value in stats.items():
+            totals[key] += value
+    print(f"{'合计':<16}{totals['total']:>6}{totals['legacy']:>8}{totals['new']:>8}{totals['wrong']:>8}")
+
+    legacy_llm_calls = sum(1 for s in samples if legacy_parse(s["raw"]) is None and "{" in s["raw"])
+    print(f"\n需要LLM修复的次数: 旧流程 {legacy_llm_calls} 次 -> 新流程 {len(llm_calls)} 次")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for sample in samples:
+            repair_json_locally(sample["raw"])
+    elapsed = time.perf_counter() - start
+    print(f"本地修复耗时: 平均 {elapsed / (args.repeat * len(samples)) * 1e6:.0f} 微秒/条")
+    hit_rates = get_hit_rates(json_parser.PARSER_METRICS_GROUP)
+    print("各级命中率: " + ", ".join(f"{name}={rate:.0%}" for name, rate in sorted(hit_rates.items())))
+
+
+if __name__ == "__main__":
+    main()
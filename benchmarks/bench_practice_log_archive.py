@@ -0,0 +1,92 @@
+# benchmarks/bench_practice_log_archive.py
+"""
+练习记录分区归档基准测试（需要 PostgreSQL，并已执行迁移 m0008）。
+
+把最早的一个月分区归档到临时目录，分别在归档前、归档后、恢复后执行：
+- 覆盖该月的错题统计 / 错题本前两页 / 错题题目ID（在线分区 + 归档合并查询）；
+- 最近30天的错题统计（只碰在线分区）；
+- SRS 重放用的全部练习记录读出。
+检查三次结果完全相同，并报告耗时、归档文件大小与压缩比。结束时把该月恢复回数据库。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_practice_log_archive
+"""
+import argparse
+import datetime
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.tutor_app.analytics import dashboard_data
+from src.tutor_app.core.config import settings
+from src.tutor_app.crud.crud_question import load_srs_history
+from src.tutor_app.db import partitions
+
+
+def snapshot(db, label: str, start: datetime.date, end: datetime.date):
+    today = datetime.date.today()
+    timings, results = {}, []
+
+    def timed(name, call):
+        begin = time.perf_counter()
+        results.append(call())
+        db.rollback() # 归档记录载入的临时表随事务结束删除
+        timings[name] = time.perf_counter() - begin
+
+    def pages():
+        first, cursor = dashboard_data.get_mistake_notebook_page.uncached(db, None, start, end)
+        second, _ = dashboard_data.get_mistake_notebook_page.uncached(db, None, start, end, cursor=cursor)
+        return [(e.id, e.mistake_count, e.last_wrong_at, e.last_wrong_answer) for e in first + second]
+
+    timed("错题统计", lambda: dashboard_data.get_mistake_summary.uncached(db, None, start, end).to_dict())
+    timed("错题本两页", pages)
+    timed("错题题目ID", lambda: sorted(dashboard_data.iter_mistake_question_ids(db, None, start, end)))
+    timed("近30天错题统计", lambda: dashboard_data.get_mistake_summary.uncached(
+        db, None, today - datetime.timedelta(days=30), today).to_dict())
+    timed("SRS历史读出", lambda: [int(column.sum()) for column in load_srs_history(db, infer_missing_quality=True)])
+    print(f"{label}: " + "，".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    settings.PRACTICE_LOG_ARCHIVE_DIR = tempfile.mkdtemp(prefix="practice_log_archive_")
+    try:
+        online = partitions.list_partitions(db.connection())
+        if not online:
+            raise SystemExit("practice_logs 没有分区，请先在 PostgreSQL 上执行迁移（python init_db.py）")
+        month = next(iter(online))
+        size = db.execute(text(f"SELECT pg_total_relation_size('{online[month]}')")).scalar()
+        db.rollback()
+        # 查询范围从该月下旬跨到下个月初，需要合并归档与在线分区
+        start, end = month + datetime.timedelta(days=19), partitions.add_months(month, 1) + datetime.timedelta(days=2)
+        print(f"归档月份 {month:%Y-%m}，查询范围 {start} ~ {end}")
+
+        before = snapshot(db, "归档前", start, end)
+        begin = time.perf_counter()
+        archive = partitions.archive_partition(db, month)
+        print(f"归档: {archive.rows} 行，用时 {time.perf_counter() - begin:.1f}s，"
+              f"Parquet {archive.bytes / 1e6:.1f} MB（分区含索引 {size / 1e6:.1f} MB，{size / archive.bytes:.1f}x）")
+        archived = snapshot(db, "归档后", start, end)
+
+        begin = time.perf_counter()
+        rows = partitions.restore_partition(db, month)
+        print(f"恢复: {rows} 行，用时 {time.perf_counter() - begin:.1f}s")
+        restored = snapshot(db, "恢复后", start, end)
+
+        if not before == archived == restored:
+            raise SystemExit("归档/恢复前后查询结果不一致！")
+        print("归档前、归档后、恢复后的查询结果完全一致")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_srs_replay.py
+"""
+SM-2 批量重放基准测试。
+
+1. 一致性：随机生成练习历史，分别用 replay_sm2 批量重放和逐条调用 update_srs_stats，逐题比较
+   repetitions / ease_factor / interval / next_review_date 是否完全相同。
+2. 引擎耗时：在内存中生成 --logs 条记录，只计 replay_sm2 本身。
+3. （可选 --db）数据库全流程：按 (题目, 时间) 读出全部练习记录、重放、批量写回 user_question_stats，
+   没有 quality 的记录按对错推断。在一个事务里执行，结束后回滚，不改动库中数据。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_srs_replay --logs 10000000
+    python -m benchmarks.bench_srs_replay --db      # 使用 DATABASE_URL 中已有的练习记录
+"""
+import argparse
+import datetime
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.tutor_app.core.config import settings
+from src.tutor_app.core.srs_logic import INITIAL_EASE_FACTOR, INITIAL_INTERVAL, INITIAL_REPETITIONS, update_srs_stats
+from src.tutor_app.core.srs_replay import replay_sm2
+from src.tutor_app.crud.crud_question import load_srs_history, rebuild_srs_stats
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def synthetic_history(rng, logs: int, questions: int):
+    """按时间先后排列的随机练习记录；quality 偏向答对，与实际使用接近。"""
+    question_ids = rng.integers(1, questions + 1, logs)
+    qualities = rng.choice([0, 3, 4, 4, 5, 5], logs)
+    days = np.sort(rng.integers(19000, 20500, logs))
+    return question_ids, qualities, days
+
+
+def check_consistency(rng, logs: int, questions: int) -> bool:
+    question_ids, qualities, days = synthetic_history(rng, logs, questions)
+    result = replay_sm2(question_ids, qualities, days)
+
+    reference, overflowed = {}, set()
+    for qid, quality, day in zip(question_ids.tolist(), qualities.tolist(), days.tolist()):
+        stats = reference.setdefault(qid, SimpleNamespace(
+            repetitions=INITIAL_REPETITIONS, ease_factor=INITIAL_EASE_FACTOR, interval=INITIAL_INTERVAL))
+        try:
+            update_srs_stats(stats, quality, EPOCH + datetime.timedelta(days=day))
+            overflowed.discard(qid)
+        except OverflowError: # 连续答对太多次，日期超出 datetime.date 范围；其它字段已更新
+            overflowed.add(qid)
+
+    mismatches = 0
+    for i, qid in enumerate(result.question_id.tolist()):
+        stats = reference[qid]
+        same = (stats.repetitions == result.repetitions[i] and stats.ease_factor == result.ease_factor[i]
+                and stats.interval == result.interval[i])
+        if qid not in overflowed:
+            same = same and np.datetime64(stats.next_review_date) == result.next_review_date[i]
+        mismatches += not same
+    print(f"一致性: {logs} 条记录 / {len(result)} 道题，不一致 {mismatches} 道"
+          f"（其中 {len(overflowed)} 道题逐条更新时日期溢出，只比较其余字段）")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logs", type=int, default=10_000_000)
+    parser.add_argument("--questions", type=int, default=1_000_000)
+    parser.add_argument("--check-logs", type=int, default=500_000)
+    parser.add_argument("--db", action="store_true", help="在数据库已有的练习记录上测试读出+重放+写回（事务回滚）")
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if not check_consistency(rng, args.check_logs, args.check_logs // 20):
+        raise SystemExit("批量重放结果与 update_srs_stats 不一致！")
+
+    question_ids, qualities, days = synthetic_history(rng, args.logs, args.questions)
+    start = time.perf_counter()
+    result = replay_sm2(question_ids, qualities, days)
+    print(f"引擎: {args.logs} 条记录 / {len(result)} 道题，重放用时 {time.perf_counter() - start:.2f}s"
+          f"（单题最多 {result.reviews.max()} 条）")
+
+    if args.db:
+        engine = create_engine(args.url)
+        db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+        try:
+            start = time.perf_counter()
+            history = load_srs_history(db, infer_missing_quality=True)
+            loaded = time.perf_counter()
+            result = replay_sm2(*history)
+            replayed = time.perf_counter()
+            print(f"数据库: 读出 {len(history[0])} 条记录 {loaded - start:.1f}s，重放 {len(result)} 道题 {replayed - loaded:.2f}s")
+
+            start = time.perf_counter()
+            rows = rebuild_srs_stats(db, infer_missing_quality=True, commit=False)
+            print(f"数据库: rebuild_srs_stats 全流程（读出+重放+删除旧档案+写回 {rows} 行）{time.perf_counter() - start:.1f}s")
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_streaming_early_stop.py
+"""
+流式提前终止基准测试：对比 invoke（读完整个输出）与 stream_json（对象完整后立即断开）的耗时和token数。
+
+本地启动一个模拟Ollama的HTTP服务（/api/chat），按固定速率逐token流式输出：
+<think>思考过程</think> + 一道题目的JSON + 一段多余的说明文字，模拟qwen3在JSON之后继续生成的情况。
+服务端会记录客户端断开时已经发出的token数，用来确认断开连接确实让“模型”停止了解码。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_streaming_early_stop --calls 5 --token-delay 0.01
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_ollama import ChatOllama
+
+from src.tutor_app.llms.streaming import stream_json, schema_validator, get_streaming_stats
+from src.tutor_app.schemas.question import TrueFalseQuestionSchema
+
+FAKE_QUESTION = {
+    "question_type": "判断题",
+    "content": {"question": "Alembic是Django框架自带的数据库迁移工具。"},
+    "answer": {"correct_answer": False},
+    "analysis": "Alembic是SQLAlchemy的官方工具。",
+    "knowledge_tag": "Alembic数据库迁移",
+}
+THINKING = "<think>\n用户需要一道判断题，我先从上下文中找出关键事实，然后构造一个错误的陈述。\n</think>\n\n"
+TRAILING = "\n\n以上题目考查了对数据库迁移工具的理解。" * 6
+
+
+def tokenize(text: str, size: int = 3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def make_handler(token_delay: float, served: list):
+    tokens = tokenize(THINKING) + tokenize(json.dumps(FAKE_QUESTION, ensure_ascii=False)) + tokenize(TRAILING)
+
+    class FakeStreamingOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _write_chunk(self, payload: dict):
+            data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            sent = 0
+            try:
+                for token in tokens:
+                    time.sleep(token_delay)
+                    self._write_chunk({"model": "fake", "created_at": "2025-01-01T00:00:00Z",
+                                       "message": {"role": "assistant", "content": token}, "done": False})
+                    sent += 1
+                self._write_chunk({"model": "fake", "created_at": "2025-01-01T00:00:00Z",
+                                   "message": {"role": "assistant", "content": ""}, "done": True,
+                                   "done_reason": "stop", "eval_count": sent})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                served.append((sent, len(tokens)))
+
+    return FakeStreamingOllamaHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--token-delay", type=float, default=0.01, help="模拟每个token的解码耗时(秒)")
+    args = parser.parse_args()
+
+    served = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.token_delay, served))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm = ChatOllama(base_url=f"http://127.0.0.1:{server.server_address[1]}", model="fake")
+    validate = schema_validator(TrueFalseQuestionSchema)
+    prompt = "请生成一道“判断题”题目。"
+
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        stream_json(llm, prompt, validate, kind="bench", early_stop=False)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        result = stream_json(llm, prompt, validate, kind="bench", early_stop=True)
+        assert TrueFalseQuestionSchema.model_validate_json(result.text)
+    early = time.perf_counter() - start
+    time.sleep(args.token_delay * 5) # 等服务端线程记录断开时的发送数
+    server.shutdown()
+
+    stats = get_streaming_stats()["bench"]
+    early_served = served[args.calls:]
+    print(f"calls={args.calls} token_delay={args.token_delay}s")
+    print(f"读完整输出:   {full:.2f}s, 平均 {stats['full_tokens'] / stats['full_calls']:.0f} tokens/次, "
+          f"其中JSON之后的多余输出 {stats['trailing_tokens'] / stats['full_calls']:.0f} tokens/次")
+    print(f"提前终止:     {early:.2f}s, 平均 {(stats['tokens'] - stats['full_tokens']) / stats['early_stops']:.0f} tokens/次, "
+          f"估算节省 {stats['tokens_saved'] / stats['early_stops']:.0f} tokens / {stats['seconds_saved'] / stats['early_stops']:.2f}s 每次")
+    print(f"服务端在断开时实际发出的token数: {[sent for sent, _ in early_served]} (完整输出 {early_served[0][1]} tokens)")
+    print(f"加速比: {full / early:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
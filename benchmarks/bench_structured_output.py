@@ -0,0 +1,80 @@
+# benchmarks/bench_structured_output.py
+"""
+结构化输出基准测试：对同一批上下文分别用“自由文本JSON”和“format=JSON Schema”两种方式出题，
+统计每种方式下各解析阶段的命中次数，重点关注解析失败数和需要LLM修复的次数。
+
+需要一个可用的Ollama服务（使用 .env 中的 OLLAMA_BASE_URL / OLLAMA_CHAT_MODEL）。
+第五级AI修复在统计时被替换为计数器，不会额外调用模型。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_structured_output --per-type 10
+    python -m benchmarks.bench_structured_output --per-type 5 --types 判断题 简答题
+"""
+import argparse
+import contextlib
+import io
+import time
+from collections import Counter
+
+from langchain_core.output_parsers import StrOutputParser
+
+from src.tutor_app.llms.llm_factory import get_chat_model, get_structured_chat_model
+from src.tutor_app.rag import json_parser
+from src.tutor_app.rag.prompt_examples import FEW_SHOT_EXAMPLES
+from src.tutor_app.rag.question_generator import _build_prompt, SINGLE_QUESTION_REQUEST
+from src.tutor_app.tasks.generation import SCHEMA_MAP, _validate_item
+
+CONTEXTS = [example["context"] for example in FEW_SHOT_EXAMPLES] + [
+    "Celery是一个基于分布式消息传递的异步任务队列，常用Redis或RabbitMQ作为消息代理(broker)。",
+    "SQLAlchemy的Session负责管理对象的持久化状态，commit会把当前事务中的变更写入数据库。",
+]
+
+
+def classify(output: str, schema) -> str:
+    """返回这条输出在哪一级被成功解析（或失败）。"""
+    if json_parser.parse_structured_output(output, schema) is not None:
+        return "structured"
+    llm_calls = []
+    original = json_parser.repair_json_with_llm
+    json_parser.repair_json_with_llm = lambda broken: llm_calls.append(broken) or ""
+    try:
+        parsed = json_parser.parse_json_with_ai_fallback(output)
+    finally:
+        json_parser.repair_json_with_llm = original
+    if llm_calls:
+        return "needs_llm_repair"
+    stage, _ = _validate_item(parsed, schema.__name__, schema)
+    return "repaired" if stage == "ok" else stage
+
+
+def run(mode: str, question_types, per_type: int) -> Counter:
+    counts = Counter()
+    prompt = _build_prompt(SINGLE_QUESTION_REQUEST)
+    for q_type in question_types:
+        schema = SCHEMA_MAP[q_type]
+        llm = get_structured_chat_model(schema) if mode == "structured" else get_chat_model()
+        chain = prompt | llm | StrOutputParser()
+        for i in range(per_type):
+            output = chain.invoke({"context": CONTEXTS[i % len(CONTEXTS)], "question_type": q_type})
+            with contextlib.redirect_stdout(io.StringIO()):
+                counts[classify(output, schema)] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-type", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(SCHEMA_MAP))
+    args = parser.parse_args()
+
+    stages = ["structured", "repaired", "needs_llm_repair", "schema_failed", "parse_failed"]
+    print(f"{'模式':<12}" + "".join(f"{stage:>18}" for stage in stages) + f"{'耗时':>10}")
+    for mode in ("free_text", "structured"):
+        start = time.perf_counter()
+        counts = run(mode, args.types, args.per_type)
+        elapsed = time.perf_counter() - start
+        print(f"{mode:<12}" + "".join(f"{counts[stage]:>18}" for stage in stages) + f"{elapsed:>9.1f}s")
+
+
+if __name__ == "__main__":
+    main()
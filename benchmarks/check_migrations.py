@@ -0,0 +1,174 @@
+# benchmarks/check_migrations.py
+"""
+数据库升级检查：在一个空库里按最初版本（迁移体系出现之前）的表结构建表、写入少量旧格式数据，
+再按 init_db 的流程执行 create_all + 全部迁移，检查：
+- 每个迁移都能在旧库上执行成功，再执行一遍时没有待执行的迁移；
+- 升级后的表包含 ORM 模型声明的全部列，每个模型都能正常查询；
+- 回填类迁移确实写入了数据（刷题状态、按日汇总、随机键、解开双重编码的题目内容）。
+另外在一个全新的空库上执行一遍 create_all + 全部迁移，检查新装流程。任何一项失败时以非零状态退出。
+
+默认使用临时 SQLite 文件；--url 可以指定一个空的 PostgreSQL 库（会在其中建表写数据，结束后不清理）。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.check_migrations
+    python -m benchmarks.check_migrations --url postgresql://postgres:@/scratch?host=/tmp/pgdata
+"""
+import argparse
+import datetime
+import json
+import os
+import tempfile
+
+from sqlalchemy import (JSON, Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, String, Table,
+                        Text, create_engine, func, inspect, select)
+from sqlalchemy.orm import Session
+
+from src.tutor_app.db.migrate import applied_versions, discover_migrations, run_migrations
+from src.tutor_app.db.models import Base, PracticeDailyRollup, Question, UserQuestionState
+
+# 最初版本 models.py 的表结构（只写升级会涉及的表；其余的表由 create_all 新建）
+baseline = MetaData()
+Table("knowledge_sources", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("filename", String, nullable=False),
+      Column("status", String),
+      Column("created_at", DateTime))
+Table("questions", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("source_id", Integer, nullable=False),
+      Column("question_type", String, nullable=False),
+      Column("content", JSON, nullable=False),
+      Column("answer", JSON, nullable=False),
+      Column("analysis", Text),
+      Column("knowledge_tag", String),
+      Column("created_at", DateTime))
+Table("practice_logs", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("question_id", Integer, ForeignKey("questions.id"), nullable=False),
+      Column("user_answer", Text),
+      Column("is_correct", Boolean, nullable=False),
+      Column("timestamp", DateTime),
+      Column("ai_score", String),
+      Column("ai_feedback", Text))
+Table("user_question_stats", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("user_id", Integer, nullable=False),
+      Column("question_id", Integer, ForeignKey("questions.id"), nullable=False, index=True),
+      Column("repetitions", Integer),
+      Column("ease_factor", Float),
+      Column("interval", Integer),
+      Column("next_review_date", Date, index=True))
+
+QUESTIONS = 20
+LOGS_PER_QUESTION = 3
+
+
+def seed_baseline(engine):
+    """按旧代码的写法写入数据：题目内容先 json.dumps 再存进 JSON 列（双重编码）。"""
+    baseline.create_all(bind=engine)
+    tables = baseline.tables
+    start = datetime.datetime(2025, 1, 1, 8)
+    with engine.begin() as conn:
+        conn.execute(tables["knowledge_sources"].insert(), [{"id": 1, "filename": "old.pdf", "status": "completed",
+                                                             "created_at": start}])
+        conn.execute(tables["questions"].insert(), [{
+            "id": i, "source_id": 1, "question_type": "single_choice", "knowledge_tag": f"tag{i % 4}",
+            "content": json.dumps({"question": f"Q{i}", "options": ["A", "B"]}),
+            "answer": json.dumps({"correct_option": "A"}), "created_at": start,
+        } for i in range(1, QUESTIONS + 1)])
+        conn.execute(tables["practice_logs"].insert(), [{
+            "question_id": i, "user_answer": "A", "is_correct": (i + k) % 2 == 0,
+            "timestamp": start + datetime.timedelta(days=k, minutes=i),
+        } for i in range(1, QUESTIONS + 1) for k in range(LOGS_PER_QUESTION)])
+        conn.execute(tables["user_question_stats"].insert(), [{
+            "user_id": 1, "question_id": i, "repetitions": 1, "ease_factor": 2.5, "interval": 1,
+            "next_review_date": datetime.date(2025, 1, 5),
+        } for i in range(1, QUESTIONS + 1)])
+
+
+def upgrade(engine) -> list:
+    """与 init_db.init_database 相同：先建缺少的表，再执行迁移。"""
+    Base.metadata.create_all(bind=engine)
+    return run_migrations(engine)
+
+
+def check_schema(engine) -> list:
+    """升级后的库与 ORM 模型比对：缺少的表和列，以及每个模型的查询。"""
+    problems = []
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            problems.append(f"缺少表 {table.name}")
+            continue
+        missing = {c.name for c in table.columns} - {c["name"] for c in inspector.get_columns(table.name)}
+        if missing:
+            problems.append(f"表 {table.name} 缺少列 {sorted(missing)}")
+    with Session(bind=engine) as db:
+        for mapper in Base.registry.mappers:
+            try:
+                db.query(mapper.class_).first()
+            except Exception as e:
+                problems.append(f"查询 {mapper.class_.__name__} 失败: {e}")
+                db.rollback()
+    return problems
+
+
+def check_backfill(engine) -> list:
+    problems = []
+    with Session(bind=engine) as db:
+        expected = {
+            "user_question_state": (db.scalar(select(func.count(UserQuestionState.question_id))), QUESTIONS),
+            "practice_daily_rollup 练习次数": (db.scalar(select(func.sum(PracticeDailyRollup.total))),
+                                             QUESTIONS * LOGS_PER_QUESTION),
+            "random_key 为空的题目": (db.scalar(select(func.count(Question.id)).where(Question.random_key.is_(None))), 0),
+        }
+        for name, (actual, wanted) in expected.items():
+            if actual != wanted:
+                problems.append(f"{name}: {actual}，应为 {wanted}")
+        content = db.scalar(select(Question.content).where(Question.id == 1))
+        if not isinstance(content, dict):
+            problems.append(f"题目内容未解开双重编码: {content!r}")
+    return problems
+
+
+def run_check(label: str, engine, seed: bool) -> bool:
+    problems = []
+    try:
+        if seed:
+            seed_baseline(engine)
+        applied = upgrade(engine)
+        if len(applied) != len(discover_migrations()):
+            problems.append(f"只执行了 {len(applied)} 个迁移: {applied}")
+        if upgrade(engine):
+            problems.append("再次执行时仍有待执行的迁移")
+        with engine.connect() as conn:
+            if applied_versions(conn) != {version for version, _ in discover_migrations()}:
+                problems.append("schema_migrations 记录不完整")
+        problems += check_schema(engine)
+        if seed:
+            problems += check_backfill(engine)
+    except Exception as e:
+        problems.append(f"升级失败: {type(e).__name__}: {e}")
+    print(f"[{'ok' if not problems else 'FAIL'}] {label}")
+    for problem in problems:
+        print(f"    {problem}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="空的 PostgreSQL 库；不指定时使用临时 SQLite 文件")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="check_migrations_")
+    upgrade_url = args.url or f"sqlite:///{os.path.join(workdir, 'upgrade.db')}"
+    ok = run_check("旧库升级", create_engine(upgrade_url), seed=True)
+    if not args.url: # PostgreSQL 上只检查升级路径，新装流程需要另一个空库
+        ok &= run_check("新库初始化", create_engine(f"sqlite:///{os.path.join(workdir, 'fresh.db')}"), seed=False)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# benchmarks/check_query_plans.py
+"""
+查询计划回归检查：对热点查询执行 EXPLAIN，出现以下任一情况时以非零状态退出：
+- 在大表上退化为顺序扫描（Seq Scan）；
+- 没有用到迁移为该查询建的索引（检查项中声明，分区上的索引按父表的索引名计）；
+- 检查项没有执行任何 SQL（检查期间关闭了看板结果缓存和待复习队列，每一项都应真正查库）。
+
+发布前、以及修改了 crud_question / dashboard_data 的查询或迁移之后运行；readme 的“发布前检查”一节列出了完整步骤。
+
+每个检查项直接调用 crud_question / dashboard_data 中的真实函数，通过 SQLAlchemy 事件截获它执行的
+SELECT 语句及参数，再逐条 EXPLAIN (FORMAT JSON)。只对行数不少于 --min-rows 的表报告顺序扫描
+（小表上顺序扫描本来就是最优计划）；本来就要读全表的聚合查询在检查项中显式声明允许的表。
+检查时会话的 random_page_cost 默认设为 1.1（SSD 上的常用取值；PostgreSQL 默认的 4 针对机械硬盘，
+会让小范围连接也倾向于对 questions 做哈希连接+顺序扫描），可用 --random-page-cost 调整。
+
+需要 PostgreSQL，并先执行迁移（python init_db.py）。数据量不足时，用 bench_sampling 的灌数逻辑
+在一个临时知识源下生成测试数据，结束后删除（--keep 保留，--source-id 复用已有数据）。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --source-id 3 --keep
+    python -m benchmarks.check_query_plans --verbose      # 打印每条语句用到的扫描节点
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_sampling import populate
+from src.tutor_app.analytics import dashboard_data
+from src.tutor_app.core.config import settings
+from src.tutor_app.crud import crud_question
+from src.tutor_app.crud.crud_question import delete_source_and_related_data, rebuild_question_state
+from src.tutor_app.db.migrate import run_migrations
+from src.tutor_app.db.models import Base, KnowledgeSource
+
+SCAN_NODES = ("Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan", "Bitmap Index Scan")
+
+
+def hot_queries(db, source_id):
+    """(名称, 调用, 必须用到的索引, 允许顺序扫描的表)。索引是迁移为该查询建的那几个，计划里没有用到即为回归。"""
+    week_ago = datetime.date.today() - datetime.timedelta(days=7)
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    type_counts = {"单项选择题": 10, "判断题": 5, "填空题": 3, "简答题": 2}
+    return [
+        ("抽题 混合模式", lambda: crud_question.get_random_question_by_mode(db, "混合模式"),
+         ("ix_questions_random_key",), ()),
+        ("抽题 只刷新题", lambda: crud_question.get_question_batch_by_mode(db, "只刷新题", 20),
+         ("ix_questions_random_key", "user_question_state_pkey"), ()),
+        ("抽题 只刷错题", lambda: crud_question.get_question_batch_by_mode(db, "只刷错题", 20),
+         ("ix_questions_random_key", "ix_user_question_state_wrong"), ()),
+        ("按题型抽题", lambda: crud_question.get_question_batch_with_type_selection(
+            db, "只刷错题", type_counts, [source_id]), ("ix_questions_type_random_key", "ix_user_question_state_wrong"), ()),
+        ("考试抽题", lambda: crud_question.get_questions_for_exam(db, source_id, 50),
+         ("ix_questions_source_random_key",), ()),
+        ("复习抽题", lambda: crud_question.get_review_questions(db, count=20),
+         ("ix_user_question_stats_user_next_review",), ()),
+        ("今日待复习数", lambda: crud_question.count_review_questions_today(db),
+         ("ix_user_question_stats_user_next_review",), ()),
+        ("知识源题目数", lambda: crud_question.count_questions_by_source(db, source_id), (), ()),
+        # 以下两张表在测试数据里很小，不要求具体索引，只检查顺序扫描
+        ("最近知识源", lambda: crud_question.get_recent_sources(db), (), ()),
+        ("评分缓存", lambda: crud_question.get_cached_gradings(db, 1, ["0" * 64]), (), ()),
+        ("看板 总览(近7天)", lambda: dashboard_data.get_practice_summary(db, start_date=week_ago),
+         ("practice_daily_rollup_pkey",), ()),
+        ("错题本 统计(近1天)", lambda: dashboard_data.get_mistake_summary(db, [source_id], start_date=yesterday),
+         ("ix_practice_logs_wrong_timestamp",), ()),
+        ("错题本 分页(近1天)", lambda: dashboard_data.get_mistake_notebook_page(db, [source_id], start_date=yesterday),
+         ("ix_practice_logs_wrong_timestamp",), ()),
+        ("错题本 题目ID(近1天)", lambda: list(dashboard_data.iter_mistake_question_ids(db, [source_id], start_date=yesterday)),
+         ("ix_practice_logs_wrong_timestamp",), ()),
+        ("复习预测", lambda: dashboard_data.get_srs_review_forecast(db), ("ix_user_question_stats_user_next_review",), ()),
+        ("最难题目", lambda: dashboard_data.get_hardest_questions(db), ("ix_user_question_stats_user_ease",), ()),
+        ("看板 按知识源(近7天)", lambda: dashboard_data.get_performance_by_source(db, start_date=week_ago),
+         ("ix_practice_daily_rollup_source_day",), ()),
+        ("看板 按知识点(近7天)", lambda: dashboard_data.get_performance_by_tag(db, start_date=week_ago),
+         ("practice_daily_rollup_pkey",), ()),
+        ("排行榜 总数", lambda: dashboard_data.get_current_user_stats(db), (), ()),
+        # 以下查询按定义就要读全表
+        ("知识网络", lambda: dashboard_data.get_knowledge_network_data(db), ("ix_questions_tag_source",), ("questions",)),
+    ]
+
+
+class StatementRecorder:
+    """在 engine 上截获执行的 SELECT 语句。"""
+
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.statements.append((statement, parameters))
+
+
+def walk_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+def explain(db, statement, parameters):
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--questions", type=int, default=200_000)
+    parser.add_argument("--logs", type=int, default=2_000_000)
+    parser.add_argument("--min-rows", type=int, default=10_000, help="行数不少于该值的表才检查顺序扫描")
+    parser.add_argument("--random-page-cost", type=float, default=1.1)
+    parser.add_argument("--source-id", type=int, default=None)
+    parser.add_argument("--keep", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("查询计划检查需要 PostgreSQL。")
+    # 看板统计命中 Redis 缓存时不执行任何 SQL，检查就落空了；这里让每个检查项都真正查库
+    settings.ANALYTICS_CACHE_ENABLED = False
+    # 待复习队列就绪后，待复习数/复习抽题只查 Redis 和按ID核对；这里检查的是它们回退时的数据库查询
+    settings.DUE_QUEUE_ENABLED = False
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    db = Session()
+
+    source_id = args.source_id
+    if source_id is None:
+        source = KnowledgeSource(filename=f"__check_query_plans_{time.time()}", status="completed")
+        db.add(source)
+        db.commit()
+        source_id = source.id
+        populate(db, source_id, args.questions, args.logs)
+        rebuild_question_state(db)
+        print(f"灌入 {args.questions} 道题 / {args.logs} 条练习记录")
+    db.commit()
+    # VACUUM 刷新可见性映射（迁移重写表之后为空），使计划与 autovacuum 运行后的稳定状态一致
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+
+    row_counts = dict(db.execute(text(
+        "SELECT relname, reltuples::bigint FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+    )).all())
+    # 分区表（practice_logs 按月分区）的计划节点上是分区名；允许列表和汇总都按父表名
+    parents = dict(db.execute(text(
+        "SELECT c.relname, p.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent"
+    )).all())
+    practice_logs_rows = sum(rows for name, rows in row_counts.items() if parents.get(name, name) == "practice_logs")
+    print(f"questions≈{row_counts.get('questions')} practice_logs≈{practice_logs_rows}")
+
+    db.execute(text(f"SET random_page_cost = {args.random_page_cost}"))
+    db.commit() # 会话级设置，随事务提交后才在后续的回滚中保留
+    failures = []
+    recorder = StatementRecorder(engine)
+    try:
+        for name, call, expected, allowed in hot_queries(db, source_id):
+            recorder.statements.clear()
+            call()
+            db.rollback() # 丢弃评分缓存命中计数等副作用
+            captured = list(recorder.statements)
+            problems, scans, used = [], [], set()
+            for statement, parameters in captured:
+                for node in walk_plan(explain(db, statement, parameters)):
+                    if "Index Name" in node: # Bitmap Index Scan 节点只有索引名；分区上的索引按父表的索引名统计
+                        used.add(parents.get(node["Index Name"], node["Index Name"]))
+                    if node["Node Type"] not in SCAN_NODES or "Relation Name" not in node:
+                        continue
+                    relation = node["Relation Name"]
+                    scans.append(f"{node['Node Type']}({relation}{'/' + node['Index Name'] if 'Index Name' in node else ''})")
+                    if node["Node Type"] == "Seq Scan" and parents.get(relation, relation) not in allowed \
+                            and row_counts.get(relation, 0) >= args.min_rows:
+                        problems.append(f"Seq Scan on {relation} (≈{row_counts[relation]} 行)")
+            db.rollback()
+            missing = [index for index in expected if index not in used]
+            if missing:
+                problems.append(f"没有用到索引 {', '.join(missing)}")
+            if not captured:
+                problems.append("没有执行任何查询（结果来自缓存？），无法检查")
+            status = "FAIL" if problems else "ok"
+            print(f"[{status:>4}] {name}: {len(captured)} 条语句" + (f" -> {'; '.join(problems)}" if problems else ""))
+            if args.verbose:
+                print("        " + ", ".join(scans))
+                print("        索引: " + ", ".join(sorted(used)))
+            if problems:
+                failures.append(name)
+    finally:
+        event.remove(engine, "before_cursor_execute", recorder._record)
+        if args.keep or args.source_id is not None:
+            print(f"测试数据已保留，source_id={source_id}")
+        else:
+            print("清理测试数据...")
+            db.rollback()
+            db.execute(text("DELETE FROM user_question_stats WHERE question_id IN (SELECT id FROM questions WHERE source_id = :s)"),
+                       {"s": source_id})
+            db.commit()
+            delete_source_and_related_data(db, source_id)
+        db.close()
+
+    if failures:
+        print(f"{len(failures)} 个热点查询的计划回归（大表顺序扫描、没有用到预期的索引或没有查询可检查）: {failures}")
+        sys.exit(1)
+    print("所有热点查询均走预期的索引。")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 # personal_ai_tutor/init_db.py
 from src.tutor_app.db.session import engine
 from src.tutor_app.db.models import Base
+from src.tutor_app.db.migrate import run_migrations
 
 def init_database():
     print("Creating all database tables...")
     Base.metadata.create_all(bind=engine)
-    print("Database tables created.")
+    # create_all 只会新建缺少的表，已有表的加列/加索引/回填数据由版本化迁移完成
+    applied = run_migrations(engine)
+    print(f"Database tables created. Applied {len(applied)} migration(s).")
 
 if __name__ == "__main__":
-    init_database()
\ No newline at end of file
+    init_database()
@@ -0,0 +1,97 @@
+# src/tutor_app/analytics/cache.py
+import datetime
+import functools
+import hashlib
+import inspect
+import json
+import pickle
+from typing import Optional
+
+import redis
+from src.tutor_app.core.config import settings
+from src.tutor_app.core.metrics import incr_metric, get_metrics
+from src.tutor_app.core.redis_client import get_redis
+
+DATA_VERSION_KEY = "tutor:analytics:data_version"
+RESULT_KEY = "tutor:analytics:result:{version}:{name}:{digest}"
+CACHE_METRICS_GROUP = "analytics_cache"
+
+
+def _data_version() -> Optional[int]:
+    """读取练习数据的全局版本号；Redis不可用时返回None，表示不使用缓存。"""
+    try:
+        value = get_redis().get(DATA_VERSION_KEY)
+    except redis.RedisError:
+        return None
+    return int(value) if value is not None else 0
+
+
+def bump_data_version():
+    """
+    练习记录、SRS状态、评分结果或知识源发生变化并提交之后调用：递增版本号，
+    所有进程中按旧版本缓存的统计结果随之失效（旧键等TTL到期自然回收）。
+    """
+    try:
+        get_redis().incr(DATA_VERSION_KEY)
+    except redis.RedisError as e:
+        print(f"Warning: Failed to bump analytics data version: {e}")
+
+
+def _cache_key(func, version: int, args, kwargs) -> str:
+    """按函数名 + 规范化后的筛选参数（不含db）生成键；“今天”也计入，按日期计算的结果跨天自动失效。"""
+    bound = inspect.signature(func).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    params = dict(list(bound.arguments.items())[1:])
+    raw = json.dumps([params, datetime.date.today()], sort_keys=True, default=str)
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    return RESULT_KEY.format(version=version, name=func.__name__, digest=digest)
+
+
+def cached_analytics(func):
+    """
+    【看板结果缓存】装饰 dashboard_data 中签名为 f(db, ...筛选参数) 的统计函数。
+    结果按 (数据版本号, 函数名, 筛选参数) 缓存在Redis中，所有Streamlit进程共享；
+    任何练习写入都会递增版本号，因此不会读到过期结果。只用于返回普通数据/DataFrame的函数，
+    返回ORM对象的函数（错题本、最难题目）不能跨进程缓存。
+    """
+    @functools.wraps(func)
+    def wrapper(db, *args, **kwargs):
+        version = _data_version() if settings.ANALYTICS_CACHE_ENABLED else None
+        if version is None:
+            incr_metric(CACHE_METRICS_GROUP, "bypass")
+            return func(db, *args, **kwargs)
+
+        key = _cache_key(func, version, args, kwargs)
+        try:
+            cached = get_redis().get(key)
+        except redis.RedisError:
+            cached = None
+        if cached is not None:
+            incr_metric(CACHE_METRICS_GROUP, "hit")
+            incr_metric(CACHE_METRICS_GROUP, f"{func.__name__}.hit")
+            return pickle.loads(cached)
+
+        incr_metric(CACHE_METRICS_GROUP, "miss")
+        incr_metric(CACHE_METRICS_GROUP, f"{func.__name__}.miss")
+        result = func(db, *args, **kwargs)
+        try:
+            get_redis().set(key, pickle.dumps(result), ex=settings.ANALYTICS_CACHE_TTL_SECONDS)
+        except redis.RedisError:
+            pass
+        return result
+
+    wrapper.uncached = func
+    return wrapper
+
+
+def get_analytics_cache_report() -> dict:
+    """缓存的命中/未命中/绕过次数、命中率，以及各函数的明细。"""
+    counts = get_metrics(CACHE_METRICS_GROUP)
+    hits, misses = counts.get("hit", 0), counts.get("miss", 0)
+    return {
+        "hit": hits,
+        "miss": misses,
+        "bypass": counts.get("bypass", 0),
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "by_function": {name: count for name, count in counts.items() if "." in name},
+    }
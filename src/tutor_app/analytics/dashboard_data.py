@@ -1,23 +1,35 @@
 # src/tutor_app/analytics/dashboard_data.py
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Integer
-from src.tutor_app.db.models import PracticeLog, Question, KnowledgeSource
+from sqlalchemy import func, select, and_, or_
+from src.tutor_app.db.models import Question, KnowledgeSource, PracticeDailyRollup, PracticeLog, QuestionDataMixin
+from src.tutor_app.db.partitions import practice_logs_for_range
+from src.tutor_app.analytics.cache import cached_analytics
 import pandas as pd
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 import datetime
 
-def get_practice_summary(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None):
-    query = db.query(PracticeLog)
+def _rollup_filters(source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None) -> list:
+    """
+    看板筛选条件在按日汇总表上的等价写法：
+    原始查询的 timestamp >= start_date 且 < end_date + 1天，等价于汇总日期落在 [start_date, end_date]。
+    """
+    criteria = []
     if source_ids:
-        query = query.join(Question, PracticeLog.question_id == Question.id).filter(Question.source_id.in_(source_ids))
+        criteria.append(PracticeDailyRollup.source_id.in_(source_ids))
     if start_date:
-        query = query.filter(PracticeLog.timestamp >= start_date)
+        criteria.append(PracticeDailyRollup.day >= start_date)
     if end_date:
-        # 增加一天以包含结束日期当天
-        query = query.filter(PracticeLog.timestamp < end_date + datetime.timedelta(days=1))
-    
-    total_practices = query.count()
-    correct_practices = query.filter(PracticeLog.is_correct == True).count()
+        criteria.append(PracticeDailyRollup.day <= end_date)
+    return criteria
+
+@cached_analytics
+def get_practice_summary(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None):
+    """练习总览。读按日汇总表，结果与逐条统计 practice_logs 一致。"""
+    total_practices, correct_practices = db.query(
+        func.coalesce(func.sum(PracticeDailyRollup.total), 0),
+        func.coalesce(func.sum(PracticeDailyRollup.correct), 0),
+    ).filter(*_rollup_filters(source_ids, start_date, end_date)).one()
+    total_practices, correct_practices = int(total_practices), int(correct_practices)
     accuracy = (correct_practices / total_practices * 100) if total_practices > 0 else 0
     return {
         "total": total_practices,
@@ -25,88 +37,176 @@ def get_practice_summary(db: Session, source_ids: Optional[List[int]] = None, st
         "accuracy": round(accuracy, 2)
     }
 
+@cached_analytics
 def get_performance_by_source(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None):
     query = db.query(
         KnowledgeSource.filename,
-        func.count(PracticeLog.id).label('total'),
-        func.sum(func.cast(PracticeLog.is_correct, Integer)).label('correct')
-    ).join(Question, Question.source_id == KnowledgeSource.id)\
-     .join(PracticeLog, PracticeLog.question_id == Question.id)
-
-    if source_ids:
-        query = query.filter(KnowledgeSource.id.in_(source_ids))
-    if start_date:
-        query = query.filter(PracticeLog.timestamp >= start_date)
-    if end_date:
-        query = query.filter(PracticeLog.timestamp < end_date + datetime.timedelta(days=1))
+        func.sum(PracticeDailyRollup.total).label('total'),
+        func.sum(PracticeDailyRollup.correct).label('correct')
+    ).join(PracticeDailyRollup, PracticeDailyRollup.source_id == KnowledgeSource.id)\
+     .filter(*_rollup_filters(source_ids, start_date, end_date))
 
     results = query.group_by(KnowledgeSource.filename).all()
     
     if not results: return pd.DataFrame()
-    df = pd.DataFrame(results, columns=['知识源', '练习次数', '正确次数'])
+    df = pd.DataFrame([(name, int(total), int(correct)) for name, total, correct in results], columns=['知识源', '练习次数', '正确次数'])
     df['正确率'] = (df['正确次数'] / df['练习次数'] * 100).round(2)
     return df
 
-def get_mistake_notebook(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None):
-    query = db.query(Question, PracticeLog)\
-                .join(PracticeLog, Question.id == PracticeLog.question_id)\
-                .filter(PracticeLog.is_correct == False)
+MISTAKE_PAGE_SIZE = 20
 
-    if source_ids:
-        query = query.filter(Question.source_id.in_(source_ids))
+class MistakeEntry(QuestionDataMixin):
+    """
+    错题本中的一行：一道题（而不是一次答错），附带所属知识源名称、答错次数、最近一次答错的时间和答案。
+    只含普通字段，可以跨进程缓存；题干、正确答案等沿用 QuestionDataMixin 的访问器。
+    """
+    def __init__(self, id, source_id, source_name, question_type, content, answer, analysis, knowledge_tag,
+                 mistake_count, last_wrong_at, last_wrong_answer):
+        self.id = id
+        self.source_id = source_id
+        self.source_name = source_name or "未知来源"
+        self.question_type = question_type
+        self.content = content
+        self.answer = answer
+        self.analysis = analysis
+        self.knowledge_tag = knowledge_tag
+        self.mistake_count = mistake_count
+        self.last_wrong_at = last_wrong_at
+        self.last_wrong_answer = last_wrong_answer
+
+def _log_date_range(logs, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None) -> list:
+    """练习记录的日期条件；practice_logs 按月分区，带上这些条件的查询只扫描范围内的分区。"""
+    criteria = []
     if start_date:
-        query = query.filter(PracticeLog.timestamp >= start_date)
+        criteria.append(logs.timestamp >= start_date)
     if end_date:
-        query = query.filter(PracticeLog.timestamp < end_date + datetime.timedelta(days=1))
+        criteria.append(logs.timestamp < end_date + datetime.timedelta(days=1))
+    return criteria
 
-    mistakes = query.order_by(PracticeLog.timestamp.desc()).all()
-    
-    grouped_mistakes = {}
-    source_cache = {} # 缓存文件名查询结果
-    for question, log in mistakes:
-        source_id = question.source_id
-        if source_id not in grouped_mistakes:
-            if source_id not in source_cache:
-                source = db.query(KnowledgeSource).filter(KnowledgeSource.id == source_id).first()
-                source_cache[source_id] = source.filename if source else "未知来源"
-            grouped_mistakes[source_id] = {'name': source_cache[source_id], 'mistakes': []}
-        grouped_mistakes[source_id]['mistakes'].append((question, log))
-        
-    return grouped_mistakes
+def _wrong_logs(logs, query, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None):
+    """
+    在查询上加上“答错”及看板筛选条件；只有按知识源筛选时才需要连接 questions。
+    logs 为 practice_logs_for_range 返回的练习记录实体（日期范围覆盖到已归档的月份时包含归档记录）。
+    """
+    query = query.where(logs.is_correct == False, *_log_date_range(logs, start_date, end_date))
+    if source_ids:
+        query = query.join(Question, logs.question_id == Question.id).where(Question.source_id.in_(source_ids))
+    return query
+
+@cached_analytics
+def get_mistake_summary(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None):
+    """
+    【错题本】按知识源统计错题数（不同题目数）和答错次数，分组和知识源名称都在SQL中完成。
+    """
+    logs = practice_logs_for_range(db, start_date, end_date)
+    query = select(
+        Question.source_id,
+        func.count(func.distinct(logs.question_id)).label('questions'),
+        func.count(logs.id).label('mistakes'),
+    ).join(Question, logs.question_id == Question.id)\
+     .where(logs.is_correct == False, *_log_date_range(logs, start_date, end_date))
+    if source_ids:
+        query = query.where(Question.source_id.in_(source_ids))
+    counts = query.group_by(Question.source_id).subquery()
+
+    results = db.execute(
+        select(counts.c.source_id, KnowledgeSource.filename, counts.c.questions, counts.c.mistakes)
+        .outerjoin(KnowledgeSource, KnowledgeSource.id == counts.c.source_id)
+        .order_by(counts.c.questions.desc())
+    ).all()
+
+    if not results: return pd.DataFrame()
+    return pd.DataFrame([(sid, name or "未知来源", int(q), int(m)) for sid, name, q, m in results],
+                        columns=['source_id', '知识源', '错题数', '答错次数'])
+
+@cached_analytics
+def get_mistake_notebook_page(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None,
+                              cursor: Optional[Tuple[datetime.datetime, int, Optional[int]]] = None, limit: int = MISTAKE_PAGE_SIZE) -> Tuple[List[MistakeEntry], Optional[Tuple[datetime.datetime, int, Optional[int]]]]:
+    """
+    【错题本】按“最近一次答错时间、题目ID”倒序分页，每道题一行。
+    cursor 为上一页返回的 next_cursor（第一页传 None），返回 (本页错题, next_cursor)；没有下一页时 next_cursor 为 None。
+    翻页用键集条件而不是 OFFSET，越往后翻不会越慢。
+    第一页记下当时最大的练习记录ID，放进游标，之后每一页都只统计不超过它的记录，所有页都是同一时刻的快照：
+    翻页期间新增的答错记录不会改变题目的排序位置（否则后面页上的题再次答错后会排到游标之前而被跳过），
+    也不会出现在本轮翻页中，回到第一页后才会看到。
+    """
+    if cursor is None:
+        snapshot_log_id = db.scalar(select(func.max(PracticeLog.id))) # 新记录总是写入在线表
+    else:
+        last_wrong_at, question_id, snapshot_log_id = cursor
+
+    logs = practice_logs_for_range(db, start_date, end_date)
+    grouped = _wrong_logs(
+        logs,
+        select(
+            logs.question_id,
+            func.count(logs.id).label('mistake_count'),
+            func.max(logs.timestamp).label('last_wrong_at'),
+            func.max(logs.id).label('last_log_id'),
+        ),
+        source_ids, start_date, end_date,
+    )
+    if snapshot_log_id is not None:
+        grouped = grouped.where(logs.id <= snapshot_log_id)
+    grouped = grouped.group_by(logs.question_id).subquery()
+
+    query = select(
+        Question.id, Question.source_id, KnowledgeSource.filename.label('source_name'),
+        Question.question_type, Question.content, Question.answer, Question.analysis, Question.knowledge_tag,
+        grouped.c.mistake_count, grouped.c.last_wrong_at, logs.user_answer.label('last_wrong_answer'),
+    ).select_from(grouped)\
+     .join(Question, Question.id == grouped.c.question_id)\
+     .join(logs, and_(logs.id == grouped.c.last_log_id, *_log_date_range(logs, start_date, end_date)))\
+     .outerjoin(KnowledgeSource, KnowledgeSource.id == Question.source_id)
+
+    if cursor is not None:
+        query = query.where(or_(
+            grouped.c.last_wrong_at < last_wrong_at,
+            and_(grouped.c.last_wrong_at == last_wrong_at, grouped.c.question_id < question_id),
+        ))
+
+    rows = db.execute(
+        query.order_by(grouped.c.last_wrong_at.desc(), grouped.c.question_id.desc()).limit(limit + 1)
+    ).all()
+
+    entries = [MistakeEntry(**row._mapping) for row in rows[:limit]]
+    next_cursor = (entries[-1].last_wrong_at, entries[-1].id, snapshot_log_id) if len(rows) > limit else None
+    return entries, next_cursor
+
+def iter_mistake_question_ids(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None,
+                              batch_size: int = 1000) -> Iterator[int]:
+    """
+    【错题本】分批流式返回筛选范围内所有答错过的题目ID（已去重），供“开始本次错题集训”使用，不加载题目内容。
+    """
+    logs = practice_logs_for_range(db, start_date, end_date)
+    query = _wrong_logs(logs, select(logs.question_id).distinct(), source_ids, start_date, end_date)
+    yield from db.execute(query.execution_options(yield_per=batch_size)).scalars()
 
 # src/tutor_app/analytics/dashboard_data.py
 # ... (保留所有已有的 import 和函数)
 
+@cached_analytics
 def get_performance_by_tag(db: Session, source_ids: Optional[List[int]] = None, start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None):
     """
     【全新】按知识点标签聚合分析练习表现。
     """
-    # 基础查询，连接 PracticeLog 和 Question 表
+    # 基础查询：按日汇总表已经带有知识点标签，无需再连接 PracticeLog 和 Question
     query = db.query(
-        Question.knowledge_tag,
-        func.count(PracticeLog.id).label('total'),
-        func.sum(func.cast(PracticeLog.is_correct, Integer)).label('correct')
-    ).join(PracticeLog, PracticeLog.question_id == Question.id)
-
-    # 应用筛选条件
-    if source_ids:
-        # 知识源筛选需要再次 join KnowledgeSource 表
-        query = query.filter(Question.source_id.in_(source_ids))
-    if start_date:
-        query = query.filter(PracticeLog.timestamp >= start_date)
-    if end_date:
-        query = query.filter(PracticeLog.timestamp < end_date + datetime.timedelta(days=1))
+        PracticeDailyRollup.knowledge_tag,
+        func.sum(PracticeDailyRollup.total).label('total'),
+        func.sum(PracticeDailyRollup.correct).label('correct')
+    ).filter(*_rollup_filters(source_ids, start_date, end_date))
 
-    # 过滤掉没有知识点标签的题目
-    query = query.filter(Question.knowledge_tag.isnot(None)).filter(Question.knowledge_tag != '')
+    # 过滤掉没有知识点标签的题目（汇总表中记为空串）
+    query = query.filter(PracticeDailyRollup.knowledge_tag != '')
     
     # 按知识点标签分组
-    results = query.group_by(Question.knowledge_tag).all()
+    results = query.group_by(PracticeDailyRollup.knowledge_tag).all()
     
     if not results:
         return pd.DataFrame()
 
-    df = pd.DataFrame(results, columns=['知识点', '练习次数', '正确次数'])
+    df = pd.DataFrame([(tag, int(total), int(correct)) for tag, total, correct in results], columns=['知识点', '练习次数', '正确次数'])
     df['正确率'] = (df['正确次数'] / df['练习次数'] * 100).round(2)
     return df
 
@@ -164,6 +264,7 @@ def get_knowledge_network_data(db: Session):
 from src.tutor_app.db.models import UserQuestionStats
 from sqlalchemy import select
 
+@cached_analytics
 def get_srs_review_forecast(db: Session, days: int = 30, user_id: int = 1):
     """
     【新增】获取未来一段时间内，每天需要复习的题目数量。
@@ -212,8 +313,8 @@ def get_current_user_stats(db: Session):
     """
     【新增】获取当前用户（单用户模式）的学习总览数据。
     """
-    total_practices = db.query(PracticeLog).count()
-    total_correct = db.query(PracticeLog).filter(PracticeLog.is_correct == True).count()
+    summary = get_practice_summary(db)
+    total_practices, total_correct = summary["total"], summary["correct"]
     
     return {
         "username": "我 (You)",
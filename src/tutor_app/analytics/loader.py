@@ -0,0 +1,94 @@
+# src/tutor_app/analytics/loader.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+from src.tutor_app.core.config import settings
+from src.tutor_app.db.session import SessionLocal
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """进程内共享一个线程池：所有Streamlit会话的看板查询合计最多占用 DASHBOARD_LOADER_MAX_WORKERS 个数据库连接。"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=settings.DASHBOARD_LOADER_MAX_WORKERS,
+                                           thread_name_prefix="dashboard")
+    return _pool
+
+
+@dataclass
+class QueryTiming:
+    """单个查询的耗时。error 不为空表示查询失败，结果已替换为默认值。"""
+    name: str
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class DashboardBundle:
+    """一次页面加载的全部查询结果，以及每个查询的耗时和整体墙钟耗时。"""
+    page: str
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, QueryTiming] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results[name]
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return {name: t.error for name, t in self.timings.items() if t.error}
+
+    @property
+    def serial_seconds(self) -> float:
+        """各查询耗时之和，即串行执行时页面需要等待的时间。"""
+        return sum(t.seconds for t in self.timings.values())
+
+
+def _run_query(name: str, query: Callable[[Session], Any]):
+    # 每个查询使用独立的会话（从连接池取连接），会话不能跨线程共享
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        return query(db), QueryTiming(name, time.perf_counter() - start)
+    except Exception as e:
+        db.rollback()
+        message = str(e).splitlines()[0] if str(e) else ""  # 数据库异常会附带整段SQL，只保留第一行
+        return None, QueryTiming(name, time.perf_counter() - start, error=f"{type(e).__name__}: {message}")
+    finally:
+        db.close()
+
+
+def load_dashboard_data(page: str, queries: Dict[str, Callable[[Session], Any]],
+                        defaults: Optional[Dict[str, Any]] = None) -> DashboardBundle:
+    """
+    【看板并发加载】queries 为 {名称: f(db)}，各查询互不依赖，在共享线程池中并发执行，
+    页面等待时间取决于最慢的一个查询而不是所有查询之和。
+    某个查询失败不会影响其它查询：它的结果取 defaults 中的默认值（没有则为None），错误记录在耗时信息里。
+    返回的ORM对象所属会话已关闭，只能读取已加载的字段。
+    """
+    defaults = defaults or {}
+    bundle = DashboardBundle(page=page)
+    start = time.perf_counter()
+    futures = {name: _get_pool().submit(_run_query, name, query) for name, query in queries.items()}
+    for name, future in futures.items():
+        result, timing = future.result()
+        bundle.results[name] = defaults.get(name) if timing.error else result
+        bundle.timings[name] = timing
+    bundle.wall_seconds = time.perf_counter() - start
+
+    detail = ", ".join(f"{t.name}={t.seconds * 1000:.0f}ms" + (" (失败)" if t.error else "")
+                       for t in bundle.timings.values())
+    print(f"Dashboard load [{page}]: wall={bundle.wall_seconds * 1000:.0f}ms, "
+          f"serial={bundle.serial_seconds * 1000:.0f}ms; {detail}")
+    for name, error in bundle.errors.items():
+        print(f"Warning: Dashboard query '{name}' failed: {error}")
+    return bundle
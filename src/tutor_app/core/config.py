@@ -14,6 +14,56 @@ class Settings(BaseSettings):
     EMBEDDING_CHUNK_SIZE: int
     EMBEDDING_CHUNK_OVERLAP: int
 
+    # 每个进程同时发往Ollama的最大请求数
+    LLM_MAX_CONCURRENT_REQUESTS: int = 4
+    EMBEDDING_MAX_CONCURRENT_REQUESTS: int = 4
+
+    # 出题并发调度配置（自适应并发的上下界与初始值）
+    GENERATION_MIN_CONCURRENCY: int = 1
+    GENERATION_MAX_CONCURRENCY: int = 8
+    GENERATION_INITIAL_CONCURRENCY: int = 2
+    # 每次LLM调用生成的题目数量 (1 = 逐题生成)
+    GENERATION_BATCH_SIZE: int = 1
+    # 是否把Pydantic模型的JSON Schema传给Ollama的format参数做约束解码（模型不支持时可关闭）
+    LLM_STRUCTURED_OUTPUT: bool = True
+    # 流式调用时，收到完整且通过校验的JSON对象后立即终止生成（关闭则只统计不终止）
+    LLM_STREAMING_EARLY_STOP: bool = True
+
+    # 简答题评分：固定采样参数（temperature=0 + 固定seed）使评分结果可复现、可缓存
+    GRADING_SEED: int = 42
+    # 批量评分时，一次LLM调用最多评多少个不同的答案
+    GRADING_BATCH_MAX_ANSWERS: int = 8
+
+    # 简答题向量预评分：相似度高于上限直接判“正确”，低于下限直接判“错误”，中间区间才交给大模型
+    PREGRADE_ENABLED: bool = True
+    PREGRADE_CORRECT_THRESHOLD: float = 0.92
+    PREGRADE_WRONG_THRESHOLD: float = 0.30
+    PREGRADE_MIN_ANSWER_CHARS: int = 2
+
+    # 看板统计结果缓存（Redis，所有Streamlit进程共享）；练习数据变化时通过版本号整体失效，TTL只用于回收旧版本的键
+    ANALYTICS_CACHE_ENABLED: bool = True
+    ANALYTICS_CACHE_TTL_SECONDS: int = 3600
+
+    # 看板页面的统计查询并发执行的线程数（每个线程占用一个数据库连接，应不超过连接池大小）
+    DASHBOARD_LOADER_MAX_WORKERS: int = 5
+    # 是否在侧边栏显示每个查询的加载耗时
+    DASHBOARD_DEBUG_PANEL: bool = True
+
+    # 复习调度器："sm2"（经典SM-2）或 "fsrs"（参数由 fit_fsrs_parameters_task 在练习历史上拟合）
+    SRS_SCHEDULER: str = "sm2"
+    # FSRS 安排下次复习时的目标回忆概率，越高复习越频繁
+    FSRS_DESIRED_RETENTION: float = 0.9
+
+    # 待复习队列（每个用户一个Redis有序集合）；关闭或Redis不可用时直接查询 user_question_stats
+    DUE_QUEUE_ENABLED: bool = True
+
+    # 练习记录按月分区（PostgreSQL）：提前建好未来几个月的分区
+    PRACTICE_LOG_PARTITIONS_AHEAD: int = 3
+    # 早于最近几个月的分区导出为Parquet归档后从数据库删除；0 表示不归档
+    PRACTICE_LOG_HOT_MONTHS: int = 12
+    # 归档文件目录（Web进程和Celery Worker都要能读到）
+    PRACTICE_LOG_ARCHIVE_DIR: str = "data/practice_log_archive"
+
     class Config:
         env_file = ".env"
 
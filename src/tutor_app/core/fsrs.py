@@ -0,0 +1,219 @@
+# src/tutor_app/core/fsrs.py
+"""
+FSRS 风格的记忆模型（公式参考 FSRS v4），以及在练习历史上离线拟合其参数的向量化优化器。
+
+每道题的记忆状态为稳定性 S（天，回忆概率降到 90% 所需的时间）和难度 D（1-10）。
+距上次作答 t 天时的回忆概率 R = (1 + FACTOR·t/S)^DECAY；每次作答后按评分更新 S 和 D，
+下次复习间隔取 R 恰好降到目标保持率的那一天。
+
+状态更新函数同时接受标量和 numpy 数组：作答时对单道题 O(1) 计算，
+重放/拟合时与 srs_replay 相同，按题目分组后第 k 步一次处理所有题目的第 k 条记录；
+拟合时还多一个参数维度，两组扰动参数在同一次遍历中一起计算。
+
+拟合使用 SPSA（同时扰动随机逼近）：每轮只需两次损失计算即可估计全部参数的梯度，
+损失为每次复习前预测的回忆概率与实际对错之间的对数损失；每轮只用一批题目，最后在全部记录上比较。
+"""
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.tutor_app.core.srs_replay import GroupedHistory, group_history
+
+DECAY = -0.5
+FACTOR = 19 / 81 # 使 t = S 时 R = 0.9
+MIN_STABILITY = 0.01
+
+# FSRS v4 的默认参数 w0-w16：w0-w3 为首次评分 1-4 时的初始稳定性，w4-w7 控制难度，
+# w8-w10、w15、w16 控制答对后的稳定性增长，w11-w14 控制答错后的稳定性
+DEFAULT_PARAMETERS = [0.4, 0.6, 2.4, 5.8, 4.93, 0.94, 0.86, 0.01, 1.49, 0.14, 0.94, 2.18, 0.05, 0.34, 1.26, 0.29, 2.61]
+PARAMETER_BOUNDS = np.array([
+    (0.1, 100), (0.1, 100), (0.1, 100), (0.1, 100),
+    (1, 10), (0.1, 5), (0.1, 5), (0, 0.5),
+    (0, 3), (0.1, 0.8), (0.01, 2.5),
+    (0.5, 5), (0.01, 0.2), (0.01, 0.9), (0.01, 2),
+    (0, 1), (1, 4),
+], dtype=np.float64)
+
+
+def quality_to_rating(quality):
+    """刷题页的自评 0-5 映射到 FSRS 的 1-4 评分：<3 忘记(1)，3 模糊(2)，4 掌握(3)，5 简单(4)。"""
+    return np.where(np.asarray(quality) < 3, 1, np.asarray(quality) - 1)
+
+
+def retrievability(elapsed_days, stability):
+    return (1 + FACTOR * np.asarray(elapsed_days) / stability) ** DECAY
+
+
+def initial_state(w: Sequence, rating):
+    """首次作答后的 (S, D)。w 的每一项可以是标量，也可以是 (参数组数, 1) 的数组。"""
+    stability = np.select([rating == 1, rating == 2, rating == 3], [w[0], w[1], w[2]], w[3])
+    difficulty = np.clip(w[4] - (rating - 3) * w[5], 1, 10)
+    return np.maximum(stability, MIN_STABILITY), difficulty
+
+
+def next_state(w: Sequence, stability, difficulty, rating, elapsed_days):
+    """再次作答后的 (S, D)，以及作答前预测的回忆概率 R。"""
+    r = retrievability(elapsed_days, stability)
+    recall = stability * (1 + np.exp(w[8]) * (11 - difficulty) * stability ** -w[9] * (np.exp(w[10] * (1 - r)) - 1)
+                          * np.where(rating == 2, w[15], 1) * np.where(rating == 4, w[16], 1))
+    forget = w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * np.exp(w[14] * (1 - r))
+    new_stability = np.where(rating > 1, recall, np.minimum(forget, stability))
+    new_difficulty = np.clip(w[7] * w[4] + (1 - w[7]) * (difficulty - w[6] * (rating - 3)), 1, 10)
+    return np.maximum(new_stability, MIN_STABILITY), new_difficulty, r
+
+
+def next_interval(stability, desired_retention: float = 0.9):
+    """回忆概率降到 desired_retention 所需的天数，至少1天。"""
+    days = stability / FACTOR * (desired_retention ** (1 / DECAY) - 1)
+    return np.maximum(np.rint(days), 1).astype(np.int64)
+
+
+def _weights(parameters: np.ndarray) -> List:
+    """(P, 17) 的参数矩阵拆成 17 个 (P, 1) 列，与 (P, 题目数) 的状态广播。"""
+    return [parameters[:, i:i + 1] for i in range(parameters.shape[1])]
+
+
+@dataclass
+class FSRSReplayResult:
+    """每道题一行（按 question_id 升序）。"""
+    question_id: np.ndarray
+    repetitions: np.ndarray      # 连续答对次数
+    stability: np.ndarray
+    difficulty: np.ndarray
+    last_review_date: np.ndarray # datetime64[D]
+
+    def __len__(self) -> int:
+        return len(self.question_id)
+
+
+def _run(parameters: np.ndarray, history: GroupedHistory, with_loss: bool):
+    """
+    对 P 组参数同时重放全部记录。返回逐题状态 (S, D, 连续答对次数)（形状 (P, 题目数)，by_length 顺序），
+    以及每组参数的对数损失之和与参与计算的复习次数（只统计与上次间隔至少一天的复习）。
+    """
+    w = _weights(parameters)
+    P, n = parameters.shape[0], len(history.starts)
+    stability = np.zeros((P, n))
+    difficulty = np.zeros((P, n))
+    repetitions = np.zeros(n, dtype=np.int64)
+    ratings = quality_to_rating(history.qualities)
+    group_starts = history.group_starts
+    loss_sum, reviews = np.zeros(P), 0
+
+    for k, active in enumerate(history.active_counts):
+        idx = group_starts[:active] + k
+        rating = ratings[idx]
+        repetitions[:active] = np.where(rating > 1, repetitions[:active] + 1, 0)
+        if k == 0:
+            stability[:, :active], difficulty[:, :active] = initial_state(w, rating)
+            continue
+        elapsed = history.days[idx] - history.days[idx - 1]
+        s, d, r = next_state(w, stability[:, :active], difficulty[:, :active], rating, elapsed)
+        if with_loss:
+            counted = elapsed > 0
+            p = np.clip(r[:, counted], 1e-6, 1 - 1e-6)
+            recalled = rating[counted] > 1
+            loss_sum -= np.where(recalled, np.log(p), np.log(1 - p)).sum(axis=1)
+            reviews += int(counted.sum())
+        stability[:, :active], difficulty[:, :active] = s, d
+    return stability, difficulty, repetitions, loss_sum, reviews
+
+
+def replay_fsrs(question_ids: np.ndarray, qualities: np.ndarray, review_days: np.ndarray,
+                parameters: Optional[Sequence[float]] = None) -> FSRSReplayResult:
+    """按 FSRS 重放练习记录，参数要求同 srs_replay.group_history。"""
+    history = group_history(question_ids, qualities, review_days)
+    parameters = np.asarray(parameters or DEFAULT_PARAMETERS, dtype=np.float64)[None, :]
+    stability, difficulty, repetitions, _, _ = _run(parameters, history, with_loss=False)
+    return FSRSReplayResult(
+        question_id=history.question_ids[history.starts],
+        repetitions=history.restore(repetitions),
+        stability=history.restore(stability[0]),
+        difficulty=history.restore(difficulty[0]),
+        last_review_date=history.last_days.astype("datetime64[D]"),
+    )
+
+
+def log_loss(histories: List[GroupedHistory], parameters: np.ndarray):
+    """P 组参数在若干批记录上的平均对数损失（形状 (P,)）及复习次数。"""
+    total, reviews = np.zeros(parameters.shape[0]), 0
+    for history in histories:
+        _, _, _, loss_sum, count = _run(parameters, history, with_loss=True)
+        total += loss_sum
+        reviews += count
+    return total / max(reviews, 1), reviews
+
+
+@dataclass
+class FSRSFitResult:
+    parameters: List[float]
+    log_loss: float
+    baseline_log_loss: float
+    reviews: int
+    iterations: int
+    seconds: float
+
+
+def _split_batches(question_ids: np.ndarray, qualities: np.ndarray, review_days: np.ndarray,
+                   batch_questions: int, rng) -> List[GroupedHistory]:
+    """按题目随机分成若干批（同一道题的记录总在同一批），每批各自分组一次，迭代时轮流使用。"""
+    unique, inverse = np.unique(question_ids, return_inverse=True)
+    batches = max(1, math.ceil(len(unique) / batch_questions))
+    batch_of_question = rng.integers(0, batches, len(unique))[inverse]
+    return [group_history(question_ids[mask], qualities[mask], review_days[mask])
+            for mask in (batch_of_question == b for b in range(batches))]
+
+
+def fit_fsrs(question_ids: np.ndarray, qualities: np.ndarray, review_days: np.ndarray,
+             iterations: int = 200, batch_questions: int = 50_000, initial: Optional[Sequence[float]] = None,
+             seed: int = 0) -> FSRSFitResult:
+    """
+    用 SPSA 在练习历史上拟合 FSRS 参数（输入要求同 srs_replay.group_history）。
+    参数在各自取值范围内归一化到 [0, 1] 后优化；后一半迭代的参数取平均作为结果，降低随机扰动带来的噪声。
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    question_ids = np.asarray(question_ids, dtype=np.int64)
+    qualities = np.asarray(qualities, dtype=np.int64)
+    review_days = np.asarray(review_days).astype("datetime64[D]").astype(np.int64)
+    batches = _split_batches(question_ids, qualities, review_days, batch_questions, rng)
+
+    low, high = PARAMETER_BOUNDS[:, 0], PARAMETER_BOUNDS[:, 1]
+    to_params = lambda x: low + np.clip(x, 0, 1) * (high - low)
+    baseline = np.asarray(initial or DEFAULT_PARAMETERS, dtype=np.float64)
+    x = (np.clip(baseline, low, high) - low) / (high - low)
+
+    def gradient(x, c, batch):
+        delta = rng.choice([-1.0, 1.0], size=len(x))
+        losses, _ = log_loss([batch], np.stack([to_params(x + c * delta), to_params(x - c * delta)]))
+        return (losses[0] - losses[1]) / (2 * c * delta)
+
+    # 标准 SPSA 增益序列；步长按首批梯度的量级标定，使第一步约移动取值范围的 5%
+    c0, stability_constant = 0.02, max(1, iterations // 10)
+    scale = np.mean([np.abs(gradient(x, c0, batches[i % len(batches)])).mean() for i in range(3)])
+    a0 = 0.05 * (stability_constant + 1) ** 0.602 / max(scale, 1e-12)
+
+    averaged, averaged_count = np.zeros_like(x), 0
+    for k in range(iterations):
+        a = a0 / (k + 1 + stability_constant) ** 0.602
+        c = c0 / (k + 1) ** 0.101
+        x = np.clip(x - a * gradient(x, c, batches[k % len(batches)]), 0, 1)
+        if k >= iterations // 2:
+            averaged += x
+            averaged_count += 1
+    if averaged_count:
+        x = averaged / averaged_count
+
+    fitted = np.round(to_params(x), 4)
+    losses, reviews = log_loss(batches, np.stack([fitted, baseline]))
+    return FSRSFitResult(
+        parameters=[float(v) for v in fitted],
+        log_loss=float(losses[0]),
+        baseline_log_loss=float(losses[1]),
+        reviews=reviews,
+        iterations=iterations,
+        seconds=time.perf_counter() - start,
+    )
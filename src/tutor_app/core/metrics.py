@@ -0,0 +1,59 @@
+# src/tutor_app/core/metrics.py
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict
+
+import redis
+from src.tutor_app.core.redis_client import get_redis
+
+METRICS_KEY = "tutor:metrics:{group}"
+REDIS_RETRY_SECONDS = 30
+
+_local_counters = defaultdict(Counter)
+_lock = threading.Lock()
+_redis_down_until = 0.0
+
+
+def _redis_available() -> bool:
+    return time.monotonic() >= _redis_down_until
+
+
+def _mark_redis_down():
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+
+def incr_metric(group: str, name: str, amount: int = 1):
+    """
+    【计数器】给 group 下的 name 计数加 amount。
+    优先写入Redis哈希（Web进程和所有Worker共享）；Redis不可用时退化为进程内计数，
+    并在 REDIS_RETRY_SECONDS 秒内不再重试，避免每次计数都等待连接超时。
+    """
+    with _lock:
+        _local_counters[group][name] += amount
+    if not _redis_available():
+        return
+    try:
+        get_redis().hincrby(METRICS_KEY.format(group=group), name, amount)
+    except redis.RedisError:
+        _mark_redis_down()
+
+
+def get_metrics(group: str) -> Dict[str, int]:
+    """读取 group 下的全部计数；Redis不可用时只返回本进程的计数。"""
+    if _redis_available():
+        try:
+            raw = get_redis().hgetall(METRICS_KEY.format(group=group))
+            return {key.decode(): int(value) for key, value in raw.items()}
+        except redis.RedisError:
+            _mark_redis_down()
+    with _lock:
+        return dict(_local_counters[group])
+
+
+def get_hit_rates(group: str) -> Dict[str, float]:
+    """把 group 下的计数换算成占比，便于观察各阶段的命中率。"""
+    counts = get_metrics(group)
+    total = sum(counts.values())
+    return {name: count / total for name, count in counts.items()} if total else {}
@@ -1,15 +1,15 @@
 # src/tutor_app/core/mock_data.py
-import json
 import datetime
 from typing import Dict
+from src.tutor_app.db.models import QuestionDataMixin
 
-class MockQuestion:
+class MockQuestion(QuestionDataMixin):
     """一个模拟SQLAlchemy Question对象的类。"""
     def __init__(self, id, question_type, content, answer, analysis):
         self.id = id
         self.question_type = question_type
-        self.content = json.dumps(content)
-        self.answer = json.dumps(answer)
+        self.content = content
+        self.answer = answer
         self.analysis = analysis
         self.created_at = datetime.datetime.utcnow()
 
@@ -76,8 +76,8 @@ def get_mock_questions(type_counts: Dict[str, int]):
                     new_q = MockQuestion(
                         id=f"{question_to_add.id}_{i}", # 关键：创建唯一ID
                         question_type=question_to_add.question_type,
-                        content=json.loads(question_to_add.content),
-                        answer=json.loads(question_to_add.answer),
+                        content=question_to_add.content,
+                        answer=question_to_add.answer,
                         analysis=question_to_add.analysis
                     )
                     output_questions.append(new_q)
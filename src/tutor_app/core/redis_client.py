@@ -0,0 +1,18 @@
+# src/tutor_app/core/redis_client.py
+import threading
+import redis
+from src.tutor_app.core.config import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_redis() -> redis.Redis:
+    """
+    返回进程内共享的Redis客户端（自带连接池）。
+    与Celery使用同一个Redis实例，用于跨进程共享的版本号、缓存和计数器。
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+        return _client
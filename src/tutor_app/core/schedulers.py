@@ -0,0 +1,129 @@
+# src/tutor_app/core/schedulers.py
+"""
+可替换的复习调度器。settings.SRS_SCHEDULER 选择使用哪一个：
+- "sm2"（默认）：经典 SM-2，固定常数，见 srs_logic。
+- "fsrs"：FSRS 风格的记忆模型，参数由 fit_fsrs_parameters_task 在练习历史上离线拟合，
+  没有拟合结果时使用默认参数。
+
+每个调度器提供两种用法：作答时对一条记忆档案做 O(1) 更新（review），
+以及从练习记录批量重放出所有题目的记忆档案（replay，供 rebuild_srs_stats 使用）。
+"""
+import datetime
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src.tutor_app.core import fsrs
+from src.tutor_app.core.config import settings
+from src.tutor_app.core.srs_logic import INITIAL_EASE_FACTOR, update_srs_stats
+from src.tutor_app.core.srs_replay import replay_sm2
+from src.tutor_app.db.models import SchedulerParameters, UserQuestionStats
+
+PARAMETERS_CACHE_SECONDS = 300 # 各进程缓存拟合参数的时间，新拟合的参数最迟这么久后生效
+_parameters_cache: Dict[tuple, tuple] = {}
+
+
+def _date_list(days: np.ndarray) -> List[datetime.date]:
+    # 逐条更新时连续答对十几次就会溢出日期/整数列（会直接报错）；批量重放时截断到列能存下的范围
+    return np.minimum(days.astype("datetime64[D]"), np.datetime64(datetime.date.max)).tolist()
+
+
+class Scheduler(ABC):
+    name = ""
+
+    @abstractmethod
+    def review(self, stats: UserQuestionStats, quality: int, review_date: Optional[datetime.date] = None) -> UserQuestionStats:
+        """一次作答后更新记忆档案（只读写这一条档案本身）。"""
+
+    @abstractmethod
+    def replay(self, question_ids: np.ndarray, qualities: np.ndarray, review_days: np.ndarray) -> Dict[str, list]:
+        """批量重放练习记录，返回 user_question_stats 各列的值（每道题一个元素，按 question_id 升序）。"""
+
+
+class SM2Scheduler(Scheduler):
+    name = "sm2"
+
+    def review(self, stats, quality, review_date=None):
+        # 清掉 FSRS 状态：之后再切换到 FSRS 时从这次作答重新初始化，而不是沿用过期的稳定性
+        stats.stability = stats.difficulty = None
+        return update_srs_stats(stats, quality, review_date)
+
+    def replay(self, question_ids, qualities, review_days):
+        result = replay_sm2(question_ids, qualities, review_days)
+        return {
+            "question_id": result.question_id.tolist(),
+            "repetitions": result.repetitions.tolist(),
+            "ease_factor": result.ease_factor.tolist(),
+            "interval": np.minimum(result.interval, 2**31 - 1).tolist(),
+            "next_review_date": _date_list(result.next_review_date),
+            "last_review_date": _date_list(result.last_review_date),
+            "stability": [None] * len(result),
+            "difficulty": [None] * len(result),
+        }
+
+
+class FSRSScheduler(Scheduler):
+    name = "fsrs"
+
+    def __init__(self, parameters: Optional[List[float]] = None, desired_retention: Optional[float] = None):
+        self.parameters = list(parameters or fsrs.DEFAULT_PARAMETERS)
+        self.desired_retention = desired_retention or settings.FSRS_DESIRED_RETENTION
+
+    def review(self, stats, quality, review_date=None):
+        review_date = review_date or datetime.date.today()
+        rating = int(fsrs.quality_to_rating(quality))
+        if stats.stability is None or stats.difficulty is None:
+            # 新题，或者之前一直由 SM-2 调度：按这次评分初始化
+            stability, difficulty = fsrs.initial_state(self.parameters, rating)
+        else:
+            last_review = stats.last_review_date or (stats.next_review_date - datetime.timedelta(days=stats.interval or 0))
+            elapsed = max((review_date - last_review).days, 0)
+            stability, difficulty, _ = fsrs.next_state(self.parameters, stats.stability, stats.difficulty, rating, elapsed)
+
+        stats.stability, stats.difficulty = float(stability), float(difficulty)
+        stats.repetitions = stats.repetitions + 1 if rating > 1 else 0
+        stats.interval = int(fsrs.next_interval(stats.stability, self.desired_retention))
+        stats.last_review_date = review_date
+        stats.next_review_date = review_date + datetime.timedelta(days=stats.interval)
+        return stats
+
+    def replay(self, question_ids, qualities, review_days):
+        result = fsrs.replay_fsrs(question_ids, qualities, review_days, self.parameters)
+        interval = np.minimum(fsrs.next_interval(result.stability, self.desired_retention), 2**31 - 1)
+        return {
+            "question_id": result.question_id.tolist(),
+            "repetitions": result.repetitions.tolist(),
+            "ease_factor": [INITIAL_EASE_FACTOR] * len(result),
+            "interval": interval.tolist(),
+            "next_review_date": _date_list(result.last_review_date.astype(np.int64) + interval),
+            "last_review_date": _date_list(result.last_review_date),
+            "stability": result.stability.tolist(),
+            "difficulty": result.difficulty.tolist(),
+        }
+
+
+def get_fitted_parameters(db: Session, scheduler: str, user_id: int = 1) -> Optional[List[float]]:
+    """该用户该调度器最新一次拟合的参数，在进程内缓存 PARAMETERS_CACHE_SECONDS 秒。"""
+    key = (scheduler, user_id)
+    cached = _parameters_cache.get(key)
+    if cached and time.monotonic() - cached[0] < PARAMETERS_CACHE_SECONDS:
+        return cached[1]
+    row = db.query(SchedulerParameters)\
+            .filter(SchedulerParameters.user_id == user_id, SchedulerParameters.scheduler == scheduler)\
+            .order_by(SchedulerParameters.created_at.desc()).first()
+    parameters = list(row.parameters) if row else None
+    _parameters_cache[key] = (time.monotonic(), parameters)
+    return parameters
+
+
+def get_scheduler(db: Session, user_id: int = 1, name: Optional[str] = None) -> Scheduler:
+    """按配置（或显式指定的 name）返回调度器；FSRS 使用最新的拟合参数。"""
+    name = name or settings.SRS_SCHEDULER
+    if name == FSRSScheduler.name:
+        return FSRSScheduler(get_fitted_parameters(db, FSRSScheduler.name, user_id))
+    if name == SM2Scheduler.name:
+        return SM2Scheduler()
+    raise ValueError(f"未知的复习调度器: {name}")
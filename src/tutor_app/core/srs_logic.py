@@ -1,12 +1,32 @@
 # src/tutor_app/core/srs_logic.py
 import datetime
+from typing import Optional
 from src.tutor_app.db.models import UserQuestionStats
 
-def update_srs_stats(stats: UserQuestionStats, quality: int) -> UserQuestionStats:
+# SM-2 的初始状态与简易度因子下限（core/srs_replay 的批量重放共用这些定义）
+INITIAL_REPETITIONS = 0
+INITIAL_EASE_FACTOR = 2.5
+INITIAL_INTERVAL = 0
+MIN_EASE_FACTOR = 1.3
+
+def new_srs_stats(question_id: int, user_id: int = 1) -> UserQuestionStats:
+    """
+    创建一条新的记忆档案。初始值显式给出：列上的 default 要到 flush 时才生效，
+    新对象在此之前这些属性都是 None，直接交给 update_srs_stats 会出错。
+    """
+    return UserQuestionStats(user_id=user_id, question_id=question_id, repetitions=INITIAL_REPETITIONS,
+                             ease_factor=INITIAL_EASE_FACTOR, interval=INITIAL_INTERVAL)
+
+def ease_factor_delta(quality: int) -> float:
+    """一次作答后简易度因子 E-Factor 的变化量。"""
+    return (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+def update_srs_stats(stats: UserQuestionStats, quality: int, review_date: Optional[datetime.date] = None) -> UserQuestionStats:
     """
     根据SM-2算法更新一个题目的记忆统计数据。
     quality: 用户对题目掌握程度的评分，范围0-5。
              >= 3 表示回答正确。
+    review_date: 本次作答的日期，下次复习日期从这一天起算；默认今天（重放历史记录时传入记录的日期）。
     """
     if quality >= 3: # 回答正确
         if stats.repetitions == 0:
@@ -22,11 +42,13 @@ def update_srs_stats(stats: UserQuestionStats, quality: int) -> UserQuestionStat
         stats.interval = 1
 
     # 更新简易度因子 E-Factor
-    stats.ease_factor += (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-    if stats.ease_factor < 1.3:
-        stats.ease_factor = 1.3 # E-Factor最低为1.3
+    stats.ease_factor += ease_factor_delta(quality)
+    if stats.ease_factor < MIN_EASE_FACTOR:
+        stats.ease_factor = MIN_EASE_FACTOR # E-Factor最低为1.3
 
     # 计算下一次复习日期
-    stats.next_review_date = datetime.date.today() + datetime.timedelta(days=stats.interval)
+    review_date = review_date or datetime.date.today()
+    stats.last_review_date = review_date
+    stats.next_review_date = review_date + datetime.timedelta(days=stats.interval)
 
-    return stats
\ No newline at end of file
+    return stats
@@ -0,0 +1,127 @@
+# src/tutor_app/core/srs_replay.py
+"""
+SM-2 批量重放：从练习记录（每条带 quality 自评）一次性算出所有题目的记忆状态，
+用于修复数据、调整参数后重算，或导入历史记录后回填 user_question_stats。
+
+同一道题的状态只依赖它自己的作答序列，不同题目之间互不相关。因此按题目分组后，
+第 k 步同时处理“所有至少有 k+1 条记录的题目”的第 k 条记录，每一步都是一组 numpy 向量运算，
+循环次数只等于单题最长的记录条数，而不是记录总数。
+
+每一步的算术与 srs_logic.update_srs_stats 完全相同（同样的 float64 运算顺序、同样的银行家舍入），
+因此逐题结果与依次调用 update_srs_stats 完全一致；下次复习日期从该题最后一条记录的日期起算。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.tutor_app.core.srs_logic import (
+    INITIAL_EASE_FACTOR, INITIAL_INTERVAL, INITIAL_REPETITIONS, MIN_EASE_FACTOR, ease_factor_delta,
+)
+
+# 没有 quality 的旧记录/导入记录按对错推断自评，对应刷题页“掌握了”和“完全忘记”两个按钮
+INFERRED_QUALITY_CORRECT = 4
+INFERRED_QUALITY_WRONG = 0
+
+# quality 0-5 对应的 E-Factor 变化量，直接用 ease_factor_delta 算出，保证与逐条更新逐位相同
+_EASE_DELTA = np.array([ease_factor_delta(q) for q in range(6)], dtype=np.float64)
+
+
+@dataclass
+class GroupedHistory:
+    """
+    按题目分组后的练习记录（各批量算法共用）。记录按 question_id 排序、组内保持时间先后；
+    group_starts / group_lengths 按记录条数降序排列，第 k 步仍有记录的题目恰好是前 active_counts[k] 个。
+    """
+    question_ids: np.ndarray   # 每条记录，int64
+    qualities: np.ndarray      # 每条记录，int64
+    days: np.ndarray           # 每条记录，距 1970-01-01 的天数
+    starts: np.ndarray         # 每道题（question_id 升序）的第一条记录下标
+    lengths: np.ndarray        # 每道题的记录条数
+    by_length: np.ndarray      # 按记录条数降序的题目顺序
+    active_counts: np.ndarray  # 第 k 步参与计算的题目数
+
+    @property
+    def group_starts(self) -> np.ndarray:
+        return self.starts[self.by_length]
+
+    def restore(self, values: np.ndarray) -> np.ndarray:
+        """把按 by_length 顺序排列的逐题结果还原为 question_id 升序。"""
+        return values[..., np.argsort(self.by_length, kind="stable")]
+
+    @property
+    def last_days(self) -> np.ndarray:
+        return self.days[self.starts + self.lengths - 1]
+
+
+def group_history(question_ids: np.ndarray, qualities: np.ndarray, review_days: np.ndarray) -> GroupedHistory:
+    """
+    question_ids / qualities / review_days 为等长数组，每个元素是一条练习记录，必须按时间先后排列
+    （同一道题内的先后顺序决定结果；不同题目的记录可以交错）。
+    review_days 为作答日期，可以是 datetime64[D] 或距 1970-01-01 的天数。
+    """
+    question_ids = np.asarray(question_ids, dtype=np.int64)
+    qualities = np.asarray(qualities, dtype=np.int64)
+    review_days = np.asarray(review_days).astype("datetime64[D]").astype(np.int64)
+    if len(qualities) and (qualities.min() < 0 or qualities.max() > 5):
+        raise ValueError("quality 必须在 0-5 之间")
+
+    # 稳定排序保持组内的时间先后；数据库已按 question_id 排好时跳过排序
+    if np.any(question_ids[1:] < question_ids[:-1]):
+        order = np.argsort(question_ids, kind="stable")
+        question_ids, qualities, review_days = question_ids[order], qualities[order], review_days[order]
+    starts = np.flatnonzero(np.r_[True, question_ids[1:] != question_ids[:-1]]) if len(question_ids) else np.empty(0, dtype=np.int64)
+    lengths = np.diff(np.r_[starts, len(question_ids)])
+
+    by_length = np.argsort(-lengths, kind="stable")
+    longest = lengths[by_length[0]] if len(lengths) else 0
+    active_counts = np.searchsorted(-lengths[by_length], -np.arange(longest), side="left")
+    return GroupedHistory(question_ids, qualities, review_days, starts, lengths, by_length, active_counts)
+
+
+@dataclass
+class SM2ReplayResult:
+    """每道题一行（按 question_id 升序），各字段为等长的 numpy 数组。"""
+    question_id: np.ndarray      # int64
+    repetitions: np.ndarray      # int64
+    ease_factor: np.ndarray      # float64
+    interval: np.ndarray         # int64
+    next_review_date: np.ndarray # datetime64[D]
+    last_review_date: np.ndarray # datetime64[D]
+    reviews: np.ndarray          # int64，参与重放的记录条数
+
+    def __len__(self) -> int:
+        return len(self.question_id)
+
+
+def replay_sm2(question_ids: np.ndarray, qualities: np.ndarray, review_days: np.ndarray) -> SM2ReplayResult:
+    """按 SM-2 重放练习记录，参数要求同 group_history。"""
+    history = group_history(question_ids, qualities, review_days)
+    group_starts = history.group_starts
+
+    n = len(history.starts)
+    repetitions = np.full(n, INITIAL_REPETITIONS, dtype=np.int64)
+    ease_factor = np.full(n, INITIAL_EASE_FACTOR, dtype=np.float64)
+    interval = np.full(n, INITIAL_INTERVAL, dtype=np.int64)
+
+    for k, active in enumerate(history.active_counts):
+        quality = history.qualities[group_starts[:active] + k]
+        reps, ef, ivl = repetitions[:active], ease_factor[:active], interval[:active]
+        correct = quality >= 3
+        # 与 update_srs_stats 相同：先用旧的 E-Factor 算间隔，再更新 E-Factor；np.rint 与 round 同为银行家舍入
+        grown = np.rint(ivl * ef).astype(np.int64)
+        ivl[:] = np.where(correct, np.where(reps == 0, 1, np.where(reps == 1, 6, grown)), 1)
+        reps[:] = np.where(correct, reps + 1, 0)
+        ef += _EASE_DELTA[quality]
+        ef[ef < MIN_EASE_FACTOR] = MIN_EASE_FACTOR
+
+    interval = history.restore(interval)
+    last_day = history.last_days
+    return SM2ReplayResult(
+        question_id=history.question_ids[history.starts],
+        repetitions=history.restore(repetitions),
+        ease_factor=history.restore(ease_factor),
+        interval=interval,
+        next_review_date=(last_day + interval).astype("datetime64[D]"),
+        last_review_date=last_day.astype("datetime64[D]"),
+        reviews=history.lengths,
+    )
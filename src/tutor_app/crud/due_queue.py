@@ -0,0 +1,197 @@
+# src/tutor_app/crud/due_queue.py
+"""
+【待复习队列】每个用户一个 Redis 有序集合：成员是题目ID，分数是下次复习日期（距 1970-01-01 的天数）。
+
+- 主页的“今日待复习数”= ZCOUNT(-inf, 今天)，O(log n)，不再对 user_question_stats 计数；
+- 智能复习的“下 n 道到期题”= ZRANGEBYSCORE ... LIMIT n，O(log n + n)，最早到期的排在前面。
+
+写入路径（作答、更新记忆状态）在数据库提交之后用 ZADD 同步分数；重建用 WATCH 检测重建期间的写入，冲突时重读数据库。
+队列是否可用由一个“就绪”标记表示：
+标记不存在（Redis 刚启动、批量重建了记忆档案、删除了知识源）时，第一次读取会从数据库整体重建该用户的队列；
+Redis 不可用时所有读取直接回退到数据库查询。取题时会用数据库核对一遍，核对出的过期条目顺手修正；
+每晚的 reconcile_due_queues_task 再整体对账一次，兜住其余的漂移。
+"""
+import datetime
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from src.tutor_app.core.config import settings
+from src.tutor_app.core.redis_client import get_redis
+from src.tutor_app.db.models import UserQuestionStats, epoch_day
+
+QUEUE_KEY = "tutor:due:{user_id}"
+READY_KEY = "tutor:due:ready:{user_id}"
+BUILD_KEY = "tutor:due:building:{user_id}:{token}"
+REBUILD_FETCH_SIZE = 50000 # 重建队列时每批读取/写入的题目数
+REBUILD_RETRIES = 5 # 重建期间队列被并发写入时的最多尝试次数
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def _day(date: datetime.date) -> int:
+    return (date - EPOCH).days
+
+
+def _enabled() -> bool:
+    return settings.DUE_QUEUE_ENABLED
+
+
+def _stats_scores(db: Session, user_id: int, question_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """数据库中（指定题目的）记忆档案的下次复习日期，{题目ID: 天数}。"""
+    stmt = select(UserQuestionStats.question_id, epoch_day(UserQuestionStats.next_review_date))\
+        .where(UserQuestionStats.user_id == user_id, UserQuestionStats.next_review_date.isnot(None))
+    if question_ids is not None:
+        stmt = stmt.where(UserQuestionStats.question_id.in_(question_ids))
+    result = db.execute(stmt.execution_options(yield_per=REBUILD_FETCH_SIZE))
+    return {question_id: day for rows in result.partitions() for question_id, day in rows}
+
+
+def rebuild_due_queue(db: Session, user_id: int = 1) -> Dict[str, int]:
+    """
+    从 user_question_stats 整体重建一个用户的队列：写入临时键后 RENAME 原子替换，并置就绪标记。
+    返回题目数，以及与旧队列相比新增/删除/分数变化的条目数（对账时即为漂移量）。
+
+    读数据库之前先 WATCH 正式键：重建期间有 schedule_reviews 写入时（它的数据库提交可能晚于这里的读取），
+    替换会失败并重新读库重建，而不是用旧快照覆盖掉新写入的分数。重试 REBUILD_RETRIES 次仍冲突时抛出 WatchError。
+    """
+    client = get_redis()
+    key = QUEUE_KEY.format(user_id=user_id)
+    with client.pipeline(transaction=True) as pipe:
+        for _ in range(REBUILD_RETRIES):
+            build_key = BUILD_KEY.format(user_id=user_id, token=time.time_ns())
+            try:
+                pipe.watch(key)
+                old = {int(member): int(score) for member, score in pipe.zrange(key, 0, -1, withscores=True)}
+                scores = _stats_scores(db, user_id)
+                items = list(scores.items())
+                build = client.pipeline(transaction=False)
+                for start in range(0, len(items), REBUILD_FETCH_SIZE):
+                    build.zadd(build_key, dict(items[start:start + REBUILD_FETCH_SIZE]))
+                build.execute()
+
+                pipe.multi()
+                if items:
+                    pipe.rename(build_key, key)
+                else:
+                    pipe.delete(key)
+                pipe.set(READY_KEY.format(user_id=user_id), 1)
+                pipe.execute()
+                break
+            except redis.WatchError:
+                client.delete(build_key)
+        else:
+            raise redis.WatchError(f"用户 {user_id} 的待复习队列重建期间持续有写入，放弃本次重建")
+
+    return {
+        "questions": len(scores),
+        "added": len(scores.keys() - old.keys()),
+        "removed": len(old.keys() - scores.keys()),
+        "changed": sum(1 for question_id in scores.keys() & old.keys() if scores[question_id] != old[question_id]),
+    }
+
+
+def _ready_queue(db: Session, user_id: int) -> Optional[str]:
+    """返回可直接读取的队列键；未就绪时先重建；Redis 不可用或关闭时返回 None（调用方回退到数据库）。"""
+    if not _enabled():
+        return None
+    try:
+        if not get_redis().exists(READY_KEY.format(user_id=user_id)):
+            rebuild_due_queue(db, user_id)
+    except redis.RedisError as e:
+        print(f"Warning: Due queue unavailable, falling back to database: {e}")
+        return None
+    return QUEUE_KEY.format(user_id=user_id)
+
+
+def schedule_reviews(user_id: int, reviews: Iterable[Tuple[int, datetime.date]]):
+    """
+    记忆档案更新并提交之后调用：把 (题目ID, 下次复习日期) 写入队列。
+    队列未就绪时也照常写入（未就绪的队列不会被读取）：这样并发进行的重建一定能通过 WATCH 发现这次写入。
+    写入失败时撤销就绪标记，下次读取时整体重建。
+    """
+    if not _enabled():
+        return
+    scores = {question_id: _day(date) for question_id, date in reviews if date is not None}
+    if not scores:
+        return
+    try:
+        get_redis().zadd(QUEUE_KEY.format(user_id=user_id), scores)
+    except redis.RedisError as e:
+        print(f"Warning: Failed to update due queue: {e}")
+        invalidate_due_queues([user_id])
+
+
+def invalidate_due_queues(user_ids: Optional[Iterable[int]] = None):
+    """批量改写或删除记忆档案之后调用：撤销（指定用户或全部用户的）就绪标记，下次读取时从数据库重建。"""
+    if not _enabled():
+        return
+    try:
+        client = get_redis()
+        keys = [READY_KEY.format(user_id=user_id) for user_id in user_ids] if user_ids is not None \
+            else list(client.scan_iter(READY_KEY.format(user_id="*")))
+        if keys:
+            client.delete(*keys)
+    except redis.RedisError as e:
+        print(f"Warning: Failed to invalidate due queues: {e}")
+
+
+def count_due(db: Session, user_id: int = 1, today: Optional[datetime.date] = None) -> int:
+    """
+    今天及之前到期的题目数：ZCOUNT(-inf, 今天)，在跳表上定位区间两端，O(log n)，不是 O(1)。
+    “到期”取决于查询当天的日期，题目会随日期推移自动变成到期，维护一个到期计数器就得在每天开始时
+    把当天到期的条目并进来（按天分桶再求和），写入路径和对账都要跟着变复杂；
+    而 O(log n) 对十万级的队列也只是几十次比较，耗时以网络往返为主，所以直接用 ZCOUNT。
+    """
+    today = today or datetime.date.today()
+    key = _ready_queue(db, user_id)
+    if key is not None:
+        try:
+            return get_redis().zcount(key, "-inf", _day(today))
+        except redis.RedisError as e:
+            print(f"Warning: Due queue unavailable, falling back to database: {e}")
+    return db.query(func.count(UserQuestionStats.id))\
+             .filter(UserQuestionStats.user_id == user_id, UserQuestionStats.next_review_date <= today)\
+             .scalar()
+
+
+def next_due_question_ids(db: Session, user_id: int = 1, count: int = 20,
+                          today: Optional[datetime.date] = None) -> List[int]:
+    """
+    最早到期的至多 count 道题的ID（今天及之前到期，按到期日期排序）。
+    队列中的条目先用数据库核对：已不再到期或档案已删除的条目按数据库修正后再补取一次。
+    """
+    if count <= 0:
+        return []
+    today = today or datetime.date.today()
+    key = _ready_queue(db, user_id)
+    if key is not None:
+        try:
+            client = get_redis()
+            for _ in range(2):
+                candidates = [int(member) for member in client.zrangebyscore(key, "-inf", _day(today), start=0, num=count)]
+                actual = _stats_scores(db, user_id, candidates) if candidates else {}
+                due = [question_id for question_id in candidates if actual.get(question_id, _day(today) + 1) <= _day(today)]
+                stale = [question_id for question_id in candidates if question_id not in actual]
+                if stale:
+                    client.zrem(key, *stale)
+                if len(due) == len(candidates):
+                    return due
+                if actual:
+                    client.zadd(key, actual)
+            return due
+        except redis.RedisError as e:
+            print(f"Warning: Due queue unavailable, falling back to database: {e}")
+
+    return db.scalars(select(UserQuestionStats.question_id)
+                      .where(UserQuestionStats.user_id == user_id, UserQuestionStats.next_review_date <= today)
+                      .order_by(UserQuestionStats.next_review_date, UserQuestionStats.question_id)
+                      .limit(count)).all()
+
+
+def due_queue_user_ids(db: Session) -> List[int]:
+    """有记忆档案的所有用户。"""
+    return db.scalars(select(UserQuestionStats.user_id).distinct()).all()
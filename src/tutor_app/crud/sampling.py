@@ -0,0 +1,158 @@
+# src/tutor_app/crud/sampling.py
+import random
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, and_, exists, func, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from src.tutor_app.db.models import Question, UserQuestionState
+
+
+def mode_criteria(mode: str, user_id: int = 1) -> list:
+    """
+    把刷题模式转换为 Question 上的过滤条件。
+    查询维护好的 user_question_state（每道做过的题一行）：只刷新题按主键 (user_id, question_id) 探测，
+    只刷错题走 wrong_count > 0 的部分索引，不再对全部练习记录做反连接。
+    """
+    if mode == "只刷新题":
+        return [~exists().where(UserQuestionState.user_id == user_id,
+                                UserQuestionState.question_id == Question.id)]
+    if mode == "只刷错题":
+        return [exists().where(UserQuestionState.user_id == user_id,
+                               UserQuestionState.question_id == Question.id,
+                               UserQuestionState.wrong_count > 0)]
+    return [] # 混合模式
+
+
+def random_key_expression(db: Session):
+    """
+    在数据库里生成 [0, 1) 随机键的 SQL 表达式，供批量重新生成 random_key 使用。
+    PostgreSQL 的 random() 本身就是 [0, 1) 的浮点数；SQLite 的 random() 返回有符号64位整数，
+    按迁移 m0001 的写法换算到 [0, 1)，否则键会落在抽题的起点范围之外。
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return func.random()
+    return func.random() / 18446744073709551616.0 + 0.5
+
+
+SAMPLE_SMALL_POOL = 500 # 题池不超过这么多道时直接 ORDER BY random()，代价与题池大小成正比，可以接受
+SAMPLE_OVERDRAW = 3 # 大题池时候选题的期望数量是要抽题数的几倍
+SAMPLE_MAX_INTERVALS = 64 # 每组最多取几个随机区间（每个区间两个绑定参数，多个题型合计要低于老版本 SQLite 的999个参数上限）
+SAMPLE_PASSES = 3 # 大题池候选不够时重新取区间的次数，之后退回 ORDER BY random()
+
+
+def _pool_probe(groups: List[Tuple[list, int]]):
+    """
+    每组取 random_key 最小的至多 SAMPLE_SMALL_POOL 道题，返回 (组号, 道数, 其中最大的 random_key)。
+    道数不足 SAMPLE_SMALL_POOL 说明整个题池就这么大；否则随机键在 [0, 1) 上均匀分布，
+    最大键 / SAMPLE_SMALL_POOL 就是相邻两道题随机键的平均间隔。沿索引读，代价有上限。
+    """
+    probes = []
+    for rank, (criteria, _) in enumerate(groups):
+        lowest = select(Question.random_key).where(*criteria)\
+            .order_by(Question.random_key).limit(SAMPLE_SMALL_POOL).subquery()
+        probes.append(select(literal(rank, Integer).label("rank"), func.count(), func.max(lowest.c.random_key)))
+    return union_all(*probes)
+
+
+def _candidates(rank: int, need: int, criteria: list, spacing: Optional[float]):
+    """
+    一组的候选题，返回 select(type_rank, quota, id)。
+
+    spacing 为 None（小题池）时候选就是整个题池。否则取 m 个起点均匀随机的区间 [lo, lo + width)
+    （越过 1 的部分绕回 [0, ...)），候选是随机键落在任一区间里的题。不管随机键怎样分布，
+    一道题落在某个区间里的概率都恰好等于 width，与它和相邻题目的间隔无关；
+    区间宽度按平均间隔设定，期望共有 need * SAMPLE_OVERDRAW 道候选。
+    """
+    columns = (literal(rank, Integer).label("type_rank"), literal(need, Integer).label("quota"),
+               Question.id.label("id"))
+    intervals = min(need * SAMPLE_OVERDRAW, SAMPLE_MAX_INTERVALS)
+    width = spacing * need * SAMPLE_OVERDRAW / intervals if spacing is not None else 1.0
+    if width * intervals >= 0.5: # 要抽的题占了题池的一大部分，区间会覆盖大半个键空间，不如直接全取
+        return select(*columns).where(*criteria)
+
+    ranges = []
+    for _ in range(intervals):
+        lo = random.random()
+        ranges.append(and_(Question.random_key >= lo, Question.random_key < lo + width))
+        if lo + width > 1:
+            ranges.append(Question.random_key < lo + width - 1)
+    # 写成区间的 OR（而不是与一张区间表连接），规划器按每个区间的实际边界估算行数，对随机键索引做多段范围扫描
+    return select(*columns).where(*criteria, or_(*ranges))
+
+
+def _sample_groups(db: Session, groups: List[Tuple[list, int]]) -> List[List[Question]]:
+    """
+    为每组 (criteria, count) 不放回地均匀抽取至多 count 道题，所有组合在同一条语句里：
+    各组候选 UNION ALL 后，用 row_number() OVER (PARTITION BY 组 ORDER BY random()) 截取各组的配额。
+    大题池的候选偶尔不够配额时，排除已抽到的题重新取区间，SAMPLE_PASSES 次后退回整个题池。
+    """
+    spacing = {}
+    for rank, size, largest in db.execute(_pool_probe(groups)):
+        spacing[rank] = largest / SAMPLE_SMALL_POOL if size >= SAMPLE_SMALL_POOL else None
+    picked = [[] for _ in groups]
+    done = set()
+    for attempt in range(SAMPLE_PASSES + 1):
+        pending = [rank for rank, (_, count) in enumerate(groups) if rank not in done and len(picked[rank]) < count]
+        if not pending:
+            break
+        candidates = []
+        for rank in pending:
+            criteria, count = groups[rank]
+            if picked[rank]:
+                criteria = [*criteria, Question.id.notin_([question.id for question in picked[rank]])]
+            full = spacing[rank] is None or attempt == SAMPLE_PASSES
+            candidates.append(_candidates(rank, count - len(picked[rank]), criteria, None if full else spacing[rank]))
+            if full: # 取的是整个题池，抽到多少就是多少
+                done.add(rank)
+        pool = union_all(*candidates).subquery()
+        ranked = select(
+            pool.c.id, pool.c.type_rank, pool.c.quota,
+            func.row_number().over(partition_by=pool.c.type_rank, order_by=func.random()).label("rn"),
+        ).subquery()
+        rows = db.execute(
+            select(Question, ranked.c.type_rank).join(ranked, Question.id == ranked.c.id).where(ranked.c.rn <= ranked.c.quota)
+        ).all()
+        for question, rank in rows:
+            picked[rank].append(question)
+    return picked
+
+
+def sample_questions(db: Session, count: int, *criteria) -> List[Question]:
+    """
+    【随机抽题】从满足 criteria 的题目中不放回地均匀随机抽取至多 count 道，顺序随机。
+
+    题池不超过 SAMPLE_SMALL_POOL 道时就是 ORDER BY random() LIMIT count。更大的题池不对整个过滤结果排序：
+    每道题入库时带一个 [0, 1) 的随机键 random_key，先沿索引读一小段估计相邻随机键的平均间隔，
+    再取约 3 * count 个（至多 SAMPLE_MAX_INTERVALS 个）起点随机的区间，把随机键落在区间里的题作为候选（期望 3 * count 道），
+    从候选里 ORDER BY random() 取 count 道。一道题落进每个区间的概率都是区间宽度，与它在随机键上的间隔无关，
+    因此被抽中的概率是 count / 总数；剩下的偏差只来自候选数量的波动，约为 1 / (3 * count)。
+    一个区间平均只含一道题，但键相邻的两道题偶尔会落进同一个区间：两万道题里抽 20 道时，
+    一对相邻题一起出现的概率约为万分之一（独立抽取时约百万分之一），每晚重新生成随机键后相邻关系随之打散。
+    """
+    if count <= 0:
+        return []
+    questions = _sample_groups(db, [(list(criteria), count)])[0]
+    random.shuffle(questions)
+    return questions
+
+
+def sample_questions_by_type(db: Session, type_counts: Dict[str, int], type_order: List[str], *criteria) -> List[Question]:
+    """
+    【分层随机抽题】按 type_order 的顺序，为每种题型抽取 type_counts 中指定数量的题目。
+
+    每种题型按 sample_questions 的方式各自均匀抽取；各题型的题池估计合在一条语句里，
+    抽题合在另一条语句里（row_number() 按题型分区截取配额），通常只需两次数据库往返。
+    按题型顺序返回，同一题型内的题目顺序随机。
+    """
+    quotas = [(question_type, type_counts[question_type]) for question_type in type_order
+              if type_counts.get(question_type, 0) > 0]
+    if not quotas:
+        return []
+    groups = _sample_groups(db, [([*criteria, Question.question_type == question_type], count)
+                                 for question_type, count in quotas])
+    questions = []
+    for group in groups:
+        random.shuffle(group)
+        questions.extend(group)
+    return questions
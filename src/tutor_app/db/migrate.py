@@ -0,0 +1,118 @@
+# src/tutor_app/db/migrate.py
+"""
+版本化的数据库迁移。
+
+迁移脚本放在 db/migrations/ 下，文件名为 mNNNN_说明.py，每个脚本提供 upgrade(conn) 函数。
+已执行过的版本记录在 schema_migrations 表中，按版本号顺序只执行一次，每个迁移各自在一个事务中完成。
+
+新增的表仍由 Base.metadata.create_all 创建（init_db 中先建表再迁移）；
+迁移负责 create_all 做不到的事：给已有的表加列、加索引、回填数据。因此迁移脚本要写成幂等的，
+既能在旧库上执行，也能在 create_all 刚建好全部结构的新库上执行。
+
+用法（在项目根目录执行）:
+    python -m src.tutor_app.db.migrate           # 执行所有未执行的迁移
+    python -m src.tutor_app.db.migrate --status  # 只查看迁移状态
+"""
+import argparse
+import datetime
+import importlib
+import pkgutil
+import re
+from pathlib import Path
+from typing import List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, exists, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+MIGRATIONS_PACKAGE = "src.tutor_app.db.migrations"
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+_MIGRATION_NAME = re.compile(r"^m(\d{4})_\w+$")
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.datetime.utcnow),
+)
+
+
+def discover_migrations() -> List[Tuple[int, str]]:
+    """返回按版本号排序的 [(版本号, 模块名), ...]。"""
+    migrations = []
+    for module in pkgutil.iter_modules([str(MIGRATIONS_DIR)]):
+        match = _MIGRATION_NAME.match(module.name)
+        if match:
+            migrations.append((int(match.group(1)), module.name))
+    migrations.sort()
+    versions = [version for version, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"迁移版本号重复: {[name for _, name in migrations]}")
+    return migrations
+
+
+def applied_versions(conn: Connection) -> set:
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """执行所有尚未执行的迁移，返回本次执行的迁移名。"""
+    _metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for version, name in discover_migrations():
+        if version in done:
+            continue
+        module = importlib.import_module(f"{MIGRATIONS_PACKAGE}.{name}")
+        print(f"Applying migration {name}...")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name,
+                                                           applied_at=datetime.datetime.utcnow()))
+        applied.append(name)
+    return applied
+
+
+# --- 供迁移脚本使用的小工具 ---
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def has_rows(conn: Connection, column) -> bool:
+    """
+    column 所在的表是否有数据。迁移里只能这样按单列判断，不要 query(模型).first()：
+    迁移执行时表结构可能还落后于 ORM 模型（列由后面的迁移才加上），加载整条记录会直接报错。
+    """
+    return bool(conn.execute(select(exists(select(column)))).scalar())
+
+
+def create_index(conn: Connection, name: str, table: str, columns: str, where: str = None):
+    """幂等地创建索引，PostgreSQL 与 SQLite 通用（两者都支持 IF NOT EXISTS 和部分索引）。"""
+    statement = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+    if where:
+        statement += f" WHERE {where}"
+    conn.exec_driver_sql(statement)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--status", action="store_true", help="只打印迁移状态，不执行")
+    args = parser.parse_args()
+
+    from src.tutor_app.db.session import engine
+    if args.status:
+        _metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            done = applied_versions(conn)
+        for version, name in discover_migrations():
+            print(f"{'[x]' if version in done else '[ ]'} {name}")
+        return
+    applied = run_migrations(engine)
+    print(f"Applied {len(applied)} migration(s).")
+
+
+if __name__ == "__main__":
+    main()
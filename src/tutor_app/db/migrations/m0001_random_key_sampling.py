@@ -0,0 +1,17 @@
+# src/tutor_app/db/migrations/m0001_random_key_sampling.py
+"""题目随机键 random_key 及随机抽题所需的索引（原 init_db.UPGRADE_STATEMENTS）。"""
+from src.tutor_app.db.migrate import create_index, has_column
+
+
+def upgrade(conn):
+    if not has_column(conn, "questions", "random_key"):
+        conn.exec_driver_sql("ALTER TABLE questions ADD COLUMN random_key DOUBLE PRECISION")
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("UPDATE questions SET random_key = random()")
+            conn.exec_driver_sql("ALTER TABLE questions ALTER COLUMN random_key SET NOT NULL")
+        else: # SQLite 的 random() 返回64位整数，换算到 [0, 1)
+            conn.exec_driver_sql("UPDATE questions SET random_key = (random() / 18446744073709551616.0) + 0.5")
+    create_index(conn, "ix_questions_random_key", "questions", "random_key")
+    create_index(conn, "ix_questions_type_random_key", "questions", "question_type, random_key")
+    create_index(conn, "ix_questions_source_random_key", "questions", "source_id, random_key")
+    create_index(conn, "ix_practice_logs_question_id", "practice_logs", "question_id")
@@ -0,0 +1,15 @@
+# src/tutor_app/db/migrations/m0002_backfill_question_state.py
+"""从已有练习记录回填 user_question_state（表本身由 create_all 创建）。"""
+from sqlalchemy.orm import Session
+
+from src.tutor_app.crud.crud_question import rebuild_question_state
+from src.tutor_app.db.migrate import has_rows
+from src.tutor_app.db.models import PracticeLog, UserQuestionState
+
+
+def upgrade(conn):
+    db = Session(bind=conn)
+    if not has_rows(conn, UserQuestionState.question_id) and has_rows(conn, PracticeLog.id):
+        rows = rebuild_question_state(db)
+        print(f"Backfilled user_question_state: {rows} rows.")
+    db.close()
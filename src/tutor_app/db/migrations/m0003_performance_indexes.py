@@ -0,0 +1,34 @@
+# src/tutor_app/db/migrations/m0003_performance_indexes.py
+"""
+为 crud_question 与 analytics/dashboard_data 中的查询补齐索引（与 models.py 中的声明保持一致）。
+
+practice_logs:
+  - (timestamp, is_correct)       看板按日期范围统计练习次数/正确率，可走仅索引扫描
+  - (timestamp) WHERE NOT 正确    错题本按时间倒序列出答错记录
+questions:
+  - (knowledge_tag, source_id)    知识网络 DISTINCT 标签-来源对、按知识点聚合
+  - source_id / question_type     已由 m0001 的 (source_id, random_key)、(question_type, random_key) 覆盖
+knowledge_sources:
+  - filename / status / created_at  上传查重、已完成知识源列表、最近上传列表
+user_question_stats:
+  - (user_id, question_id)        作答时查找/更新SRS状态
+  - (user_id, next_review_date)   今日待复习、复习预测
+  - (user_id, ease_factor)        最难题目排行
+generation_tasks:
+  - source_id / (status, updated_at)  删除知识源、查找中断的出题任务
+"""
+from src.tutor_app.db.migrate import create_index
+
+
+def upgrade(conn):
+    create_index(conn, "ix_practice_logs_timestamp_correct", "practice_logs", '"timestamp", is_correct')
+    create_index(conn, "ix_practice_logs_wrong_timestamp", "practice_logs", '"timestamp"', where="is_correct = false")
+    create_index(conn, "ix_questions_tag_source", "questions", "knowledge_tag, source_id")
+    create_index(conn, "ix_knowledge_sources_filename", "knowledge_sources", "filename")
+    create_index(conn, "ix_knowledge_sources_status", "knowledge_sources", "status")
+    create_index(conn, "ix_knowledge_sources_created_at", "knowledge_sources", "created_at")
+    create_index(conn, "ix_user_question_stats_user_question", "user_question_stats", "user_id, question_id")
+    create_index(conn, "ix_user_question_stats_user_next_review", "user_question_stats", "user_id, next_review_date")
+    create_index(conn, "ix_user_question_stats_user_ease", "user_question_stats", "user_id, ease_factor")
+    create_index(conn, "ix_generation_tasks_source_id", "generation_tasks", "source_id")
+    create_index(conn, "ix_generation_tasks_status_updated_at", "generation_tasks", "status, updated_at")
@@ -0,0 +1,32 @@
+# src/tutor_app/db/migrations/m0004_questions_jsonb.py
+"""
+questions.content / answer 改为原生 JSONB，并解开旧数据的双重编码。
+
+旧代码入库前先 json.dumps，JSON 列里实际存的是一个 JSON 字符串（'"{\\"question\\": ...}"'），
+库内无法按字段过滤，读取时还要再 json.loads 一次。这里把这类行还原成真正的对象。
+"""
+from sqlalchemy import text
+
+COLUMNS = ("content", "answer")
+
+
+def upgrade(conn):
+    if conn.dialect.name == "postgresql":
+        for column in COLUMNS:
+            data_type = conn.execute(text(
+                "SELECT data_type FROM information_schema.columns WHERE table_name = 'questions' AND column_name = :c"
+            ), {"c": column}).scalar()
+            if data_type == "json":
+                conn.exec_driver_sql(
+                    f"ALTER TABLE questions ALTER COLUMN {column} TYPE JSONB USING "
+                    f"CASE WHEN json_typeof({column}) = 'string' THEN ({column} #>> '{{}}')::jsonb ELSE {column}::jsonb END"
+                )
+            else:
+                conn.exec_driver_sql(
+                    f"UPDATE questions SET {column} = ({column} #>> '{{}}')::jsonb WHERE jsonb_typeof({column}) = 'string'"
+                )
+    else: # SQLite：JSON 列就是文本，json_extract(列, '$') 取出字符串里的 JSON 文本
+        for column in COLUMNS:
+            conn.exec_driver_sql(
+                f"UPDATE questions SET {column} = json_extract({column}, '$') WHERE json_type({column}) = 'text'"
+            )
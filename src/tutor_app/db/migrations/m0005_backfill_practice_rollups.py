@@ -0,0 +1,15 @@
+# src/tutor_app/db/migrations/m0005_backfill_practice_rollups.py
+"""从已有练习记录回填 practice_daily_rollup（表本身由 create_all 创建）。"""
+from sqlalchemy.orm import Session
+
+from src.tutor_app.crud.crud_question import rebuild_practice_rollups
+from src.tutor_app.db.migrate import has_rows
+from src.tutor_app.db.models import PracticeDailyRollup, PracticeLog
+
+
+def upgrade(conn):
+    db = Session(bind=conn)
+    if not has_rows(conn, PracticeDailyRollup.day) and has_rows(conn, PracticeLog.id):
+        rows = rebuild_practice_rollups(db)
+        print(f"Backfilled practice_daily_rollup: {rows} rows.")
+    db.close()
@@ -0,0 +1,8 @@
+# src/tutor_app/db/migrations/m0006_practice_log_quality.py
+"""practice_logs.quality：智能复习时的掌握程度自评，供 SRS 重放使用。旧记录保持为空。"""
+from src.tutor_app.db.migrate import has_column
+
+
+def upgrade(conn):
+    if not has_column(conn, "practice_logs", "quality"):
+        conn.exec_driver_sql("ALTER TABLE practice_logs ADD COLUMN quality SMALLINT")
@@ -0,0 +1,15 @@
+# src/tutor_app/db/migrations/m0007_fsrs_state.py
+"""user_question_stats 增加最近作答日期和FSRS记忆状态列（scheduler_parameters 表由 create_all 创建）。"""
+from src.tutor_app.db.migrate import has_column
+
+NEW_COLUMNS = (
+    ("last_review_date", "DATE"),
+    ("stability", "DOUBLE PRECISION"),
+    ("difficulty", "DOUBLE PRECISION"),
+)
+
+
+def upgrade(conn):
+    for column, column_type in NEW_COLUMNS:
+        if not has_column(conn, "user_question_stats", column):
+            conn.exec_driver_sql(f"ALTER TABLE user_question_stats ADD COLUMN {column} {column_type}")
@@ -0,0 +1,7 @@
+# src/tutor_app/db/migrations/m0008_partition_practice_logs.py
+"""PostgreSQL 上把 practice_logs 改为按月分区的表（practice_log_archives 表由 create_all 创建）。其它数据库不变。"""
+from src.tutor_app.db.partitions import partition_practice_logs
+
+
+def upgrade(conn):
+    partition_practice_logs(conn)
@@ -1,5 +1,8 @@
 # src/tutor_app/db/models.py
 import datetime
+import json
+import random
+from typing import Any, List
 from sqlalchemy import (
     Column,
     Integer,
@@ -8,36 +11,164 @@ from sqlalchemy import (
     JSON,
     Text,
 )
-from sqlalchemy import Boolean, ForeignKey
+from sqlalchemy import Boolean, ForeignKey, UniqueConstraint, Float, Index, SmallInteger
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql.functions import FunctionElement
 
 Base = declarative_base()
 
+# 题目内容/答案在 PostgreSQL 中存为 JSONB（可在库内按字段过滤、建表达式索引），其他数据库退回通用 JSON
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+
+class json_array_length(FunctionElement):
+    """json_array_length(列, 键)：JSON 对象中某个数组字段的长度，字段不存在时为 NULL。"""
+    type = Integer()
+    name = "json_array_length"
+    inherit_cache = True
+
+@compiles(json_array_length, "postgresql")
+def _json_array_length_postgresql(element, compiler, **kw):
+    column, key = list(element.clauses)
+    return f"jsonb_array_length({compiler.process(column, **kw)} -> {compiler.process(key, **kw)})"
+
+@compiles(json_array_length)
+def _json_array_length_default(element, compiler, **kw): # SQLite
+    column, key = list(element.clauses)
+    return f"json_array_length({compiler.process(column, **kw)}, '$.' || {compiler.process(key, **kw)})"
+
+
+class epoch_day(FunctionElement):
+    """epoch_day(时间列)：日期距 1970-01-01 的天数（整数），批量读出后可直接转成 numpy datetime64[D]。"""
+    type = Integer()
+    name = "epoch_day"
+    inherit_cache = True
+
+@compiles(epoch_day, "postgresql")
+def _epoch_day_postgresql(element, compiler, **kw):
+    (column,) = list(element.clauses)
+    return f"(CAST({compiler.process(column, **kw)} AS DATE) - DATE '1970-01-01')"
+
+@compiles(epoch_day)
+def _epoch_day_default(element, compiler, **kw): # SQLite
+    (column,) = list(element.clauses)
+    return f"CAST(julianday(date({compiler.process(column, **kw)})) - 2440587.5 AS INTEGER)"
+
+
+def decode_json_field(value: Any) -> Any:
+    """兼容旧数据：content/answer 里存的是 json.dumps 之后的字符串时，再解一层。"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return {}
+    return {} if value is None else value
+
+
+class QuestionDataMixin:
+    """
+    题目内容/答案的访问器，供 Question 模型和 mock_data.MockQuestion 共用。
+    content_data / answer_data 每个对象只解码一次并缓存在实例上（原始值被重新赋值时自动失效），
+    页面不再各自 json.loads，判分/展示用的正确答案文本也统一在这里计算。
+    """
+
+    def _decoded(self, field: str) -> Any:
+        raw = getattr(self, field)
+        cache_name = f"_{field}_decoded"
+        cached = self.__dict__.get(cache_name)
+        if cached is None or cached[0] is not raw:
+            cached = (raw, decode_json_field(raw))
+            self.__dict__[cache_name] = cached
+        return cached[1]
+
+    @property
+    def content_data(self) -> dict:
+        return self._decoded("content")
+
+    @property
+    def answer_data(self) -> dict:
+        return self._decoded("answer")
+
+    @property
+    def question_text(self) -> str:
+        """题干：选择/判断/简答题为 question，填空题为 stem。"""
+        content = self.content_data
+        return content.get("question") or content.get("stem") or ""
+
+    @property
+    def options(self) -> List[str]:
+        return self.content_data.get("options") or []
+
+    @property
+    def correct_answer_text(self) -> str:
+        """按题型给出正确答案的展示文本，同时也是客观题判分时比对的文本。"""
+        answer = self.answer_data
+        if self.question_type == "单项选择题":
+            return self.options[answer["correct_option_index"]]
+        if self.question_type == "判断题":
+            return "正确" if answer["correct_answer"] else "错误"
+        if self.question_type == "填空题":
+            return ", ".join(answer["blanks"])
+        if self.question_type == "简答题":
+            return answer["text"]
+        return ""
+
+    @hybrid_property
+    def option_count(self) -> int:
+        return len(self.options)
+
+    @option_count.expression
+    def option_count(cls):
+        return json_array_length(cls.content, "options")
+
+    @hybrid_property
+    def blank_count(self) -> int:
+        return len(self.answer_data.get("blanks") or [])
+
+    @blank_count.expression
+    def blank_count(cls):
+        return json_array_length(cls.answer, "blanks")
+
 class KnowledgeSource(Base):
     __tablename__ = "knowledge_sources"
 
     id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String, nullable=False)
-    status = Column(String, default="pending")  # e.g., pending, processing, completed, failed
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    filename = Column(String, nullable=False, index=True)
+    status = Column(String, default="pending", index=True)  # e.g., pending, processing, completed, failed
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
 
-class Question(Base):
+class Question(QuestionDataMixin, Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
     source_id = Column(Integer, nullable=False) # Foreign key to KnowledgeSource in the future
     question_type = Column(String, nullable=False) # 'multiple_choice', 'short_answer', etc.
-    content = Column(JSON, nullable=False) # For MCQs: {'question': '..', 'options': ['A', 'B', 'C', 'D']}
-    answer = Column(JSON, nullable=False) # For MCQs: {'correct_option': 'A'}
+    content = Column(JSONDocument, nullable=False) # For MCQs: {'question': '..', 'options': ['A', 'B', 'C', 'D']}
+    answer = Column(JSONDocument, nullable=False) # For MCQs: {'correct_option': 'A'}
     analysis = Column(Text, nullable=True) # Detailed explanation
     knowledge_tag = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # 【随机抽题】入库时生成的 [0, 1) 随机键，大题池抽题时按随机区间沿索引取候选，代替对整个题池 ORDER BY random()
+    random_key = Column(Float, nullable=False, default=random.random, index=True)
+
+    __table_args__ = (
+        Index("ix_questions_type_random_key", "question_type", "random_key"),
+        Index("ix_questions_source_random_key", "source_id", "random_key"),
+        Index("ix_questions_tag_source", "knowledge_tag", "source_id"),
+    )
 
 class PracticeLog(Base):
+    """
+    练习记录。PostgreSQL 上按 timestamp 按月分区（迁移 m0008，分区维护见 db/partitions），
+    表上的索引自动建到每个分区；超过保留期的分区导出为 Parquet 归档后删除，记录在 practice_log_archives 中。
+    """
     __tablename__ = "practice_logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
     user_answer = Column(Text, nullable=True)
     is_correct = Column(Boolean, nullable=False)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
@@ -45,6 +176,13 @@ class PracticeLog(Base):
      # 【新增字段】
     ai_score = Column(String, nullable=True)     # e.g., "正确", "部分正确", "错误"
     ai_feedback = Column(Text, nullable=True)    # 存储AI给出的详细评语
+    quality = Column(SmallInteger, nullable=True) # 智能复习的掌握程度自评 (0-5)，SRS重放的输入；其它练习记录为空
+
+    __table_args__ = (
+        Index("ix_practice_logs_timestamp_correct", "timestamp", "is_correct"),
+        Index("ix_practice_logs_wrong_timestamp", "timestamp",
+              postgresql_where=(is_correct == False), sqlite_where=(is_correct == False)),
+    )
 
 # src/tutor_app/db/models.py
 # ... (保留所有已有的模型)
@@ -90,4 +228,122 @@ class UserQuestionStats(Base):
     ease_factor = Column(Float, default=2.5) # 简易度因子
     interval = Column(Integer, default=0) # 下次复习的间隔天数
 
-    next_review_date = Column(Date, default=datetime.date.today, index=True) # 下次应复习的日期
\ No newline at end of file
+    next_review_date = Column(Date, default=datetime.date.today, index=True) # 下次应复习的日期
+    last_review_date = Column(Date, nullable=True) # 最近一次作答的日期
+
+    # FSRS调度器的记忆状态（记忆稳定性/难度），使用SM-2时为空
+    stability = Column(Float, nullable=True)
+    difficulty = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_user_question_stats_user_question", "user_id", "question_id"),
+        Index("ix_user_question_stats_user_next_review", "user_id", "next_review_date"),
+        Index("ix_user_question_stats_user_ease", "user_id", "ease_factor"),
+    )
+
+class GenerationTask(Base):
+    """
+    记录一次出题任务的请求与已入库进度，用于任务中断后的断点续跑。
+    id 使用 Celery 的 task_id。
+    """
+    __tablename__ = "generation_tasks"
+
+    id = Column(String, primary_key=True)
+    source_id = Column(Integer, ForeignKey("knowledge_sources.id"), nullable=False, index=True)
+    type_counts = Column(JSON, nullable=False)   # 请求的题型数量, e.g. {'单项选择题': 10}
+    saved_counts = Column(JSON, nullable=False, default=dict)  # 各题型已入库的数量
+    status = Column(String, default="running")   # running, completed
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_generation_tasks_status_updated_at", "status", "updated_at"),
+    )
+
+class GradingCache(Base):
+    """
+    简答题评分缓存：同一道题下，归一化后相同的答案直接复用已有的AI评分，不再调用大模型。
+    评分使用固定的采样参数（temperature=0 + 固定seed），因此结果可以安全复用。
+    """
+    __tablename__ = "grading_cache"
+    __table_args__ = (UniqueConstraint("question_id", "answer_hash", name="uq_grading_cache_answer"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
+    answer_hash = Column(String(64), nullable=False)   # 归一化答案的SHA-256
+    normalized_answer = Column(Text, nullable=False)
+    ai_score = Column(String, nullable=False)
+    ai_feedback = Column(Text, nullable=True)
+    hits = Column(Integer, default=0, nullable=False)  # 被复用的次数
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class UserQuestionState(Base):
+    """
+    每个 (用户, 题目) 一行的练习状态汇总，与练习记录在同一个事务中维护。
+    刷题模式的筛选（只刷新题 / 只刷错题）按主键或部分索引查这张表，不再扫描全部练习记录。
+    """
+    __tablename__ = "user_question_state"
+
+    user_id = Column(Integer, primary_key=True, default=1)
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    attempted = Column(Boolean, nullable=False, default=True)
+    last_correct = Column(Boolean, nullable=False)
+    wrong_count = Column(Integer, nullable=False, default=0)
+    last_seen = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_user_question_state_wrong", "user_id", "question_id",
+              postgresql_where=(wrong_count > 0), sqlite_where=(wrong_count > 0)),
+    )
+
+class PracticeDailyRollup(Base):
+    """
+    练习记录的按日汇总：每个 (日期, 知识源, 知识点标签, 题型) 一行，在写练习记录的同一个事务中累加。
+    看板的总览/按知识源/按知识点统计直接读这张表，耗时只与天数和标签数有关，不随练习记录增长。
+    没有标签的题目 knowledge_tag 记为空串（主键列不能为NULL），与看板“过滤掉没有标签的题目”一致。
+    """
+    __tablename__ = "practice_daily_rollup"
+
+    day = Column(Date, primary_key=True)   # 练习日期（按 PracticeLog.timestamp，即UTC）
+    source_id = Column(Integer, primary_key=True)
+    knowledge_tag = Column(String, primary_key=True, default="")
+    question_type = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_practice_daily_rollup_source_day", "source_id", "day"),
+    )
+
+class SchedulerParameters(Base):
+    """
+    离线拟合得到的复习调度参数（如FSRS权重），每次拟合追加一行，调度时取该用户该调度器的最新一行。
+    """
+    __tablename__ = "scheduler_parameters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, default=1, nullable=False)
+    scheduler = Column(String, nullable=False)            # e.g., "fsrs"
+    parameters = Column(JSONDocument, nullable=False)     # 参数列表
+    reviews = Column(Integer, nullable=False)             # 参与拟合的复习记录数
+    log_loss = Column(Float, nullable=True)               # 拟合参数在全部记录上的对数损失
+    baseline_log_loss = Column(Float, nullable=True)      # 默认参数的对数损失，用于对比
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_scheduler_parameters_user_scheduler", "user_id", "scheduler", "created_at"),
+    )
+
+class PracticeLogArchive(Base):
+    """
+    已归档的练习记录分区：每个月一行，对应一个 zstd 压缩的 Parquet 文件。
+    按时间范围读取练习记录时（db/partitions.practice_logs_for_range），范围覆盖到的归档会与在线分区合并查询。
+    """
+    __tablename__ = "practice_log_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(Date, nullable=False, unique=True)  # 该月第一天
+    path = Column(String, nullable=False)              # Parquet 文件路径
+    rows = Column(Integer, nullable=False)
+    bytes = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -0,0 +1,331 @@
+# src/tutor_app/db/partitions.py
+"""
+练习记录按月分区与冷数据归档（只在 PostgreSQL 上生效；其它数据库上 practice_logs 保持普通表，这里的函数什么也不做）。
+
+- practice_logs 按 "timestamp" 范围分区，每月一个分区 practice_logs_YYYY_MM，另有一个默认分区兜住范围外的记录。
+  索引定义在父表上，PostgreSQL 自动在每个分区上建同样的索引；带时间条件的查询只扫描范围内的分区。
+- 早于 PRACTICE_LOG_HOT_MONTHS 个月的分区导出为 zstd 压缩的 Parquet 文件后删除，记录在 practice_log_archives 中；
+  restore_partition 可以把归档的月份恢复回数据库。
+- practice_logs_for_range(db, 开始日期, 结束日期) 返回一个与 PracticeLog 同样用法的实体：范围没有覆盖已归档的月份时就是
+  PracticeLog 本身；覆盖到时，把相关归档中范围内的记录载入本事务的临时表，与在线分区 UNION ALL 后一起查询。
+  按时间范围统计练习记录的查询都通过它取表，日常（最近几周）的查询只会碰到最近的分区。
+"""
+import datetime
+import io
+import itertools
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy import column, exists, select, table, text, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, aliased
+
+from src.tutor_app.core.config import settings
+from src.tutor_app.db.models import PracticeLog, PracticeLogArchive, Question
+
+PARENT_TABLE = "practice_logs"
+DEFAULT_PARTITION = "practice_logs_default"
+PARTITION_NAME = "practice_logs_{month:%Y_%m}"
+ARCHIVE_FILE = "practice_logs_{month:%Y_%m}.parquet"
+_PARTITION_PATTERN = re.compile(r"^practice_logs_(\d{4})_(\d{2})$")
+
+# 归档文件的列，与 practice_logs 的列一一对应
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int32()),
+    ("question_id", pa.int32()),
+    ("user_answer", pa.string()),
+    ("is_correct", pa.bool_()),
+    ("timestamp", pa.timestamp("us")),
+    ("ai_score", pa.string()),
+    ("ai_feedback", pa.string()),
+    ("quality", pa.int16()),
+])
+_COLUMN_LIST = ", ".join(f'"{name}"' for name in ARCHIVE_SCHEMA.names)
+_temp_table_ids = itertools.count()
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return datetime.date(day.year, day.month, 1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _is_postgresql(conn) -> bool:
+    return conn.dialect.name == "postgresql" if isinstance(conn, Connection) else conn.get_bind().dialect.name == "postgresql"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if not _is_postgresql(conn):
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"
+    ), {"name": PARENT_TABLE}).scalar()
+
+
+def list_partitions(conn: Connection) -> Dict[datetime.date, str]:
+    """在线的月分区，{该月第一天: 分区表名}（不含默认分区）。"""
+    if not is_partitioned(conn):
+        return {}
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:name)"
+    ), {"name": PARENT_TABLE}).scalars()
+    partitions = {}
+    for name in names:
+        match = _PARTITION_PATTERN.match(name)
+        if match:
+            partitions[datetime.date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return dict(sorted(partitions.items()))
+
+
+def create_partition(conn: Connection, month: datetime.date) -> str:
+    """
+    建立某个月的分区。默认分区里可能已有该月的记录（分区建得不够提前），不能直接 CREATE ... PARTITION OF：
+    先建独立的表，把这些记录从默认分区搬过去，再 ATTACH 为分区（父表上的索引此时自动建到新分区上）。
+    """
+    name = PARTITION_NAME.format(month=month)
+    bounds = {"start": datetime.datetime.combine(month, datetime.time()),
+              "end": datetime.datetime.combine(add_months(month, 1), datetime.time())}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end RETURNING *) '
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+    ))
+    return name
+
+
+def ensure_partitions(conn: Connection, first_month: datetime.date, last_month: datetime.date) -> List[str]:
+    """确保 [first_month, last_month] 之间每个月都有分区（已归档的月份除外），返回新建的分区名。"""
+    if not is_partitioned(conn):
+        return []
+    existing = list_partitions(conn)
+    archived = set(conn.execute(select(PracticeLogArchive.month)).scalars())
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if month not in existing and month not in archived:
+            created.append(create_partition(conn, month))
+        month = add_months(month, 1)
+    return created
+
+
+def partition_practice_logs(conn: Connection):
+    """
+    把普通表 practice_logs 改成按月分区的表（迁移 m0008 调用，已经分区时什么也不做）。
+    主键改为 (id, "timestamp")（分区表的唯一约束必须包含分区键），id 继续使用原来的序列；
+    先搬数据再在父表上建索引，比逐行维护索引快得多。
+    """
+    if not _is_postgresql(conn) or is_partitioned(conn):
+        return
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": PARENT_TABLE}).scalar()
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO practice_logs_unpartitioned"))
+    conn.execute(text("ALTER INDEX IF EXISTS practice_logs_pkey RENAME TO practice_logs_unpartitioned_pkey"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    conn.execute(text(f"""
+        CREATE TABLE {PARENT_TABLE} (
+            id integer NOT NULL DEFAULT nextval('{sequence}'),
+            question_id integer NOT NULL CONSTRAINT practice_logs_question_id_fkey REFERENCES questions (id),
+            user_answer text,
+            is_correct boolean NOT NULL,
+            "timestamp" timestamp without time zone NOT NULL,
+            ai_score varchar,
+            ai_feedback text,
+            quality smallint,
+            PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+    first, last = conn.execute(text('SELECT min("timestamp"), max("timestamp") FROM practice_logs_unpartitioned')).one()
+    this_month = month_start(datetime.date.today())
+    first_month = month_start(first.date()) if first else this_month
+    last_month = max(month_start(last.date()) if last else this_month, this_month)
+    month = first_month
+    while month <= add_months(last_month, settings.PRACTICE_LOG_PARTITIONS_AHEAD):
+        name = PARTITION_NAME.format(month=month)
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                          f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"))
+        month = add_months(month, 1)
+
+    # 没有时间戳的旧记录（理论上没有）落到默认分区
+    conn.execute(text(
+        f"INSERT INTO {PARENT_TABLE} ({_COLUMN_LIST}) "
+        f"SELECT id, question_id, user_answer, is_correct, COALESCE(\"timestamp\", TIMESTAMP 'epoch'), ai_score, ai_feedback, quality "
+        f"FROM practice_logs_unpartitioned"
+    ))
+    conn.execute(text("DROP TABLE practice_logs_unpartitioned"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT_TABLE}.id"))
+
+    conn.execute(text(f"CREATE INDEX ix_practice_logs_id ON {PARENT_TABLE} (id)"))
+    conn.execute(text(f"CREATE INDEX ix_practice_logs_question_id ON {PARENT_TABLE} (question_id)"))
+    conn.execute(text(f'CREATE INDEX ix_practice_logs_timestamp_correct ON {PARENT_TABLE} ("timestamp", is_correct)'))
+    conn.execute(text(f'CREATE INDEX ix_practice_logs_wrong_timestamp ON {PARENT_TABLE} ("timestamp") WHERE is_correct = false'))
+    conn.execute(text(f"ANALYZE {PARENT_TABLE}"))
+
+
+# --- 归档 ---
+
+def _archive_path(month: datetime.date) -> Path:
+    return Path(settings.PRACTICE_LOG_ARCHIVE_DIR) / ARCHIVE_FILE.format(month=month)
+
+
+def _copy_out(db: Session, sql: str) -> pa.Table:
+    """COPY 一条查询的结果（列同 ARCHIVE_SCHEMA）并解析为 Arrow 表。"""
+    buffer = io.BytesIO()
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH CSV", buffer)
+    finally:
+        cursor.close()
+    if not buffer.tell():
+        return ARCHIVE_SCHEMA.empty_table()
+    buffer.seek(0)
+    return pa_csv.read_csv(
+        buffer,
+        read_options=pa_csv.ReadOptions(column_names=ARCHIVE_SCHEMA.names),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types=ARCHIVE_SCHEMA, true_values=["t"], false_values=["f"],
+                                              strings_can_be_null=True, quoted_strings_can_be_null=False),
+    )
+
+
+def _copy_in(db: Session, table_name: str, rows: pa.Table):
+    """把 Arrow 表 COPY 进数据库中的表（CSV 中未加引号的空值为 NULL，字符串都带引号，空串不会变成 NULL）。"""
+    if not rows.num_rows:
+        return
+    buffer = io.BytesIO()
+    pa_csv.write_csv(rows, buffer, pa_csv.WriteOptions(include_header=False, quoting_style="needed"))
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table_name} ({_COLUMN_LIST}) FROM STDIN WITH CSV", buffer)
+    finally:
+        cursor.close()
+
+
+def archive_partition(db: Session, month: datetime.date) -> PracticeLogArchive:
+    """
+    把某个月的分区导出为 Parquet 并删除分区，在一个事务中完成：先锁住分区阻止写入，导出并校验行数，
+    再删除分区、登记归档。任何一步失败都会回滚，分区保持不变（可能留下一个之后会被覆盖的文件）。
+    """
+    month = month_start(month)
+    name = list_partitions(db.connection()).get(month)
+    if name is None:
+        raise ValueError(f"没有 {month:%Y-%m} 的练习记录分区")
+    try:
+        db.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+        rows = _copy_out(db, f"SELECT {_COLUMN_LIST} FROM {name} ORDER BY id")
+        path = _archive_path(month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".parquet.partial")
+        pq.write_table(rows, partial, compression="zstd")
+        if pq.ParquetFile(partial).metadata.num_rows != rows.num_rows:
+            raise RuntimeError(f"归档文件 {partial} 行数校验失败")
+        os.replace(partial, path)
+
+        db.execute(text(f"DROP TABLE {name}"))
+        archive = PracticeLogArchive(month=month, path=str(path), rows=rows.num_rows, bytes=path.stat().st_size)
+        db.add(archive)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"Archived {name}: {archive.rows} rows -> {path} ({archive.bytes / 1e6:.1f} MB)")
+    return archive
+
+
+def restore_partition(db: Session, month: datetime.date) -> int:
+    """把归档的月份恢复回数据库（重建分区并导入），归档文件在提交后删除。返回恢复的行数。"""
+    month = month_start(month)
+    archive = db.query(PracticeLogArchive).filter(PracticeLogArchive.month == month).one()
+    rows = pq.read_table(archive.path, schema=ARCHIVE_SCHEMA)
+    try:
+        db.delete(archive)
+        db.flush()
+        create_partition(db.connection(), month)
+        _copy_in(db, PARENT_TABLE, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    Path(archive.path).unlink(missing_ok=True)
+    return rows.num_rows
+
+
+def maintain_partitions(db: Session, today: Optional[datetime.date] = None) -> dict:
+    """
+    【定时维护】建好当前及之后 PRACTICE_LOG_PARTITIONS_AHEAD 个月的分区；
+    PRACTICE_LOG_HOT_MONTHS > 0 时，把早于最近 PRACTICE_LOG_HOT_MONTHS 个月（含本月）的分区归档。
+    """
+    if not is_partitioned(db.connection()):
+        return {"created": [], "archived": []}
+    this_month = month_start(today or datetime.date.today())
+    created = ensure_partitions(db.connection(), this_month, add_months(this_month, settings.PRACTICE_LOG_PARTITIONS_AHEAD))
+    db.commit()
+
+    archived = []
+    if settings.PRACTICE_LOG_HOT_MONTHS > 0:
+        cutoff = add_months(this_month, 1 - settings.PRACTICE_LOG_HOT_MONTHS)
+        for month in [month for month in list_partitions(db.connection()) if month < cutoff]:
+            archived.append(str(archive_partition(db, month).month))
+    return {"created": created, "archived": archived}
+
+
+# --- 读取 ---
+
+def archives_for_range(db: Session, start_date: Optional[datetime.date] = None,
+                       end_date: Optional[datetime.date] = None) -> List[PracticeLogArchive]:
+    """与 [start_date, end_date]（都可以为空，表示不限）有交集的归档。"""
+    if not _is_postgresql(db):
+        return []
+    query = db.query(PracticeLogArchive)
+    if start_date:
+        query = query.filter(PracticeLogArchive.month >= month_start(start_date))
+    if end_date:
+        query = query.filter(PracticeLogArchive.month <= end_date)
+    return query.order_by(PracticeLogArchive.month).all()
+
+
+def practice_logs_for_range(db: Session, start_date: Optional[datetime.date] = None,
+                            end_date: Optional[datetime.date] = None):
+    """
+    返回覆盖 [start_date, end_date] 的练习记录实体，用法与 PracticeLog 相同（logs.question_id、logs.timestamp ...）。
+    调用方仍然要自己加上时间条件：条件会下推到 UNION ALL 的在线分区一侧，分区裁剪照常生效。
+    载入的临时表在事务结束时删除，因此返回的实体只能在本事务内使用。
+    """
+    archives = archives_for_range(db, start_date, end_date)
+    if not archives:
+        return PracticeLog
+
+    filters = []
+    if start_date:
+        filters.append(("timestamp", ">=", datetime.datetime.combine(start_date, datetime.time())))
+    if end_date:
+        filters.append(("timestamp", "<", datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time())))
+    rows = pa.concat_tables([pq.read_table(archive.path, schema=ARCHIVE_SCHEMA, filters=filters or None)
+                             for archive in archives])
+
+    name = f"archived_practice_logs_{next(_temp_table_ids)}"
+    db.execute(text(f"CREATE TEMP TABLE {name} (LIKE {PARENT_TABLE}) ON COMMIT DROP"))
+    _copy_in(db, name, rows)
+    db.execute(text(f"ANALYZE {name}"))
+
+    columns = PracticeLog.__table__.c
+    archived = table(name, *[column(c.name, c.type) for c in columns])
+    union = union_all(
+        select(*columns),
+        # 归档之后删除的知识源，其题目的记录仍在归档文件里，这里排除掉
+        select(*archived.c).where(exists().where(Question.id == archived.c.question_id)),
+    ).subquery("practice_logs_all")
+    return aliased(PracticeLog, union)
@@ -1,26 +1,158 @@
 # src/tutor_app/llms/llm_factory.py
+import json
+import threading
+from contextlib import contextmanager
 
-from langchain_community.embeddings import OllamaEmbeddings
-from langchain_ollama import ChatOllama
+import httpx
+from langchain_ollama import ChatOllama, OllamaEmbeddings
 from src.tutor_app.core.config import settings
 
-def get_chat_model():
+
+class LLMCallGate:
+    """
+    【进程级并发闸门】限制本进程同时发往Ollama的请求数，并统计在途/排队/完成的调用数。
+    线程安全；在gevent打过补丁的环境下，threading原语同样是greenlet安全的。
+    """
+
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            self.queued += 1
+        self._semaphore.acquire()
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+        ok = False
+        try:
+            yield
+            ok = True
+        except GeneratorExit: # 流式调用被调用方提前关闭（拿到完整JSON后主动停止生成），不算失败
+            ok = True
+            raise
+        finally:
+            # completed 只统计成功的调用，失败（包括被中断的调用）计入 failed
+            with self._lock:
+                self.in_flight -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+CHAT_GATE = LLMCallGate("chat", settings.LLM_MAX_CONCURRENT_REQUESTS)
+EMBEDDING_GATE = LLMCallGate("embedding", settings.EMBEDDING_MAX_CONCURRENT_REQUESTS)
+
+
+class PooledChatOllama(ChatOllama):
+    """所有请求都经过 CHAT_GATE 的 ChatOllama。"""
+
+    def _generate(self, *args, **kwargs):
+        with CHAT_GATE.slot():
+            return super()._generate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        with CHAT_GATE.slot():
+            yield from super()._stream(*args, **kwargs)
+
+
+class PooledOllamaEmbeddings(OllamaEmbeddings):
+    """
+    经过 EMBEDDING_GATE 的 OllamaEmbeddings（langchain_ollama 版，走 /api/embed，一次请求向量化整批文本）。
+    连接池大小通过 client_kwargs 传给底层的 httpx 客户端，实例在进程内共享，因此连接也共享。
+    embed_query 内部调用 embed_documents，同样经过闸门。
+    """
+
+    def embed_documents(self, texts):
+        with EMBEDDING_GATE.slot():
+            return super().embed_documents(texts)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _get_or_create(key, factory):
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+def get_chat_model(temperature: float = 0.7, **model_kwargs):
     """
     返回一个连接到本地Ollama的聊天模型实例。
+    【池化版】相同模型和参数的实例在进程内只创建一次，底层共享同一个httpx连接池。
+    model_kwargs 会原样传给 ChatOllama（例如 seed、num_predict）。
+    """
+    key = ("chat", settings.OLLAMA_CHAT_MODEL, temperature, json.dumps(model_kwargs, sort_keys=True, default=str))
+
+    def factory():
+        shown_kwargs = {k: (v.get("title", "schema") if k == "format" and isinstance(v, dict) else v) for k, v in model_kwargs.items()}
+        print(f"Initializing Ollama Chat Model: {settings.OLLAMA_CHAT_MODEL} (temperature={temperature}, {shown_kwargs})")
+        pool_size = settings.LLM_MAX_CONCURRENT_REQUESTS
+        return PooledChatOllama(
+            base_url=settings.OLLAMA_BASE_URL,
+            model=settings.OLLAMA_CHAT_MODEL,
+            temperature=temperature,
+            client_kwargs={"limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)},
+            **model_kwargs,
+        )
+
+    return _get_or_create(key, factory)
+
+def get_structured_chat_model(schema, temperature: float = 0.7, **model_kwargs):
+    """
+    【结构化输出】返回一个按 schema（Pydantic模型）约束输出格式的聊天模型。
+    JSON Schema 通过Ollama的 format 参数传入，由Ollama在解码时强制输出合法JSON；
+    settings.LLM_STRUCTURED_OUTPUT 关闭时退化为普通聊天模型。
     """
-    print(f"Initializing Ollama Chat Model: {settings.OLLAMA_CHAT_MODEL}")
-    return ChatOllama(
-        base_url=settings.OLLAMA_BASE_URL,
-        model=settings.OLLAMA_CHAT_MODEL,
-        temperature=0.7,
-    )
+    if settings.LLM_STRUCTURED_OUTPUT:
+        model_kwargs["format"] = schema.model_json_schema()
+    return get_chat_model(temperature=temperature, **model_kwargs)
 
 def get_embedding_model():
     """
     【优化版】返回一个使用 .env 中详细配置的嵌入模型实例。
+    【池化版】进程内共享同一个实例和httpx连接池。
     """
-    print(f"Initializing Ollama Embedding Model: {settings.EMBEDDING_MODEL_NAME}")
-    return OllamaEmbeddings(
-        base_url=settings.OLLAMA_BASE_URL,
-        model=settings.EMBEDDING_MODEL_NAME,
-    )
\ No newline at end of file
+    key = ("embedding", settings.EMBEDDING_MODEL_NAME)
+
+    def factory():
+        print(f"Initializing Ollama Embedding Model: {settings.EMBEDDING_MODEL_NAME}")
+        pool_size = settings.EMBEDDING_MAX_CONCURRENT_REQUESTS
+        return PooledOllamaEmbeddings(
+            base_url=settings.OLLAMA_BASE_URL,
+            model=settings.EMBEDDING_MODEL_NAME,
+            client_kwargs={"limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)},
+        )
+
+    return _get_or_create(key, factory)
+
+def get_llm_call_stats() -> dict:
+    """返回本进程LLM/嵌入调用的在途、排队、完成计数，供任务日志或页面展示。"""
+    return {
+        "chat": CHAT_GATE.snapshot(),
+        "embedding": EMBEDDING_GATE.snapshot(),
+        "clients": len(_clients),
+    }
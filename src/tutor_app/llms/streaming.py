@@ -0,0 +1,201 @@
+# src/tutor_app/llms/streaming.py
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from src.tutor_app.core.config import settings
+from src.tutor_app.core.metrics import incr_metric
+
+STREAMING_METRICS_GROUP = "llm_streaming"
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+class IncrementalJSONScanner:
+    """
+    【增量JSON扫描器】逐块接收模型的流式输出，一旦某个顶层 {...} 对象的括号配平，立即返回它的文本。
+    - 跳过 <think>...</think> 思考块（标签可能被切在两个分块之间）；
+    - 字符串内部的括号和转义引号不参与配对；
+    - 对象之外的说明文字直接忽略。
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escaped = False
+        self._in_think = False
+
+    def feed(self, text: str) -> List[str]:
+        """追加一段输出，返回本次新配平的顶层对象文本列表。"""
+        self.buffer += text
+        completed = []
+        buf = self.buffer
+        while self._pos < len(buf):
+            if self._in_think:
+                end = buf.find(THINK_CLOSE, self._pos)
+                if end == -1:
+                    # 结束标签可能被切断，保留末尾几个字符等下一块
+                    self._pos = max(self._pos, len(buf) - len(THINK_CLOSE) + 1)
+                    break
+                self._pos = end + len(THINK_CLOSE)
+                self._in_think = False
+                continue
+
+            ch = buf[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._depth == 0 and ch == '<':
+                head = buf[self._pos:self._pos + len(THINK_OPEN)]
+                if head == THINK_OPEN:
+                    self._in_think = True
+                    self._pos += len(THINK_OPEN)
+                    continue
+                if THINK_OPEN.startswith(head):
+                    break # 可能是被切断的 <think>，等待更多输出
+            elif ch == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif ch == '{':
+                if self._depth == 0:
+                    self._start = self._pos
+                self._depth += 1
+            elif ch == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(buf[self._start:self._pos + 1])
+            self._pos += 1
+        return completed
+
+
+@dataclass
+class StreamResult:
+    text: str                 # 提前终止时为通过校验的对象文本，否则为完整输出
+    tokens: int               # 实际接收的分块数（Ollama流式输出每块约一个token）
+    latency: float
+    early_stopped: bool
+    trailing_tokens: int = 0  # 未提前终止时，对象完成之后模型又多生成的token数
+    tokens_saved: float = 0.0 # 提前终止时，按同类完整调用的平均长度估算节省的token数
+    seconds_saved: float = 0.0
+
+
+class StreamingStats:
+    """按调用类别（generation / grading）累计流式调用的token与耗时，用于估算提前终止的收益。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+
+    def _entry(self, kind: str) -> dict:
+        return self._kinds.setdefault(kind, {
+            "calls": 0, "early_stops": 0, "tokens": 0, "seconds": 0.0,
+            "full_calls": 0, "full_tokens": 0, "trailing_tokens": 0,
+            "tokens_saved": 0.0, "seconds_saved": 0.0,
+        })
+
+    def average_full_tokens(self, kind: str) -> Optional[float]:
+        with self._lock:
+            entry = self._entry(kind)
+            return entry["full_tokens"] / entry["full_calls"] if entry["full_calls"] else None
+
+    def record(self, kind: str, result: StreamResult):
+        with self._lock:
+            entry = self._entry(kind)
+            entry["calls"] += 1
+            entry["tokens"] += result.tokens
+            entry["seconds"] += result.latency
+            if result.early_stopped:
+                entry["early_stops"] += 1
+                entry["tokens_saved"] += result.tokens_saved
+                entry["seconds_saved"] += result.seconds_saved
+            else:
+                entry["full_calls"] += 1
+                entry["full_tokens"] += result.tokens
+                entry["trailing_tokens"] += result.trailing_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {kind: dict(entry) for kind, entry in self._kinds.items()}
+
+
+STREAMING_STATS = StreamingStats()
+
+
+def stream_json(runnable, inputs, validate: Callable[[str], bool], kind: str = "generation",
+                early_stop: Optional[bool] = None) -> StreamResult:
+    """
+    【流式调用】以流式方式调用 runnable（出题链或聊天模型），把输出喂给增量JSON扫描器。
+    收到一个配平且通过 validate 校验的顶层对象后立即关闭流——底层HTTP连接随之断开，
+    Ollama 会停止继续解码。未出现合格对象时读完整个输出，返回完整文本交给常规解析器。
+    early_stop=False 时只测量不截断，用于统计对象完成后模型还多生成了多少token。
+    """
+    if early_stop is None:
+        early_stop = settings.LLM_STREAMING_EARLY_STOP
+    scanner = IncrementalJSONScanner()
+    tokens = 0
+    matched = None
+    matched_at = 0
+    started_at = time.monotonic()
+    stream = runnable.stream(inputs)
+    try:
+        for chunk in stream:
+            text = chunk if isinstance(chunk, str) else chunk.content
+            if not text:
+                continue
+            tokens += 1
+            if matched is not None:
+                continue
+            for candidate in scanner.feed(text):
+                if validate(candidate):
+                    matched, matched_at = candidate, tokens
+                    break
+            if matched is not None and early_stop:
+                break
+    finally:
+        stream.close()
+    latency = time.monotonic() - started_at
+
+    if matched is not None and early_stop:
+        result = StreamResult(text=matched, tokens=tokens, latency=latency, early_stopped=True)
+        average = STREAMING_STATS.average_full_tokens(kind)
+        if average is not None and average > tokens:
+            result.tokens_saved = average - tokens
+            result.seconds_saved = result.tokens_saved * latency / max(tokens, 1)
+        print(f"  [Stream] {kind}: 对象已完整，提前终止。接收 {tokens} tokens，用时 {latency:.1f}s，"
+              f"预计节省 {result.tokens_saved:.0f} tokens / {result.seconds_saved:.1f}s")
+    else:
+        result = StreamResult(text=scanner.buffer, tokens=tokens, latency=latency, early_stopped=False,
+                              trailing_tokens=tokens - matched_at if matched is not None else 0)
+
+    STREAMING_STATS.record(kind, result)
+    incr_metric(STREAMING_METRICS_GROUP, f"{kind}_calls")
+    incr_metric(STREAMING_METRICS_GROUP, f"{kind}_tokens", tokens)
+    if result.early_stopped:
+        incr_metric(STREAMING_METRICS_GROUP, f"{kind}_early_stops")
+        incr_metric(STREAMING_METRICS_GROUP, f"{kind}_tokens_saved", round(result.tokens_saved))
+    elif result.trailing_tokens:
+        incr_metric(STREAMING_METRICS_GROUP, f"{kind}_trailing_tokens", result.trailing_tokens)
+    return result
+
+
+def schema_validator(schema) -> Callable[[str], bool]:
+    """返回一个用 Pydantic 模型校验候选对象文本的函数。"""
+    def validate(text: str) -> bool:
+        try:
+            schema.model_validate_json(text)
+            return True
+        except ValueError: # pydantic.ValidationError 是 ValueError 的子类
+            return False
+    return validate
+
+
+def get_streaming_stats() -> dict:
+    return STREAMING_STATS.snapshot()
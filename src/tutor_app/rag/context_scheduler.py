@@ -0,0 +1,54 @@
+# src/tutor_app/rag/context_scheduler.py
+import random
+from typing import List
+
+from src.tutor_app.rag.registry import get_vectorstore, get_source_handle
+
+
+def list_source_chunks(source_id: int) -> List[str]:
+    """
+    直接按 source_id 元数据从Chroma集合中列出该知识源的全部文本块。
+    只读取文档内容，不需要对查询做向量化，因此不会产生嵌入请求。
+    结果按知识源缓存在 registry 中，知识源重新入库或删除后自动失效。
+    """
+    def load():
+        data = get_vectorstore().get(where={"source_id": str(source_id)}, include=["documents"])
+        return [doc for doc in data.get("documents") or [] if doc and doc.strip()]
+    return get_source_handle(source_id, "chunks", load)
+
+
+class ChunkScheduler:
+    """
+    【上下文调度器】把知识源的文本块分配给各个出题作业，让题目覆盖整篇文档，
+    而不是N道题都出自同一组top-k相似块。
+
+    - "round_robin": 从随机起点开始依次轮转分配。
+    - "coverage":   每次分配给“已分配题数 / 文本长度”最小的块，
+                    长文本块能分到更多题目，短块不会被反复使用。
+    """
+
+    def __init__(self, chunks: List[str], strategy: str = "coverage"):
+        if strategy not in ("round_robin", "coverage"):
+            raise ValueError(f"未知的调度策略: {strategy}")
+        self.chunks = chunks
+        self.strategy = strategy
+        self._usage = [0] * len(chunks)
+        self._weights = [max(len(chunk), 1) for chunk in chunks]
+        self._cursor = random.randrange(len(chunks)) if chunks else 0
+
+    def assign(self, num_questions: int = 1) -> int:
+        """为一个生成 num_questions 道题的作业挑选一个文本块，返回其下标。"""
+        if not self.chunks:
+            raise ValueError("知识源中没有可用于出题的文本块")
+        if self.strategy == "round_robin":
+            index = self._cursor
+            self._cursor = (self._cursor + 1) % len(self.chunks)
+        else:
+            scores = [usage / weight for usage, weight in zip(self._usage, self._weights)]
+            best = min(scores)
+            index = random.choice([i for i, score in enumerate(scores) if score == best])
+        self._usage[index] += num_questions
+        return index
+
+    def context(self, index: int) -> str:
+        return self.chunks[index]
@@ -2,8 +2,13 @@
 
 import json
 import re
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Type
+from pydantic import BaseModel, ValidationError
+from src.tutor_app.core.metrics import incr_metric
 from src.tutor_app.llms.llm_factory import get_chat_model
+from src.tutor_app.rag.json_repair import repair_json_locally, strip_reasoning
+
+PARSER_METRICS_GROUP = "json_parser"
 
 def extract_json_from_text(text: str) -> Optional[str]:
     """
@@ -34,7 +39,7 @@ def repair_json_with_llm(broken_json_string: str) -> str:
     """
     【升级版】使用一个带有更强力Prompt的大模型来修复损坏的JSON字符串。
     """
-    print("  [Parser Stage 4] 常规和程序化修复失败，启动AI终极修复...")
+    print("  [Parser Stage 5] 本地修复失败，启动AI终极修复...")
     llm = get_chat_model()
     
     prompt = f"""
@@ -55,52 +60,180 @@ def repair_json_with_llm(broken_json_string: str) -> str:
     """
     
     try:
-        repaired_string = llm.invoke(prompt)
-        return repaired_string
+        return llm.invoke(prompt).content
     except Exception as e:
-        print(f"  [Parser Stage 4] AI修复JSON时出错: {e}")
+        print(f"  [Parser Stage 5] AI修复JSON时出错: {e}")
         return broken_json_string
 
 def parse_json_with_ai_fallback(llm_output: str) -> Optional[Dict]:
     """
-    【全新四级火箭】一个极其健壮的JSON解析器，具备多重降级修复功能。
+    【五级火箭】一个极其健壮的JSON解析器，具备多重降级修复功能。
+    只有本地确定性修复（第四级）也失败时，才会再调用一次大模型（第五级）。
+    每次解析在哪一级成功都会计入 "json_parser" 计数器，用于观察各级命中率。
     """
+    if hasattr(llm_output, "content"): # 兼容直接传入 llm.invoke() 返回的消息对象
+        llm_output = llm_output.content
     if not llm_output or not isinstance(llm_output, str):
         return None
 
-    # --- 第一级：智能提取 ---
+    # --- 第一级：智能提取 (先去掉<think>思考过程，避免其中的花括号干扰提取) ---
     print("  [Parser Stage 1] 正在提取JSON...")
-    json_string = extract_json_from_text(llm_output)
-    if not json_string:
+    text = strip_reasoning(llm_output)
+    json_string = extract_json_from_text(text)
+
+    if json_string:
+        # --- 第二级：标准解析 ---
+        try:
+            print("  [Parser Stage 2] 正在尝试标准解析...")
+            result = json.loads(json_string)
+            incr_metric(PARSER_METRICS_GROUP, "standard")
+            return result
+        except json.JSONDecodeError:
+            print(f"  [Parser Stage 2] 失败: 标准解析失败。")
+
+        # --- 第三级：程序化修复 (移除结尾逗号) ---
+        try:
+            print("  [Parser Stage 3] 正在尝试程序化修复 (移除结尾逗号)...")
+            result = json.loads(remove_trailing_commas(json_string))
+            incr_metric(PARSER_METRICS_GROUP, "trailing_comma")
+            return result
+        except json.JSONDecodeError:
+            print(f"  [Parser Stage 3] 失败: 程序化修复后解析仍然失败。")
+    else:
+        print(f"  [Parser Stage 1] 未找到完整的JSON对象，可能是输出被截断。")
+
+    # --- 第四级：本地确定性修复 (引号/全角标点/截断/Python字面量等) ---
+    print("  [Parser Stage 4] 正在尝试本地修复...")
+    result = repair_json_locally(text)
+    if isinstance(result, dict):
+        incr_metric(PARSER_METRICS_GROUP, "local_repair")
+        return result
+    print(f"  [Parser Stage 4] 失败: 本地修复后解析仍然失败。")
+
+    if not json_string and '{' not in text:
         print(f"  [Parser Stage 1] 失败: 在文本中未找到JSON对象。")
+        incr_metric(PARSER_METRICS_GROUP, "no_json")
         return None
 
-    # --- 第二级：标准解析 ---
-    try:
-        print("  [Parser Stage 2] 正在尝试标准解析...")
-        return json.loads(json_string)
-    except json.JSONDecodeError:
-        print(f"  [Parser Stage 2] 失败: 标准解析失败。")
+    # --- 第五级：AI终极修复 ---
+    repaired_by_ai_string = repair_json_with_llm(json_string or text)
+    final_json_string = extract_json_from_text(strip_reasoning(repaired_by_ai_string))
+
+    if not final_json_string:
+        print(f"  [Parser Stage 5] 失败: AI修复后未能提取出JSON。")
+        incr_metric(PARSER_METRICS_GROUP, "failed")
+        return None
 
-    # --- 第三级：程序化修复 (移除结尾逗号) ---
     try:
-        print("  [Parser Stage 3] 正在尝试程序化修复 (移除结尾逗号)...")
-        fixed_string = remove_trailing_commas(json_string)
-        return json.loads(fixed_string)
-    except json.JSONDecodeError:
-        print(f"  [Parser Stage 3] 失败: 程序化修复后解析仍然失败。")
+        result = json.loads(final_json_string)
+        incr_metric(PARSER_METRICS_GROUP, "llm_repair")
+        return result
+    except json.JSONDecodeError as e:
+        print(f"  [Parser Stage 5] 失败: AI终极修复后仍然解析失败。最终错误: {e}")
+        print(f"  [Parser Stage 5] 失败的JSON文本: {final_json_string}")
+        incr_metric(PARSER_METRICS_GROUP, "failed")
+        return None
 
-    # --- 第四级：AI终极修复 ---
-    repaired_by_ai_string = repair_json_with_llm(json_string)
-    final_json_string = extract_json_from_text(repaired_by_ai_string)
-    
-    if not final_json_string:
-        print(f"  [Parser Stage 4] 失败: AI修复后未能提取出JSON。")
+# --- 结构化输出: 单步校验 ---
+
+def parse_structured_output(llm_output: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+    """
+    【结构化输出】模型按 format 参数的JSON Schema约束输出时，回复本身就是合法JSON，
+    只需一次 model_validate_json 即可完成解析和校验。
+    失败（例如模型忽略了Schema）时返回None，由调用方退回到多级修复解析器。
+    """
+    if hasattr(llm_output, "content"):
+        llm_output = llm_output.content
+    if not llm_output or not isinstance(llm_output, str):
         return None
+    try:
+        result = schema.model_validate_json(strip_reasoning(llm_output).strip())
+    except ValidationError:
+        print("  [Parser Stage 0] 结构化输出校验失败，退回多级修复解析器...")
+        return None
+    incr_metric(PARSER_METRICS_GROUP, "structured")
+    return result
+
+# --- 批量出题: JSON数组解析 ---
 
+def extract_json_objects(text: str) -> List[str]:
+    """
+    逐字符扫描文本，按括号配对提取所有顶层的 {...} 片段（会跳过字符串内部的括号）。
+    用于在整个数组无法解析时，把其中完好的题目对象逐个抢救出来。
+    """
+    objects = []
+    depth = 0
+    start = None
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == '}' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                objects.append(text[start:i + 1])
+    return objects
+
+def _loads_lenient(json_string: str):
+    """标准解析，失败后依次尝试移除结尾逗号和本地修复，全部失败时抛出 JSONDecodeError。"""
+    try:
+        return json.loads(json_string)
+    except json.JSONDecodeError:
+        pass
     try:
-        return json.loads(final_json_string)
+        return json.loads(remove_trailing_commas(json_string))
     except json.JSONDecodeError as e:
-        print(f"  [Parser Stage 4] 失败: AI终极修复后仍然解析失败。最终错误: {e}")
-        print(f"  [Parser Stage 4] 失败的JSON文本: {final_json_string}")
-        return None
\ No newline at end of file
+        repaired = repair_json_locally(json_string)
+        if repaired is None:
+            raise e
+        return repaired
+
+def parse_json_list_with_ai_fallback(llm_output: str) -> List[Dict]:
+    """
+    【批量出题】把一次LLM调用返回的多道题目解析为字典列表。
+    - 优先按完整的JSON数组解析（也接受 {"questions": [...]} 或单个对象）；
+    - 数组整体损坏时，逐个抢救其中语法完好的对象，坏掉的兄弟元素不影响其余元素。
+    无法解析的元素直接丢弃，调用方可根据返回数量统计失败数。
+    """
+    if not llm_output or not isinstance(llm_output, str):
+        return []
+
+    llm_output = strip_reasoning(llm_output)
+    match = re.search(r'```json\s*([\s\S]*?)\s*```', llm_output)
+    text = match.group(1) if match else llm_output
+
+    start_index = text.find('[')
+    end_index = text.rfind(']')
+    if start_index != -1 and end_index > start_index:
+        try:
+            parsed = _loads_lenient(text[start_index : end_index + 1])
+            dict_items = [item for item in parsed if isinstance(item, dict)] if isinstance(parsed, list) else []
+            if dict_items:
+                return dict_items
+        except json.JSONDecodeError:
+            print("  [List Parser] 数组整体解析失败，逐个抢救题目对象...")
+
+    items = []
+    for object_string in extract_json_objects(text):
+        try:
+            parsed = _loads_lenient(object_string)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict) and isinstance(parsed.get("questions"), list):
+            items.extend(item for item in parsed["questions"] if isinstance(item, dict))
+        elif isinstance(parsed, dict):
+            items.append(parsed)
+    return items
@@ -0,0 +1,191 @@
+# src/tutor_app/rag/json_repair.py
+"""
+【本地JSON修复引擎】确定性地修复qwen3常见的JSON输出错误，避免再调用一次大模型：
+
+- <think>...</think> 思考过程、```json 代码块等多余前后缀
+- 全角标点被当作JSON结构符号：，：“”
+- 单引号字符串
+- 字符串内部未转义的双引号、换行符
+- Python风格的 True / False / None
+- 多余的结尾逗号
+- 输出被截断导致的括号/引号未闭合
+"""
+import json
+import re
+from typing import Any, List, Optional
+
+THINK_BLOCK_RE = re.compile(r'<think>[\s\S]*?</think>', re.IGNORECASE)
+CODE_FENCE_RE = re.compile(r'```(?:json|JSON)?\s*([\s\S]*?)(?:```|$)')
+
+FULLWIDTH_STRUCTURAL = {'，': ',', '：': ':', '｛': '{', '｝': '}', '［': '[', '］': ']'}
+OPENING_QUOTES = {'"': '"', "'": "'", '“': '”', '‘': '’'}
+PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+CONTAINER_CLOSERS = set('}]｝］')
+VALUE_STARTS = set('"\'“‘{[｛［-0123456789tfnTFN')
+
+
+def strip_reasoning(text: str) -> str:
+    """去掉 <think> 思考块（包括未闭合的思考前缀）和Markdown代码块标记。"""
+    text = THINK_BLOCK_RE.sub('', text)
+    lowered = text.lower()
+    if '<think>' in lowered:
+        # 思考块没有闭合：丢弃 <think> 之后、第一个JSON起始符之前的内容
+        think_start = lowered.index('<think>')
+        rest = text[think_start + len('<think>'):]
+        brace = min([i for i in (rest.find('{'), rest.find('[')) if i != -1], default=-1)
+        text = text[:think_start] + (rest[brace:] if brace != -1 else '')
+    fence = CODE_FENCE_RE.search(text)
+    if fence and ('{' in fence.group(1) or '[' in fence.group(1)):
+        text = fence.group(1)
+    return text
+
+
+def _json_start(text: str) -> int:
+    starts = [i for i in (text.find('{'), text.find('['), text.find('｛')) if i != -1]
+    return min(starts) if starts else -1
+
+
+def _next_significant(text: str, index: int) -> (str, int):
+    while index < len(text) and text[index] in ' \t\r\n':
+        index += 1
+    return (text[index], index) if index < len(text) else ('', index)
+
+
+def _closes_string(text: str, index: int) -> bool:
+    """
+    判断 text[index] 处的引号是不是字符串的结束引号。
+    只有其后紧跟JSON结构（逗号/冒号后接新的键或值、右括号、文本结尾）时才算结束，
+    否则视为字符串内部未转义的引号，例如："他说"你好"，然后..."。
+    """
+    ch, position = _next_significant(text, index + 1)
+    if ch == '' or ch in CONTAINER_CLOSERS:
+        return True
+    if ch in ',，:：':
+        after, _ = _next_significant(text, position + 1)
+        return after == '' or after in VALUE_STARTS or after in CONTAINER_CLOSERS
+    return False
+
+
+def _normalize(text: str) -> (str, List[str], List[int]):
+    """
+    单遍扫描，把“近似JSON”改写为标准JSON。
+    返回 (改写后的文本, 未闭合的括号栈, 每一层最近一个逗号在输出中的位置)。
+    """
+    out = []
+    stack = []          # 未闭合的 { [
+    comma_positions = []
+    quote_end = None    # 当前字符串的结束引号；None 表示不在字符串内
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if quote_end is not None:
+            if ch == '\\' and i + 1 < n:
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch == quote_end:
+                # 只有后面紧跟结构符号时才认为字符串结束，否则是未转义的内部引号
+                if _closes_string(text, i):
+                    out.append('"')
+                    quote_end = None
+                else:
+                    out.append('\\"')
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == '\n':
+                out.append('\\n')
+            elif ch == '\r':
+                out.append('\\r')
+            elif ch == '\t':
+                out.append('\\t')
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        ch = FULLWIDTH_STRUCTURAL.get(ch, ch)
+        if ch in OPENING_QUOTES:
+            quote_end = OPENING_QUOTES[ch]
+            out.append('"')
+        elif ch in '{[':
+            stack.append(ch)
+            comma_positions.append(None)
+            out.append(ch)
+        elif ch in '}]':
+            # 去掉结尾逗号
+            while out and out[-1] in (' ', '\n', '\t', '\r'):
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            if stack:
+                stack.pop()
+                comma_positions.pop()
+            out.append(ch)
+        elif ch == ',':
+            if comma_positions:
+                comma_positions[-1] = len(out)
+            out.append(ch)
+        elif ch.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == '_'):
+                j += 1
+            word = text[i:j]
+            out.append(PYTHON_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if quote_end is not None:
+        out.append('"')
+    return ''.join(out), stack, comma_positions
+
+
+def _close(text: str, stack: List[str]) -> str:
+    """为截断的输出补齐缺失的值和括号。"""
+    text = text.rstrip()
+    if text.endswith(','):
+        text = text[:-1]
+    elif text.endswith(':'):
+        text += ' null'
+    for opener in reversed(stack):
+        text += '}' if opener == '{' else ']'
+    return text
+
+
+def repair_json_locally(llm_output: str) -> Optional[Any]:
+    """
+    尝试在本地修复并解析LLM输出中的JSON，成功返回解析结果，失败返回None。
+    """
+    if not llm_output:
+        return None
+    text = strip_reasoning(llm_output)
+    start = _json_start(text)
+    if start == -1:
+        return None
+    text = text[start:]
+
+    # 候选一：完整文本（输出被截断时直接补齐括号）；候选二：截掉最后一个闭合括号之后的多余文字
+    last_close = max(text.rfind('}'), text.rfind(']'), text.rfind('｝'))
+    candidates = [text, text[:last_close + 1]] if last_close != -1 else [text]
+    normalized_candidates = [_normalize(candidate) for candidate in candidates]
+
+    for normalized, stack, _ in normalized_candidates:
+        try:
+            return json.loads(_close(normalized, stack))
+        except json.JSONDecodeError:
+            continue
+
+    # 截断发生在某个键的中间：回退到该层最后一个完整元素再补齐括号
+    for normalized, _, comma_positions in normalized_candidates:
+        for position in reversed(comma_positions):
+            if position is None:
+                continue
+            truncated, truncated_stack, _ = _normalize(normalized[:position])
+            try:
+                return json.loads(_close(truncated, truncated_stack))
+            except json.JSONDecodeError:
+                continue
+    return None
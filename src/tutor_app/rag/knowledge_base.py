@@ -3,8 +3,7 @@ import os
 import tiktoken
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, UnstructuredMarkdownLoader # 【优化1】导入新的Loader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from src.tutor_app.llms.llm_factory import get_embedding_model
+from src.tutor_app.rag.registry import get_vectorstore, invalidate_source
 from src.tutor_app.core.config import settings
 
 CHROMA_PERSIST_DIRECTORY = "data/chroma_db"
@@ -57,13 +56,10 @@ def process_and_vectorize_file(filepath: str, source_id: int):
             split.metadata = {}
         split.metadata['source_id'] = str(source_id)
 
-    # 4. 创建嵌入并存入ChromaDB (此部分逻辑不变)
-    embedding_model = get_embedding_model()
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embedding_model,
-        persist_directory=CHROMA_PERSIST_DIRECTORY
-    )
+    # 4. 创建嵌入并存入ChromaDB（复用进程内共享的向量库句柄）
+    get_vectorstore().add_documents(splits)
+    # 通知所有进程丢弃该知识源的旧句柄
+    invalidate_source(source_id)
     
     print(f"Successfully processed and vectorized file for source_id: {source_id}")
     return True
\ No newline at end of file
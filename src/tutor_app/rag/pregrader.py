@@ -0,0 +1,93 @@
+# src/tutor_app/rag/pregrader.py
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+import redis
+
+from src.tutor_app.core.config import settings
+from src.tutor_app.core.redis_client import get_redis
+from src.tutor_app.llms.llm_factory import get_embedding_model
+from src.tutor_app.rag.registry import LRUCache
+
+REFERENCE_EMBEDDING_KEY = "tutor:pregrade:embedding:{model}:{digest}"
+REFERENCE_EMBEDDING_TTL_SECONDS = 30 * 24 * 3600
+
+_reference_embeddings = LRUCache(maxsize=512)
+
+
+def _embed(texts: List[str]) -> List[np.ndarray]:
+    vectors = get_embedding_model().embed_documents(texts)
+    return [np.asarray(vector, dtype=np.float32) for vector in vectors]
+
+
+def _reference_embedding(text: str) -> np.ndarray:
+    """
+    标准答案/题干的向量：进程内LRU缓存 + Redis共享缓存（按模型名和文本哈希），
+    同一道题无论被评多少次、在哪个worker上评，都只需向量化一次。
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = REFERENCE_EMBEDDING_KEY.format(model=settings.EMBEDDING_MODEL_NAME, digest=digest)
+
+    def load():
+        try:
+            raw = get_redis().get(key)
+            if raw:
+                return np.frombuffer(raw, dtype=np.float32)
+        except redis.RedisError:
+            pass
+        vector = _embed([text])[0]
+        try:
+            get_redis().set(key, vector.tobytes(), ex=REFERENCE_EMBEDDING_TTL_SECONDS)
+        except redis.RedisError:
+            pass
+        return vector
+
+    return _reference_embeddings.get_or_create((settings.EMBEDDING_MODEL_NAME, digest), load)
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    denominator = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b) / denominator) if denominator else 0.0
+
+
+def pregrade_answers(question_text: str, standard_answer: str, user_answers: List[str]) -> List[Optional[dict]]:
+    """
+    【向量预评分】在调用大模型之前，用向量相似度直接判定明显的答案：
+    - 空答案或过短的答案 -> "错误"；
+    - 与标准答案的相似度 >= PREGRADE_CORRECT_THRESHOLD -> "正确"（基本照抄标准答案）；
+    - 与标准答案、题干的相似度都 <= PREGRADE_WRONG_THRESHOLD -> "错误"（答非所问）。
+    返回与 user_answers 等长的列表，每项为 {"score", "feedback"}；
+    落在中间区间、需要大模型判断的答案为None。向量服务不可用时全部返回None。
+    """
+    results = [None] * len(user_answers)
+    if not settings.PREGRADE_ENABLED or not standard_answer:
+        return results
+
+    to_embed = []
+    for i, answer in enumerate(user_answers):
+        if len((answer or "").strip()) < settings.PREGRADE_MIN_ANSWER_CHARS:
+            results[i] = {"score": "错误", "feedback": "回答为空或过短，未作答。"}
+        else:
+            to_embed.append(i)
+    if not to_embed:
+        return results
+
+    try:
+        standard_vector = _reference_embedding(standard_answer)
+        question_vector = _reference_embedding(question_text) if question_text else None
+        answer_vectors = _embed([user_answers[i] for i in to_embed])
+    except Exception as e:
+        print(f"Warning: pre-grading embeddings unavailable, falling back to LLM grading. Error: {e}")
+        return results
+
+    for i, vector in zip(to_embed, answer_vectors):
+        standard_similarity = _cosine(vector, standard_vector)
+        question_similarity = _cosine(vector, question_vector) if question_vector is not None else 0.0
+        if standard_similarity >= settings.PREGRADE_CORRECT_THRESHOLD:
+            results[i] = {"score": "正确",
+                          "feedback": f"回答与标准答案高度一致（相似度 {standard_similarity:.2f}），自动判定为正确。"}
+        elif max(standard_similarity, question_similarity) <= settings.PREGRADE_WRONG_THRESHOLD:
+            results[i] = {"score": "错误",
+                          "feedback": f"回答与题目和标准答案均无关（相似度 {standard_similarity:.2f}），自动判定为错误。"}
+    return results
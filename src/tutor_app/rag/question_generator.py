@@ -2,19 +2,23 @@
 
 from langchain_core.prompts import ChatPromptTemplate, FewShotChatMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough, RunnableParallel
-from langchain_chroma import Chroma
-from src.tutor_app.llms.llm_factory import get_chat_model, get_embedding_model
-from src.tutor_app.rag.knowledge_base import CHROMA_PERSIST_DIRECTORY
+from src.tutor_app.llms.llm_factory import get_chat_model, get_structured_chat_model
+from src.tutor_app.schemas.question import make_batch_schema
+from src.tutor_app.rag.registry import get_chain
 from .prompt_examples import FEW_SHOT_EXAMPLES
 
-def get_questions_chain(question_type: str, source_id: int):
-    """
-    【同步版】构建一个使用“少样本”提示的RAG链。
-    """
+SINGLE_QUESTION_REQUEST = "上下文知识:\n---\n{context}\n---\n请生成一道“{question_type}”题目。"
+BATCH_QUESTION_REQUEST = (
+    "上下文知识:\n---\n{context}\n---\n"
+    "请基于上述上下文生成 {batch_size} 道互不重复的“{question_type}”题目。"
+    "以 {{\"questions\": [...]}} 形式的JSON对象输出，数组中的每个元素都必须严格遵循范例中单道题目的JSON格式。"
+)
+
+def _build_prompt(request_template: str) -> ChatPromptTemplate:
+    """构建带少样本范例的出题提示词，最后一条human消息为实际的出题请求。"""
     example_prompt = ChatPromptTemplate.from_messages(
         [
-            ("human", "上下文知识:\n---\n{context}\n---\n请生成一道“{question_type}”题目。"),
+            ("human", SINGLE_QUESTION_REQUEST),
             ("ai", "{output}"),
         ]
     )
@@ -23,25 +27,34 @@ def get_questions_chain(question_type: str, source_id: int):
         examples=FEW_SHOT_EXAMPLES,
         input_variables=["context", "question_type"],
     )
-    final_prompt = ChatPromptTemplate.from_messages(
+    return ChatPromptTemplate.from_messages(
         [
             ("system", "你是一名教学经验丰富的出题专家。请严格模仿范例的JSON格式进行输出。"),
             few_shot_prompt,
-            ("human", "上下文知识:\n---\n{context}\n---\n请生成一道“{question_type}”题目。"),
+            ("human", request_template),
         ]
     )
-    vectorstore = Chroma(
-        persist_directory=CHROMA_PERSIST_DIRECTORY,
-        embedding_function=get_embedding_model()
-    )
-    retriever = vectorstore.as_retriever(
-        search_kwargs={'filter': {'source_id': str(source_id)}}
-    )
-    llm = get_chat_model()
-    rag_chain = (
-        {"context": retriever, "question_type": RunnablePassthrough()}
-        | final_prompt
-        | llm
-        | StrOutputParser()
-    )
-    return rag_chain
\ No newline at end of file
+
+def get_questions_chain(schema=None):
+    """
+    【同步版】获取一个使用“少样本”提示的出题链，每次调用生成一道题。
+    传入题型的 schema 时，模型按该Schema做结构化输出（Ollama format 参数）。
+    编译好的链缓存在 registry 中，worker内的后续任务直接复用。
+    上下文由 ContextScheduler 直接提供，调用方式: chain.invoke({"context": ..., "question_type": ...})。
+    """
+    def build():
+        final_prompt = _build_prompt(SINGLE_QUESTION_REQUEST)
+        llm = get_structured_chat_model(schema) if schema else get_chat_model()
+        return final_prompt | llm | StrOutputParser()
+    return get_chain(("single", schema), build)
+
+def get_questions_batch_chain(batch_size: int, schema=None):
+    """
+    【批量出题版】一次LLM调用基于同一段上下文生成 batch_size 道同题型题目，
+    输出为 {"questions": [...]} 对象。少样本提示的预填充只需付出一次。
+    """
+    def build():
+        final_prompt = _build_prompt(BATCH_QUESTION_REQUEST).partial(batch_size=str(batch_size))
+        llm = get_structured_chat_model(make_batch_schema(schema)) if schema else get_chat_model()
+        return final_prompt | llm | StrOutputParser()
+    return get_chain(("batch", batch_size, schema), build)
@@ -0,0 +1,98 @@
+# src/tutor_app/rag/registry.py
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import redis
+from src.tutor_app.core.redis_client import get_redis
+
+SOURCE_VERSION_KEY = "tutor:rag:source_version:{source_id}"
+
+
+class LRUCache:
+    """线程安全的LRU缓存，超出容量时淘汰最久未使用的条目。"""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        value = factory() # 在锁外构建，避免慢操作阻塞其他线程
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def discard(self, predicate: Callable[[Hashable], bool]):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+_chains = LRUCache(maxsize=16)
+_source_handles = LRUCache(maxsize=32)
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
+
+
+def get_vectorstore():
+    """进程内共享的Chroma句柄，避免每次调用都重新打开磁盘上的向量库。"""
+    global _vectorstore
+    from langchain_chroma import Chroma
+    from src.tutor_app.llms.llm_factory import get_embedding_model
+    from src.tutor_app.rag.knowledge_base import CHROMA_PERSIST_DIRECTORY
+
+    with _vectorstore_lock:
+        if _vectorstore is None:
+            _vectorstore = Chroma(
+                persist_directory=CHROMA_PERSIST_DIRECTORY,
+                embedding_function=get_embedding_model()
+            )
+        return _vectorstore
+
+
+def get_chain(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """按 key 缓存已编译的提示词模板/出题链。"""
+    return _chains.get_or_create(key, factory)
+
+
+def _source_version(source_id: int) -> Optional[int]:
+    """读取知识源在Redis中的版本号；Redis不可用时返回None，表示不能信任缓存。"""
+    try:
+        value = get_redis().get(SOURCE_VERSION_KEY.format(source_id=source_id))
+    except redis.RedisError:
+        return None
+    return int(value) if value is not None else 0
+
+
+def get_source_handle(source_id: int, name: str, factory: Callable[[], Any]) -> Any:
+    """
+    按 (source_id, name) 缓存与某个知识源绑定的句柄（例如文本块列表、检索器）。
+    缓存键包含知识源的版本号：任何进程重新入库或删除该知识源后版本号递增，
+    其他进程（Celery worker、Streamlit）下次访问时自然拿到新句柄。
+    """
+    version = _source_version(source_id)
+    if version is None:
+        return factory()
+    _source_handles.discard(lambda key: key[0] == source_id and key[1] == name and key[2] != version)
+    return _source_handles.get_or_create((source_id, name, version), factory)
+
+
+def invalidate_source(source_id: int):
+    """知识源被重新入库或删除时调用：清掉本进程的句柄，并递增全局版本号通知其他进程。"""
+    _source_handles.discard(lambda key: key[0] == source_id)
+    try:
+        get_redis().incr(SOURCE_VERSION_KEY.format(source_id=source_id))
+    except redis.RedisError as e:
+        print(f"Warning: Failed to bump vector store version for source {source_id}: {e}")
+
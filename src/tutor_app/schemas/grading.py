@@ -0,0 +1,18 @@
+# src/tutor_app/schemas/grading.py
+
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+# --- 简答题AI评分结果的结构 ---
+class GradingResultSchema(BaseModel):
+    score: Literal["正确", "部分正确", "错误"] = Field(description="评分结果，只能是 '正确'、'部分正确' 或 '错误'")
+    feedback: str = Field(description="对评分的简明解释（50字以内）")
+
+# --- 批量评分结果的结构（同一道题的多个答案一次评完）---
+class BatchGradingItemSchema(BaseModel):
+    index: int = Field(description="答案编号，与输入中的编号一致")
+    score: Literal["正确", "部分正确", "错误"] = Field(description="评分结果，只能是 '正确'、'部分正确' 或 '错误'")
+    feedback: str = Field(description="对评分的简明解释（50字以内）")
+
+class BatchGradingResultSchema(BaseModel):
+    results: List[BatchGradingItemSchema] = Field(description="每个答案的评分结果，按编号顺序排列")
@@ -1,6 +1,7 @@
 # src/tutor_app/schemas/question.py
 
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from pydantic import BaseModel, Field, create_model
 from typing import List, Dict, Union
 
 # --- 单项选择题的结构 ---
@@ -63,4 +64,20 @@ class FillInTheBlankQuestionSchema(BaseModel):
     content: FillInTheBlankContent
     answer: FillInTheBlankAnswer
     analysis: str = Field(description="对题目和答案的详细解析")
-    knowledge_tag: str = Field(description="该题目所属的核心知识点或标签")
\ No newline at end of file
+    knowledge_tag: str = Field(description="该题目所属的核心知识点或标签")
+
+# src/tutor_app/schemas/question.py
+
+# ... (保留已有的题目Schema) ...
+
+# --- 批量出题的结构 ---
+@lru_cache(maxsize=None)
+def make_batch_schema(question_schema):
+    """
+    把单题Schema包装成 {"questions": [...]} 对象，用于批量出题的结构化输出。
+    该形状也是 parse_json_list_with_ai_fallback 能直接识别的格式，便于退回修复解析器。
+    """
+    return create_model(
+        f"{question_schema.__name__}Batch",
+        questions=(List[question_schema], Field(description="按要求数量生成的题目列表")),
+    )
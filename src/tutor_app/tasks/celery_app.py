@@ -1,5 +1,6 @@
 # src/tutor_app/tasks/celery_app.py
 from celery import Celery
+from celery.schedules import crontab
 from src.tutor_app.core.config import settings
 from src.tutor_app.core.logging import setup_logging # <<< 导入
 
@@ -10,9 +11,30 @@ celery_app = Celery(
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
     # 在列表中加入新的任务文件
-    include=["src.tutor_app.tasks.processing", "src.tutor_app.tasks.generation","src.tutor_app.tasks.grading"]
+    include=["src.tutor_app.tasks.processing", "src.tutor_app.tasks.generation","src.tutor_app.tasks.grading",
+             "src.tutor_app.tasks.maintenance"]
 )
 
 celery_app.conf.update(
     task_track_started=True,
-)
\ No newline at end of file
+)
+
+# 定时维护任务（需要额外启动 celery beat）
+celery_app.conf.beat_schedule = {
+    "reshuffle-question-random-keys": {
+        "task": "src.tutor_app.tasks.maintenance.reshuffle_question_keys_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "maintain-practice-log-partitions": {
+        "task": "src.tutor_app.tasks.maintenance.maintain_practice_log_partitions_task",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    "reconcile-due-queues": {
+        "task": "src.tutor_app.tasks.maintenance.reconcile_due_queues_task",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "fit-fsrs-parameters": {
+        "task": "src.tutor_app.tasks.maintenance.fit_fsrs_parameters_task",
+        "schedule": crontab(hour=4, minute=0, day_of_week=0),
+    },
+}
\ No newline at end of file
@@ -0,0 +1,137 @@
+# src/tutor_app/tasks/executor.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from src.tutor_app.core.config import settings
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    【自适应并发限制器】根据实测的Ollama延迟和错误率动态调整同时在途的请求数。
+
+    - 延迟梯度: 用短期延迟(EWMA)与长期基线延迟之比作为梯度，
+      Ollama开始排队(短期延迟升高)时自动收缩并发，空闲时缓慢放大。
+    - 错误率: 请求出错时按乘法因子快速回退。
+    """
+
+    def __init__(self, min_limit: int = None, max_limit: int = None, initial_limit: int = None,
+                 smoothing: float = 0.2, error_backoff: float = 0.5):
+        self.min_limit = max(1, min_limit or settings.GENERATION_MIN_CONCURRENCY)
+        self.max_limit = max(self.min_limit, max_limit or settings.GENERATION_MAX_CONCURRENCY)
+        initial = initial_limit or settings.GENERATION_INITIAL_CONCURRENCY
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._smoothing = smoothing
+        self._error_backoff = error_backoff
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._short_latency = None  # 最近几次请求的延迟 (快速EWMA)
+        self._long_latency = None   # 长期基线延迟 (慢速EWMA)
+        self._error_rate = 0.0
+        self._completed = 0
+        self._errors = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        """阻塞直到在途请求数低于当前并发上限。"""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, ok: bool = True):
+        """归还一个并发名额，并用本次请求的延迟/结果更新并发上限。"""
+        with self._cond:
+            self._in_flight -= 1
+            self._completed += 1
+            self._error_rate = 0.8 * self._error_rate + 0.2 * (0.0 if ok else 1.0)
+
+            if not ok:
+                self._errors += 1
+                self._limit = max(self.min_limit, self._limit * self._error_backoff)
+            else:
+                if self._short_latency is None:
+                    self._short_latency = self._long_latency = latency
+                else:
+                    self._short_latency = 0.7 * self._short_latency + 0.3 * latency
+                    self._long_latency = 0.95 * self._long_latency + 0.05 * latency
+                    # 长期基线不应远高于当前水平，否则负载回落后无法及时恢复
+                    if self._long_latency > 2 * self._short_latency:
+                        self._long_latency = 0.9 * self._long_latency
+
+                gradient = min(1.0, max(0.5, self._long_latency / max(self._short_latency, 1e-6)))
+                # 延迟平稳且错误率低时才试探性扩容，否则只允许保持或收缩
+                headroom = 1.0 if gradient > 0.9 and self._error_rate < 0.1 else 0.0
+                new_limit = self._limit * gradient + headroom
+                self._limit = (1 - self._smoothing) * self._limit + self._smoothing * new_limit
+                self._limit = min(self.max_limit, max(self.min_limit, self._limit))
+
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "errors": self._errors,
+                "latency_short": round(self._short_latency or 0.0, 3),
+                "latency_baseline": round(self._long_latency or 0.0, 3),
+            }
+
+
+@dataclass
+class JobOutcome:
+    """单个作业的执行结果。error 不为空表示调用本身失败（网络/模型错误）。"""
+    item: Any
+    result: Any = None
+    error: Optional[BaseException] = None
+    latency: float = 0.0
+
+
+class GenerationExecutor:
+    """
+    【出题执行引擎】用真实线程并发执行阻塞的检索+LLM调用，并按完成顺序产出结果。
+
+    Celery默认的prefork worker里没有对HTTP栈打gevent补丁，gevent.spawn只会串行执行；
+    这里改用线程池，底层的httpx/requests调用在等待网络IO时会释放GIL，从而真正重叠。
+    在途请求数由 AdaptiveConcurrencyLimiter 控制。
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter = None):
+        self.limiter = limiter or AdaptiveConcurrencyLimiter()
+
+    def _run_one(self, fn: Callable[[Any], Any], item: Any) -> JobOutcome:
+        self.limiter.acquire()
+        start = time.perf_counter()
+        outcome, ok = JobOutcome(item=item), False
+        try:
+            outcome.result = fn(item)
+            ok = True
+        except Exception as e:
+            outcome.error = e
+        finally:
+            # KeyboardInterrupt/SystemExit 等 BaseException 照常向上抛出，但并发名额必须归还
+            outcome.latency = time.perf_counter() - start
+            self.limiter.release(outcome.latency, ok=ok)
+        return outcome
+
+    def run(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[JobOutcome]:
+        """
+        对每个 item 并发执行 fn(item)，按完成先后顺序逐个产出 JobOutcome。
+        fn 抛出的异常会被记录为失败并用于降低并发，不会中断其余作业。
+        """
+        items = list(items)
+        if not items:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(items), self.limiter.max_limit),
+                                thread_name_prefix="generation") as pool:
+            futures = [pool.submit(self._run_one, fn, item) for item in items]
+            for future in as_completed(futures):
+                yield future.result()
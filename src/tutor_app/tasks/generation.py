@@ -1,85 +1,272 @@
 # src/tutor_app/tasks/generation.py
-import gevent
 from .celery_app import celery_app
+from .executor import GenerationExecutor
 from src.tutor_app.db.session import SessionLocal
-from src.tutor_app.rag.question_generator import get_questions_chain
-from src.tutor_app.crud.crud_question import create_question
-from src.tutor_app.rag.json_parser import parse_json_with_ai_fallback
+from src.tutor_app.rag.question_generator import get_questions_chain, get_questions_batch_chain
+from src.tutor_app.rag.context_scheduler import ChunkScheduler, list_source_chunks
+from src.tutor_app.crud.crud_question import (
+    get_or_create_generation_task, save_generated_questions, finish_generation_task
+)
+from src.tutor_app.rag.json_parser import (
+    parse_json_with_ai_fallback, parse_json_list_with_ai_fallback, parse_structured_output, PARSER_METRICS_GROUP
+)
+from src.tutor_app.core.config import settings
+from src.tutor_app.llms.llm_factory import get_llm_call_stats
+from src.tutor_app.llms.streaming import stream_json, schema_validator, get_streaming_stats
+from src.tutor_app.core.metrics import get_metrics
 from src.tutor_app.schemas.question import (
     MultipleChoiceQuestionSchema, TrueFalseQuestionSchema, 
-    ShortAnswerQuestionSchema, FillInTheBlankQuestionSchema
+    ShortAnswerQuestionSchema, FillInTheBlankQuestionSchema, make_batch_schema
 )
 from pydantic import ValidationError
+from src.tutor_app.core.redis_client import get_redis
 from typing import Dict
+import threading
+import time
+import uuid
+import redis
 
 SCHEMA_MAP = {
     "单项选择题": MultipleChoiceQuestionSchema, "判断题": TrueFalseQuestionSchema,
     "简答题": ShortAnswerQuestionSchema, "填空题": FillInTheBlankQuestionSchema
 }
 
-def _generate_and_validate_question(rag_chain, question_type, schema):
+GENERATION_SAVE_BATCH_SIZE = 5     # 每攒够这么多道题就提交一次事务
+GENERATION_SAVE_INTERVAL_SECONDS = 3 # 或距上次提交超过该时长也立即提交
+
+GENERATION_LOCK_KEY = "tutor:generation:running:{job_id}"
+GENERATION_LOCK_TTL_SECONDS = 60 # 运行中每隔 TTL/3 续期一次；worker 崩溃后锁最多这么久就失效
+GENERATION_LOCK_RETRIES = 3      # 任务拿不到锁时隔一个 TTL 重试的次数，之后放弃本次运行
+# 只有锁仍属于自己（值等于自己的令牌）时才续期/释放
+_RENEW_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end return 0"
+_RELEASE_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class GenerationJobLock:
     """
-    【同步辅助函数】生成、解析并校验单个问题。
-    这个函数会被gevent并发执行。
+    【出题任务锁】同一个 job_id 同时只允许一个 worker 执行，避免续跑/重新投递的任务与仍在运行的原任务重复出题。
+
+    锁是带过期时间的 Redis 键，持有期间由后台线程定期续期，因此原任务卡在一次很长的LLM调用里也不会失锁；
+    worker 崩溃后不再续期，锁在 GENERATION_LOCK_TTL_SECONDS 内过期，之后才能续跑。
+    Redis 不可用时不加锁，照常执行。
     """
+
+    def __init__(self, job_id: str):
+        self.key = GENERATION_LOCK_KEY.format(job_id=job_id)
+        self._token = uuid.uuid4().hex
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        """拿到锁（或 Redis 不可用）时返回 True 并开始续期；锁被其他运行持有时返回 False。"""
+        try:
+            if not get_redis().set(self.key, self._token, nx=True, ex=GENERATION_LOCK_TTL_SECONDS):
+                return False
+        except redis.RedisError as e:
+            print(f"Warning: Failed to lock generation job, running without lock: {e}")
+            return True
+        self._heartbeat = threading.Thread(target=self._renew, name="generation-lock", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew(self):
+        while not self._stop.wait(GENERATION_LOCK_TTL_SECONDS / 3):
+            try:
+                get_redis().eval(_RENEW_LOCK_SCRIPT, 1, self.key, self._token, GENERATION_LOCK_TTL_SECONDS)
+            except redis.RedisError as e:
+                print(f"Warning: Failed to renew generation job lock: {e}")
+
+    def release(self):
+        if self._heartbeat is None:
+            return
+        self._stop.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+        try:
+            get_redis().eval(_RELEASE_LOCK_SCRIPT, 1, self.key, self._token)
+        except redis.RedisError as e:
+            print(f"Warning: Failed to release generation job lock: {e}")
+
+
+def is_generation_job_running(job_id: str) -> bool:
+    """是否有 worker 正在执行该出题任务（持有任务锁）。Redis 不可用时返回 False。"""
     try:
-        llm_output_string = rag_chain.invoke(question_type)
-        parsed_data = parse_json_with_ai_fallback(llm_output_string)
-        if parsed_data:
-            validated_data = schema(**parsed_data)
-            return validated_data.dict()
+        return bool(get_redis().exists(GENERATION_LOCK_KEY.format(job_id=job_id)))
+    except redis.RedisError as e:
+        print(f"Warning: Failed to check generation job lock: {e}")
+        return False
+
+def _validate_item(parsed_data, question_type, schema):
+    """对一道已解析的题目做Pydantic校验，返回 (阶段结果, 题目数据)。"""
+    if not parsed_data:
+        return "parse_failed", None
+    try:
+        validated_data = schema(**parsed_data)
+        return "ok", validated_data.dict()
     except ValidationError as e:
         print(f"Warning: Pydantic validation failed for {question_type}. Error: {e}")
-    except Exception as e:
-        print(f"Warning: An unexpected error occurred during single generation. Error: {e}")
-    return None
+        return "schema_failed", None
 
-# src/tutor_app/tasks/generation.py
+def _generate_and_validate_question(rag_chain, question_type, schema, context):
+    """
+    【同步辅助函数】生成、解析并校验单个问题。
+    这个函数会被 GenerationExecutor 在线程池中并发执行。
+    LLM调用本身的异常会向上抛出，交给执行引擎记录并用于调节并发度。
+    返回 [(阶段结果, 题目数据)]，阶段结果为 'ok' / 'parse_failed' / 'schema_failed'。
+    """
+    # 流式调用：题目对象完整且通过校验后立即终止生成，不再为多余的输出付出解码时间
+    llm_output_string = stream_json(rag_chain, {"context": context, "question_type": question_type},
+                                    schema_validator(schema)).text
+    # 结构化输出：一步完成解析和校验；模型忽略Schema时才退回多级修复解析器
+    structured = parse_structured_output(llm_output_string, schema)
+    if structured is not None:
+        return [("ok", structured.model_dump())]
+    try:
+        parsed_data = parse_json_with_ai_fallback(llm_output_string)
+    except Exception as e:
+        print(f"Warning: An unexpected error occurred while parsing generated output. Error: {e}")
+        parsed_data = None
+    return [_validate_item(parsed_data, question_type, schema)]
 
-# ... (文件顶部的 aimport 和常量保持不变)
+def _generate_and_validate_batch(rag_chain, question_type, schema, context, batch_size):
+    """
+    【批量出题】一次LLM调用生成 batch_size 道题，逐个元素独立校验：
+    某个元素格式错误不会连累同批次的其他题目。模型少返回的题目记为解析失败。
+    """
+    batch_schema = make_batch_schema(schema)
+    llm_output_string = stream_json(rag_chain, {"context": context, "question_type": question_type},
+                                    schema_validator(batch_schema)).text
+    structured = parse_structured_output(llm_output_string, batch_schema)
+    if structured is not None:
+        results = [("ok", item.model_dump()) for item in structured.questions[:batch_size]]
+        results.extend([("parse_failed", None)] * (batch_size - len(results)))
+        return results
+    try:
+        items = parse_json_list_with_ai_fallback(llm_output_string)[:batch_size]
+    except Exception as e:
+        print(f"Warning: An unexpected error occurred while parsing generated batch. Error: {e}")
+        items = []
+    results = [_validate_item(item, question_type, schema) for item in items]
+    results.extend([("parse_failed", None)] * (batch_size - len(items)))
+    return results
 
-@celery_app.task(bind=True)
-def generate_questions_task(self, source_id: int, type_counts: Dict[str, int]):
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def generate_questions_task(self, source_id: int, type_counts: Dict[str, int], job_id: str = None, batch_size: int = None):
     """
-    【全新Gevent并行版 - V2 优化版】Celery任务，提供更精细的进度反馈。
+    【流式入库版】Celery任务：每道题生成完成后即刻校验，攒成小批次分事务入库，
+    并实时上报逐题进度和各阶段计数。
+    进度记录在 generation_tasks 表中，worker崩溃后任务被重新投递（acks_late）
+    或通过 job_id 手动续跑时，只会补齐尚未入库的题目。
+    同一个 job_id 由 GenerationJobLock 保证同时只有一个运行；拿不到锁时（例如崩溃的 worker 留下的锁尚未过期）
+    隔一段时间重试，原任务确实仍在运行时放弃本次运行。
+    batch_size 为每次LLM调用生成的题数（k），为1时即逐题生成模式。
     """
+    job_id = job_id or self.request.id
+    batch_size = max(1, batch_size or settings.GENERATION_BATCH_SIZE)
     total_requested = sum(type_counts.values())
-    print(f"Starting Gevent PARALLEL generation for source_id: {source_id}, request: {type_counts}")
-    self.update_state(state='PROGRESS', meta={'current': 0, 'total': total_requested, 'status': '正在初始化AI引擎...'})
-
-    all_jobs = []
-    # 1. 为每一个要生成的题目创建一个gevent“作业”（Greenlet）
-    for q_type, num_questions in type_counts.items():
-        if q_type not in SCHEMA_MAP: continue
-        schema = SCHEMA_MAP[q_type]
-        rag_chain = get_questions_chain(q_type, source_id)
-        for _ in range(num_questions):
-            job = gevent.spawn(_generate_and_validate_question, rag_chain, q_type, schema)
-            all_jobs.append(job)
-
-    # 【优化1】在AI生成期间更新状态
-    self.update_state(state='PROGRESS', meta={'current': 0, 'total': total_requested, 'status': f'已提交 {len(all_jobs)} 个生成请求，等待AI批量处理...'})
-    
-    # 2. 等待所有并发的“作业”完成
-    print(f"Executing {len(all_jobs)} generation jobs in parallel with gevent...")
-    gevent.joinall(all_jobs)
-    
-    # 3. 收集结果
-    valid_questions = [job.value for job in all_jobs if job.value is not None]
-    generated_count = len(valid_questions)
-    
-    # 【优化2】在存入数据库前更新状态
-    self.update_state(state='PROGRESS', meta={'current': generated_count, 'total': total_requested, 'status': f'AI处理完成，正在将 {generated_count} 道题存入数据库...'})
-
-    # 4. 存入数据库
+
+    job_lock = GenerationJobLock(job_id)
+    if not job_lock.acquire():
+        if self.request.retries < GENERATION_LOCK_RETRIES:
+            raise self.retry(countdown=GENERATION_LOCK_TTL_SECONDS, max_retries=GENERATION_LOCK_RETRIES)
+        print(f"Generation job {job_id} is still running elsewhere; skipping this run.")
+        return {'generated': 0, 'failures': 0, 'total': total_requested, 'status': '该出题任务仍在其他 worker 上运行，本次未重复执行'}
+    print(f"Starting PARALLEL generation for source_id: {source_id}, request: {type_counts}, job: {job_id}")
+
     db = SessionLocal()
     try:
-        for question_data in valid_questions:
-            create_question(db, source_id, question_data)
-        print(f"Successfully saved {generated_count} questions to DB.")
+        task_record = get_or_create_generation_task(db, job_id, source_id, type_counts)
+        already_saved = dict(task_record.saved_counts or {})
+        resumed_count = sum(already_saved.values())
+
+        stats = {'parsed': 0, 'parse_failures': 0, 'schema_failures': 0, 'llm_errors': 0,
+                 'saved': resumed_count}
+        processed = stats['saved']
+
+        def report(status):
+            meta = {'current': processed, 'total': total_requested, 'status': status}
+            meta.update(stats)
+            self.update_state(state='PROGRESS', meta=meta)
+
+        report('正在初始化AI引擎...' if not already_saved else f"断点续跑：已有 {stats['saved']} 道题入库，继续生成剩余题目...")
+
+        # 1. 列出知识源的全部文本块（无需查询向量化），由调度器把文本块分配给各个作业
+        scheduler = ChunkScheduler(list_source_chunks(source_id))
+        if not scheduler.chunks:
+            print(f"Error: No chunks found in vector store for source_id: {source_id}")
+            finish_generation_task(db, task_record)
+            return {'generated': 0, 'failures': total_requested, 'total': total_requested, 'status': '知识库中没有可用的文本块'}
+
+        # 2. 为尚未入库的题目创建作业，每个作业一次LLM调用生成 batch_size 道题
+        chains = {}
+        jobs = []
+        for q_type, num_questions in type_counts.items():
+            if q_type not in SCHEMA_MAP: continue
+            remaining = num_questions - already_saved.get(q_type, 0)
+            while remaining > 0:
+                size = min(batch_size, remaining)
+                schema = SCHEMA_MAP[q_type]
+                if (q_type, size) not in chains:
+                    chains[(q_type, size)] = get_questions_chain(schema) if size == 1 else get_questions_batch_chain(size, schema)
+                jobs.append((q_type, size, scheduler.assign(size)))
+                remaining -= size
+
+        def run_job(job):
+            q_type, size, chunk_index = job
+            chain = chains[(q_type, size)]
+            context = scheduler.context(chunk_index)
+            if size == 1:
+                return _generate_and_validate_question(chain, q_type, SCHEMA_MAP[q_type], context)
+            return _generate_and_validate_batch(chain, q_type, SCHEMA_MAP[q_type], context, size)
+
+        # 3. 按完成顺序消费结果，攒批入库
+        pending = []
+        last_flush = time.monotonic()
+
+        def flush():
+            nonlocal pending, last_flush
+            stats['saved'] += save_generated_questions(db, task_record, pending)
+            pending = []
+            last_flush = time.monotonic()
+
+        print(f"Executing {len(jobs)} generation jobs with adaptive concurrency...")
+        executor = GenerationExecutor()
+        started_at = time.monotonic()
+        for outcome in executor.run(run_job, jobs):
+            q_type, size, _ = outcome.item
+            processed += size
+            if outcome.error is not None:
+                stats['llm_errors'] += size
+                print(f"Warning: LLM call failed for {q_type} x{size} after {outcome.latency:.1f}s. Error: {outcome.error}")
+            else:
+                for stage, question_data in outcome.result:
+                    if stage == "parse_failed":
+                        stats['parse_failures'] += 1
+                    else:
+                        stats['parsed'] += 1
+                        if stage == "schema_failed":
+                            stats['schema_failures'] += 1
+                        else:
+                            pending.append((q_type, question_data))
+
+            if len(pending) >= GENERATION_SAVE_BATCH_SIZE or \
+               (pending and time.monotonic() - last_flush >= GENERATION_SAVE_INTERVAL_SECONDS):
+                flush()
+            report(f"已完成 {processed}/{total_requested} 道，已入库 {stats['saved']} 道")
+
+        flush()
+        elapsed = time.monotonic() - started_at
+        finish_generation_task(db, task_record)
+        print(f"Successfully saved {stats['saved']} questions to DB. Executor stats: {executor.limiter.snapshot()}, LLM calls: {get_llm_call_stats()}")
+        print(f"JSON parser stage counts: {get_metrics(PARSER_METRICS_GROUP)}, streaming: {get_streaming_stats()}")
     finally:
         db.close()
-        
-    # 【优化3】返回更详细的结果字典
-    failures = total_requested - generated_count
-    return {'generated': generated_count, 'failures': failures, 'total': total_requested, 'status': 'Task completed!'}
\ No newline at end of file
+        job_lock.release()
+
+    failures = total_requested - stats['saved']
+    result = {'generated': stats['saved'], 'failures': failures, 'total': total_requested, 'status': 'Task completed!'}
+    result.update(stats)
+    # 本次运行的实际产出速率，用于比较不同 batch_size 下的题目/分钟
+    result['batch_size'] = batch_size
+    result['questions_per_minute'] = round((stats['saved'] - resumed_count) / elapsed * 60, 2) if elapsed > 0 else 0.0
+    return result
\ No newline at end of file
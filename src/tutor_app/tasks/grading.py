@@ -1,10 +1,21 @@
 # src/tutor_app/tasks/grading.py
-import json
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
 from .celery_app import celery_app
+from src.tutor_app.core.config import settings
 from src.tutor_app.db.session import SessionLocal
 from src.tutor_app.db.models import PracticeLog, Question
-from src.tutor_app.llms.llm_factory import get_chat_model
-from src.tutor_app.rag.json_parser import parse_json_with_ai_fallback
+from src.tutor_app.crud.crud_question import get_cached_gradings, save_gradings_to_cache
+from src.tutor_app.analytics.cache import bump_data_version
+from src.tutor_app.core.metrics import incr_metric, get_metrics
+from src.tutor_app.rag.pregrader import pregrade_answers
+from src.tutor_app.llms.llm_factory import get_structured_chat_model
+from src.tutor_app.llms.streaming import stream_json, schema_validator
+from src.tutor_app.rag.json_parser import parse_json_with_ai_fallback, parse_structured_output
+from src.tutor_app.schemas.grading import GradingResultSchema, BatchGradingResultSchema
 
 GRADING_PROMPT_TEMPLATE = """
 你是一名经验丰富、公平公正的AI助教。你的任务是根据提供的“标准答案”，评估“用户的回答”是否正确地回答了“原始问题”。
@@ -29,10 +40,181 @@ GRADING_PROMPT_TEMPLATE = """
 ## 请输出你的JSON格式评估结果:
 """
 
+BATCH_GRADING_PROMPT_TEMPLATE = """
+你是一名经验丰富、公平公正的AI助教。下面是同一道题目的多份“用户的回答”，请根据“标准答案”逐一评估每份回答是否正确地回答了“原始问题”。
+
+## 规则：
+1.  **精确性优先**: 严格依据“标准答案”的核心要点来评判。
+2.  **理解意图**: 即使用户的措辞不同，只要核心意思正确，也应给予肯定。
+3.  **独立评分**: 每份回答单独评判，不要互相比较。
+4.  **输出格式**: 你的回答必须是一个严格的JSON对象 {{"results": [...]}}，数组中每个元素包含三个字段：`index`、`score` 和 `feedback`。
+    * `index`: 回答的编号，与下方编号一致。
+    * `score`: 必须是以下三个字符串之一: "正确", "部分正确", "错误"。
+    * `feedback`: 对你的评分给出简明扼要的解释（50字以内）。
+
+## 评估材料：
+### 原始问题:
+{question}
+
+### 标准答案:
+{standard_answer}
+
+### 用户的回答（共 {count} 份）:
+{user_answers}
+
+## 请输出你的JSON格式评估结果:
+"""
+
+GRADING_FAILED_FEEDBACK = "AI返回格式错误，无法解析评分。"
+GRADING_METRICS_GROUP = "grading"
+
+def normalize_answer(user_answer: str) -> str:
+    """
+    归一化用户答案作为缓存键：全角转半角、去掉首尾空白和结尾标点、合并连续空白、英文转小写。
+    只消除不影响语义的差异，保证“相同答案”才会命中缓存。
+    """
+    text = unicodedata.normalize("NFKC", user_answer or "")
+    text = re.sub(r"\s+", " ", text).strip().lower()
+    return text.rstrip("。.!！;；,， ")
+
+def answer_hash(normalized_answer: str) -> str:
+    return hashlib.sha256(normalized_answer.encode("utf-8")).hexdigest()
+
+def _get_grading_llm(schema):
+    """评分使用确定性的采样参数，相同输入得到相同评分，结果才可以缓存复用。"""
+    return get_structured_chat_model(schema, temperature=0, seed=settings.GRADING_SEED)
+
+def _grade_single_answer(question_text: str, standard_answer: str, user_answer: str) -> Optional[dict]:
+    """对一份答案调用一次LLM评分，返回 {"score", "feedback"}，无法解析时返回None。"""
+    prompt = GRADING_PROMPT_TEMPLATE.format(
+        question=question_text,
+        standard_answer=standard_answer,
+        user_answer=user_answer
+    )
+    llm = _get_grading_llm(GradingResultSchema)
+    # 流式调用：评分对象完整后立即终止，跳过模型在JSON之后的多余输出
+    llm_output = stream_json(llm, prompt, schema_validator(GradingResultSchema), kind="grading").text
+
+    # 结构化输出一步校验；模型忽略Schema时退回多级修复解析器
+    structured = parse_structured_output(llm_output, GradingResultSchema)
+    parsed_result = structured.model_dump() if structured else parse_json_with_ai_fallback(llm_output)
+    if parsed_result and 'score' in parsed_result and 'feedback' in parsed_result:
+        return parsed_result
+    return None
+
+def _grade_answer_batch(question_text: str, standard_answer: str, user_answers: List[str]) -> List[Optional[dict]]:
+    """
+    【批量评分】同一道题的多份答案共用题目和标准答案，一次LLM调用评完。
+    返回与 user_answers 等长的列表，模型漏评或格式错误的位置为None。
+    """
+    prompt = BATCH_GRADING_PROMPT_TEMPLATE.format(
+        question=question_text,
+        standard_answer=standard_answer,
+        count=len(user_answers),
+        user_answers="\n".join(f"[{i}] {answer}" for i, answer in enumerate(user_answers, start=1))
+    )
+    llm = _get_grading_llm(BatchGradingResultSchema)
+    llm_output = stream_json(llm, prompt, schema_validator(BatchGradingResultSchema), kind="grading_batch").text
+
+    structured = parse_structured_output(llm_output, BatchGradingResultSchema)
+    if structured is not None:
+        items = [item.model_dump() for item in structured.results]
+    else:
+        parsed = parse_json_with_ai_fallback(llm_output) or {}
+        items = [item for item in parsed.get("results") or [] if isinstance(item, dict)]
+
+    by_index = {}
+    for item in items:
+        if isinstance(item.get("index"), int) and 'score' in item and 'feedback' in item:
+            by_index.setdefault(item["index"], {"score": item["score"], "feedback": item["feedback"]})
+    return [by_index.get(i) for i in range(1, len(user_answers) + 1)]
+
+def grade_logs_for_question(db, question: Question, logs: List[PracticeLog]) -> Dict[str, int]:
+    """
+    为同一道题的一组评分日志打分：
+    1. 按归一化答案去重，相同答案只评一次；
+    2. 先查评分缓存 (question_id, 归一化答案)，命中的直接复用；
+    3. 用向量相似度预评分，明显正确/明显错误的答案不再调用大模型；
+    4. 剩余的答案按 GRADING_BATCH_MAX_ANSWERS 分组批量评分，批量结果缺失的再逐个补评；
+    5. 大模型的新评分写回缓存，所有日志在一个事务中更新。
+    返回本次的统计计数。
+    """
+    question_text = question.content_data.get("question")
+    standard_text = question.answer_data.get("text")
+
+    groups = OrderedDict() # answer_hash -> (归一化答案, 原始答案, [日志])
+    for log in logs:
+        normalized = normalize_answer(log.user_answer)
+        key = answer_hash(normalized)
+        if key not in groups:
+            groups[key] = (normalized, log.user_answer, [])
+        groups[key][2].append(log)
+
+    results = get_cached_gradings(db, question.id, list(groups))
+    stats = {"logs": len(logs), "cache_hits": sum(len(groups[key][2]) for key in results),
+             "pregraded": 0, "llm_graded": 0, "llm_calls": 0, "failed": 0}
+
+    misses = [key for key in groups if key not in results]
+    pregraded = pregrade_answers(question_text, standard_text, [groups[key][1] for key in misses])
+    for key, grading in zip(misses, pregraded):
+        if grading is not None:
+            results[key] = {"ai_score": grading["score"], "ai_feedback": grading["feedback"]}
+            stats["pregraded"] += len(groups[key][2])
+    misses = [key for key in misses if key not in results]
+
+    new_entries = []
+    batch_size = max(1, settings.GRADING_BATCH_MAX_ANSWERS)
+    for start in range(0, len(misses), batch_size):
+        chunk = misses[start:start + batch_size]
+        answers = [groups[key][1] for key in chunk]
+        if len(chunk) == 1:
+            graded = [_grade_single_answer(question_text, standard_text, answers[0])]
+        else:
+            graded = _grade_answer_batch(question_text, standard_text, answers)
+        stats["llm_calls"] += 1
+        for key, answer, grading in zip(chunk, answers, graded):
+            if grading is None and len(chunk) > 1:
+                grading = _grade_single_answer(question_text, standard_text, answer)
+                stats["llm_calls"] += 1
+            if grading is None:
+                continue
+            results[key] = {"ai_score": grading["score"], "ai_feedback": grading["feedback"]}
+            new_entries.append(dict(results[key], answer_hash=key, normalized_answer=groups[key][0]))
+            stats["llm_graded"] += len(groups[key][2])
+
+    for key, (_, _, group_logs) in groups.items():
+        for log in group_logs:
+            if key in results:
+                log.ai_score = results[key]["ai_score"]
+                log.ai_feedback = results[key]["ai_feedback"]
+            else:
+                log.ai_feedback = GRADING_FAILED_FEEDBACK
+                stats["failed"] += 1
+    db.commit()
+    bump_data_version()
+    save_gradings_to_cache(db, question.id, new_entries)
+    for name in ("logs", "cache_hits", "pregraded", "llm_graded", "llm_calls", "failed"):
+        if stats[name]:
+            incr_metric(GRADING_METRICS_GROUP, name, stats[name])
+    return stats
+
+def get_grading_traffic_report() -> dict:
+    """
+    汇总所有进程的评分计数，给出评分缓存和向量预评分一共替大模型挡掉了多少评分请求。
+    """
+    counts = get_metrics(GRADING_METRICS_GROUP)
+    total = counts.get("logs", 0)
+    avoided = counts.get("cache_hits", 0) + counts.get("pregraded", 0)
+    report = dict(counts)
+    report["llm_avoided_ratio"] = avoided / total if total else 0.0
+    report["pregraded_ratio"] = counts.get("pregraded", 0) / total if total else 0.0
+    return report
+
 @celery_app.task(bind=True)
 def grade_short_answer_task(self, log_id: int):
     """
     一个Celery任务，用于在后台对简答题进行AI评分。
+    相同题目下相同的答案会直接命中评分缓存，不再调用大模型。
     """
     db = SessionLocal()
     try:
@@ -43,34 +225,51 @@ def grade_short_answer_task(self, log_id: int):
         question = db.query(Question).filter(Question.id == log_entry.question_id).first()
         if not question:
             raise ValueError("Question not found")
-            
-        question_content = json.loads(question.content)
-        standard_answer = json.loads(question.answer)
-
-        prompt = GRADING_PROMPT_TEMPLATE.format(
-            question=question_content.get("question"),
-            standard_answer=standard_answer.get("text"),
-            user_answer=log_entry.user_answer
-        )
-        
-        llm = get_chat_model()
-        llm_output = llm.invoke(prompt)
-        
-        parsed_result = parse_json_with_ai_fallback(llm_output)
-        
-        if parsed_result and 'score' in parsed_result and 'feedback' in parsed_result:
-            log_entry.ai_score = parsed_result['score']
-            log_entry.ai_feedback = parsed_result['feedback']
-            db.commit()
-            return f"Success: Graded log {log_id}"
-        else:
-            log_entry.ai_feedback = "AI返回格式错误，无法解析评分。"
-            db.commit()
+
+        stats = grade_logs_for_question(db, question, [log_entry])
+        if stats["failed"]:
             raise ValueError("AI response parsing failed")
+        source = " (cached)" if stats["cache_hits"] else " (pre-graded)" if stats["pregraded"] else ""
+        return f"Success: Graded log {log_id}{source}"
 
     except Exception as e:
         self.update_state(state='FAILURE', meta={'exc': str(e)})
         db.rollback()
         return f"Failed to grade log {log_id}: {e}"
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@celery_app.task(bind=True)
+def grade_short_answers_batch_task(self, log_ids: List[int]):
+    """
+    【批量评分】一次处理多条评分日志（例如一场模拟考试中的全部简答题）。
+    日志按题目分组：同一道题的答案共用上下文批量评分，相同答案和缓存命中的答案不再调用大模型。
+    """
+    db = SessionLocal()
+    totals = {"logs": 0, "cache_hits": 0, "pregraded": 0, "llm_graded": 0, "llm_calls": 0, "failed": 0}
+    try:
+        logs = db.query(PracticeLog).filter(PracticeLog.id.in_(log_ids)).all()
+        logs_by_question = OrderedDict()
+        for log in logs:
+            logs_by_question.setdefault(log.question_id, []).append(log)
+        questions = {q.id: q for q in db.query(Question).filter(Question.id.in_(list(logs_by_question))).all()}
+
+        for done, (question_id, question_logs) in enumerate(logs_by_question.items(), start=1):
+            question = questions.get(question_id)
+            try:
+                if question is None:
+                    raise ValueError("Question not found")
+                stats = grade_logs_for_question(db, question, question_logs)
+            except Exception as e:
+                print(f"Warning: grading failed for question {question_id}. Error: {e}")
+                db.rollback()
+                stats = {"logs": len(question_logs), "failed": len(question_logs)}
+            for key, value in stats.items():
+                totals[key] += value
+            self.update_state(state='PROGRESS', meta=dict(totals, current=done, total=len(logs_by_question)))
+
+        totals["failed"] += len(set(log_ids)) - len(logs)
+        print(f"Batch grading finished: {totals}, overall traffic: {get_grading_traffic_report()}")
+        return totals
+    finally:
+        db.close()
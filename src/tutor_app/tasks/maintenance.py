@@ -0,0 +1,132 @@
+# src/tutor_app/tasks/maintenance.py
+import redis
+from sqlalchemy import func, update
+from .celery_app import celery_app
+from src.tutor_app.db.session import SessionLocal
+from src.tutor_app.db.models import Question
+from src.tutor_app.crud import crud_question, due_queue
+from src.tutor_app.crud.sampling import random_key_expression
+from src.tutor_app.db import partitions
+
+RESHUFFLE_BATCH_SIZE = 50000 # 每个事务重新生成多少道题的随机键，避免长时间锁住整张表
+
+@celery_app.task(bind=True)
+def reshuffle_question_keys_task(self):
+    """
+    【定时维护】重新生成所有题目的 random_key。
+    抽题本身不依赖随机键的间隔（见 sampling.sample_questions），但随机键相邻的题偶尔会落进同一个候选区间一起出现，
+    定期洗牌打散这种相邻关系。
+    按ID区间分批提交，期间抽题照常进行。
+    """
+    db = SessionLocal()
+    try:
+        max_id = db.query(func.max(Question.id)).scalar() or 0
+        new_key = random_key_expression(db)
+        updated = 0
+        for start in range(0, max_id + 1, RESHUFFLE_BATCH_SIZE):
+            result = db.execute(
+                update(Question)
+                .where(Question.id >= start, Question.id < start + RESHUFFLE_BATCH_SIZE)
+                .values(random_key=new_key)
+            )
+            db.commit()
+            updated += result.rowcount
+            self.update_state(state='PROGRESS', meta={'current': min(start + RESHUFFLE_BATCH_SIZE, max_id), 'total': max_id})
+        print(f"Reshuffled random_key for {updated} questions.")
+        return {'updated': updated}
+    finally:
+        db.close()
+
+@celery_app.task
+def rebuild_question_state_task(user_id: int = 1):
+    """
+    【维护】从练习记录全量重建 user_question_state。
+    日常由每次写练习记录时同步维护；首次上线回填或怀疑数据不一致时手动触发。
+    """
+    db = SessionLocal()
+    try:
+        rows = crud_question.rebuild_question_state(db, user_id=user_id)
+        print(f"Rebuilt user_question_state for user {user_id}: {rows} questions.")
+        return {'rows': rows}
+    finally:
+        db.close()
+
+@celery_app.task
+def rebuild_practice_rollups_task():
+    """
+    【维护】从练习记录全量重建看板使用的按日汇总表 practice_daily_rollup。
+    日常随练习记录写入同步累加；首次上线回填或直接改动过 practice_logs 后手动触发。
+    """
+    db = SessionLocal()
+    try:
+        rows = crud_question.rebuild_practice_rollups(db)
+        print(f"Rebuilt practice_daily_rollup: {rows} rows.")
+        return {'rows': rows}
+    finally:
+        db.close()
+
+@celery_app.task
+def rebuild_srs_stats_task(user_id: int = 1, infer_missing_quality: bool = False):
+    """
+    【维护】从练习记录批量重放 SM-2，重建 user_question_stats。
+    修复SRS数据、调整算法参数或导入历史练习记录之后手动触发；
+    infer_missing_quality=True 时，没有自评的旧记录按答对/答错推断 quality 一并重放。
+    """
+    db = SessionLocal()
+    try:
+        rows = crud_question.rebuild_srs_stats(db, user_id=user_id, infer_missing_quality=infer_missing_quality)
+        print(f"Rebuilt user_question_stats for user {user_id}: {rows} questions.")
+        return {'rows': rows}
+    finally:
+        db.close()
+
+@celery_app.task
+def fit_fsrs_parameters_task(user_id: int = 1, iterations: int = 200):
+    """
+    【定时维护】在练习历史上离线拟合 FSRS 调度器的参数（SRS_SCHEDULER="fsrs" 时使用）。
+    新参数只在对数损失优于当前参数时保存；作答时的调度只读取保存好的参数，不受拟合耗时影响。
+    """
+    db = SessionLocal()
+    try:
+        result = crud_question.fit_fsrs_parameters(db, user_id=user_id, iterations=iterations)
+        saved = result.log_loss < result.baseline_log_loss
+        print(f"Fitted FSRS parameters for user {user_id} on {result.reviews} reviews in {result.seconds:.1f}s: "
+              f"log loss {result.baseline_log_loss:.4f} -> {result.log_loss:.4f} ({'saved' if saved else 'not saved'}).")
+        return {'reviews': result.reviews, 'log_loss': result.log_loss,
+                'baseline_log_loss': result.baseline_log_loss, 'saved': saved}
+    finally:
+        db.close()
+
+@celery_app.task
+def reconcile_due_queues_task():
+    """
+    【定时维护】按 user_question_stats 整体重建每个用户的待复习队列（Redis 有序集合），
+    修正写入失败、并发重建等原因造成的漂移，并打印漂移量。
+    """
+    db = SessionLocal()
+    try:
+        report = {}
+        for user_id in due_queue.due_queue_user_ids(db):
+            try:
+                report[user_id] = due_queue.rebuild_due_queue(db, user_id)
+            except redis.WatchError as e: # 该用户正在频繁作答，队列由写入路径维护着，留给下一次对账
+                print(f"Warning: Skipped reconciling due queue for user {user_id}: {e}")
+                continue
+            print(f"Reconciled due queue for user {user_id}: {report[user_id]}")
+        return report
+    finally:
+        db.close()
+
+@celery_app.task
+def maintain_practice_log_partitions_task():
+    """
+    【定时维护】PostgreSQL 上为 practice_logs 提前建好之后几个月的分区，
+    并把超出保留期（PRACTICE_LOG_HOT_MONTHS）的月份归档为 Parquet 文件后删除分区。
+    """
+    db = SessionLocal()
+    try:
+        result = partitions.maintain_partitions(db)
+        print(f"Practice log partitions: created {result['created']}, archived {result['archived']}.")
+        return result
+    finally:
+        db.close()
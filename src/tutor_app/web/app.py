@@ -1,13 +1,14 @@
 # src/tutor_app/web/app.py
 import streamlit as st
 from datetime import datetime, date
-from src.tutor_app.db.session import SessionLocal
 from src.tutor_app.analytics.dashboard_data import get_practice_summary
 from src.tutor_app.db.models import Question
 # 【优化1】导入新的CRUD函数
 from src.tutor_app.crud.crud_question import get_recent_sources, count_review_questions_today
 from src.tutor_app.core.utils import convert_to_beijing_time
 from src.tutor_app.core.logging import setup_logging
+from src.tutor_app.analytics.loader import load_dashboard_data
+from src.tutor_app.web.components.load_timings import display_load_timings
 
 setup_logging()
 
@@ -24,27 +25,31 @@ if "today_date" not in st.session_state:
 st.title("🚀 个人AI学习与测评平台")
 st.caption(f"今天是 {st.session_state.today_date}，又是充满希望的一天！") 
 
-# --- 获取核心数据 ---
-db = SessionLocal()
-try:
+# --- 获取核心数据（各查询并发执行，失败的查询使用默认值） ---
+bundle = load_dashboard_data("home", {
     # 宏观数据
-    overall_summary = get_practice_summary(db)
-    total_questions = db.query(Question).count()
-    recent_sources = get_recent_sources(db, 5)
-    
+    "overall_summary": lambda db: get_practice_summary(db),
+    "total_questions": lambda db: db.query(Question).count(),
+    "recent_sources": lambda db: get_recent_sources(db, 5),
     # 【优化2】获取今日待复习和今日学习数据
-    review_count_today = count_review_questions_today(db)
-    today_summary = get_practice_summary(db, start_date=date.today(), end_date=date.today())
+    "review_count_today": lambda db: count_review_questions_today(db),
+    "today_summary": lambda db: get_practice_summary(db, start_date=date.today(), end_date=date.today()),
+}, defaults={
+    "overall_summary": {"total": 0, "accuracy": 0},
+    "total_questions": 0,
+    "recent_sources": [],
+    "review_count_today": 0,
+    "today_summary": {"total": 0, "correct": 0, "accuracy": 0},
+})
+display_load_timings(bundle)
+if bundle.errors:
+    st.error(f"加载数据时出错: {'; '.join(bundle.errors.values())}")
 
-except Exception as e:
-    st.error(f"加载数据时出错: {e}")
-    overall_summary = {"total": 0, "accuracy": 0}
-    total_questions = 0
-    recent_sources = []
-    review_count_today = 0
-    today_summary = {"total": 0, "correct": 0, "accuracy": 0}
-finally:
-    db.close()
+overall_summary = bundle["overall_summary"]
+total_questions = bundle["total_questions"]
+recent_sources = bundle["recent_sources"]
+review_count_today = bundle["review_count_today"]
+today_summary = bundle["today_summary"]
 
 # --- 【优化3: “行动号召”模块】 ---
 st.markdown("---")
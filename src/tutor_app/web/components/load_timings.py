@@ -0,0 +1,24 @@
+# src/tutor_app/web/components/load_timings.py
+import pandas as pd
+import streamlit as st
+from src.tutor_app.analytics.loader import DashboardBundle
+from src.tutor_app.core.config import settings
+
+
+def display_load_timings(bundle: DashboardBundle):
+    """
+    可复用的调试面板：在侧边栏显示本次页面加载中每个查询的耗时。
+    由 DASHBOARD_DEBUG_PANEL 控制是否显示。
+    """
+    if not settings.DASHBOARD_DEBUG_PANEL:
+        return
+
+    with st.sidebar.expander("🔧 数据加载耗时", expanded=False):
+        c1, c2 = st.columns(2)
+        c1.metric("页面等待", f"{bundle.wall_seconds * 1000:.0f} ms")
+        c2.metric("串行合计", f"{bundle.serial_seconds * 1000:.0f} ms")
+        df = pd.DataFrame(
+            [(t.name, round(t.seconds * 1000, 1), t.error or "") for t in bundle.timings.values()],
+            columns=["查询", "耗时(ms)", "错误"]
+        ).sort_values("耗时(ms)", ascending=False)
+        st.dataframe(df, use_container_width=True, hide_index=True)
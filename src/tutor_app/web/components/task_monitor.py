@@ -35,9 +35,13 @@ def display_global_task_monitor():
                     tasks_to_remove.append(task_id)
             else:
                 # 任务正在进行中
-                progress_info = task_result.info or {}
+                progress_info = task_result.info if isinstance(task_result.info, dict) else {}
                 status_text = progress_info.get('status', '正在排队...')
                 st.info(f"状态: {status_text}")
+                if progress_info.get('total'):
+                    st.progress(min(progress_info.get('current', 0) / progress_info['total'], 1.0))
+                if 'saved' in progress_info:
+                    st.caption(f"已解析 {progress_info.get('parsed', 0)} · 格式不符 {progress_info.get('schema_failures', 0)} · 已入库 {progress_info['saved']}")
             
             st.divider()
 
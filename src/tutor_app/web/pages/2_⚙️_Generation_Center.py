@@ -4,8 +4,10 @@ import pandas as pd
 import time
 from src.tutor_app.db.session import SessionLocal
 from src.tutor_app.db.models import KnowledgeSource
-from src.tutor_app.tasks.generation import generate_questions_task
+from src.tutor_app.crud.crud_question import get_unfinished_generation_tasks
+from src.tutor_app.tasks.generation import generate_questions_task, is_generation_job_running
 from src.tutor_app.core.utils import convert_to_beijing_time
+from src.tutor_app.core.config import settings
 from src.tutor_app.web.components.task_monitor import display_global_task_monitor
 
 # --- 页面配置与全局组件 ---
@@ -39,13 +41,17 @@ with tab1:
                         with cols[i]:
                             type_counts[q_type] = st.number_input(f"“{q_type}”数量:", min_value=1, max_value=50, value=3, key=f"gen_num_{q_type}")
                 
+                with st.expander("高级设置"):
+                    batch_size = st.number_input("每次AI调用生成的题目数 (k)", min_value=1, max_value=10, value=settings.GENERATION_BATCH_SIZE,
+                                                 help="k>1 时一次调用基于同一段上下文生成多道题，省去重复的提示词预填充和检索。", key="gen_batch_size")
+
                 st.divider()
                 if st.button("🚀 提交出题任务", type="primary", use_container_width=True):
                     if selected_option and type_counts:
                         source_id = source_options[selected_option]
                         
                         # 【核心改动】调用Celery任务并注册到全局监控器
-                        task = generate_questions_task.delay(source_id, type_counts)
+                        task = generate_questions_task.delay(source_id, type_counts, batch_size=batch_size)
                         
                         if 'active_tasks' not in st.session_state:
                             st.session_state.active_tasks = {}
@@ -65,6 +71,32 @@ with tab1:
             db.close()
 
 with tab2:
+    # --- 中断的出题任务：支持断点续跑 ---
+    db = SessionLocal()
+    try:
+        unfinished_tasks = get_unfinished_generation_tasks(db)
+        if unfinished_tasks:
+            st.subheader("⏸️ 未完成的出题任务")
+            for gen_task in unfinished_tasks:
+                saved = sum((gen_task.saved_counts or {}).values())
+                requested = sum(gen_task.type_counts.values())
+                c1, c2 = st.columns([3, 1])
+                c1.write(f"知识库 {gen_task.source_id} · 已入库 {saved}/{requested} 道 · 最近更新 {convert_to_beijing_time(gen_task.updated_at).strftime('%Y-%m-%d %H:%M:%S')}")
+                # 长时间没有进度也可能只是卡在一次很慢的模型调用里：原任务仍持有任务锁时不允许续跑
+                if is_generation_job_running(gen_task.id):
+                    c2.caption("⏳ 原任务仍在运行")
+                elif c2.button("继续生成", key=f"resume_{gen_task.id}", use_container_width=True):
+                    task = generate_questions_task.delay(gen_task.source_id, gen_task.type_counts, job_id=gen_task.id)
+                    if 'active_tasks' not in st.session_state:
+                        st.session_state.active_tasks = {}
+                    st.session_state.active_tasks[task.id] = {"name": f"续跑出题任务 (知识库 {gen_task.source_id})"}
+                    st.toast("已提交续跑任务，只会补齐尚未入库的题目。")
+                    time.sleep(1)
+                    st.rerun()
+            st.divider()
+    finally:
+        db.close()
+
     st.subheader("知识库处理状态监控")
     auto_refresh = st.checkbox("每5秒自动刷新列表")
     db = SessionLocal()
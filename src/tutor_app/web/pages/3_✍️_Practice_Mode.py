@@ -1,6 +1,5 @@
 # src/tutor_app/web/pages/3_✍️_Practice_Mode.py
 import streamlit as st
-import json
 import re
 import time
 from src.tutor_app.db.session import SessionLocal
@@ -26,8 +25,8 @@ if st.session_state.get("start_smart_review"):
     
     db = SessionLocal()
     try:
-        # 获取所有待复习题目
-        review_questions = get_review_questions(db, count=999) # 获取所有待复习的
+        # 从待复习队列取最早到期的题目（至多999道）
+        review_questions = get_review_questions(db, count=999)
         if review_questions:
             type_order = ["单项选择题", "判断题", "填空题", "简答题"]
             st.session_state.session_questions = sorted(
@@ -46,6 +45,31 @@ if st.session_state.get("start_smart_review"):
     # 刷新页面以进入刷题界面
     st.rerun()
 
+# --- 【新增】响应来自错题本的“开始本次错题集训”指令（只传题目ID，在这里按ID加载题目） ---
+if st.session_state.get("practice_from_mistakes"):
+    mistake_ids = st.session_state.practice_from_mistakes
+    st.session_state.practice_from_mistakes = None # 立即重置，防止重复触发
+
+    db = SessionLocal()
+    try:
+        mistake_questions = get_questions_by_ids(db, mistake_ids)
+        if mistake_questions:
+            type_order = ["单项选择题", "判断题", "填空题", "简答题"]
+            st.session_state.session_questions = sorted(
+                mistake_questions,
+                key=lambda q: type_order.index(q.question_type) if q.question_type in type_order else 99
+            )
+            st.session_state.current_q_index = 0
+            st.session_state.user_answers = {}
+            st.session_state.submitted_feedback = {}
+            st.toast(f"已为您加载 {len(mistake_questions)} 道错题！")
+        else:
+            st.toast("没有找到错题。")
+    finally:
+        db.close()
+
+    st.rerun()
+
 # --- Session State 初始化 ---
 if 'session_questions' not in st.session_state: st.session_state.session_questions = []
 if 'current_q_index' not in st.session_state: st.session_state.current_q_index = 0
@@ -104,21 +128,14 @@ def submit_current_answer():
     is_correct = False
     correct_answer_display = ""
     try:
-        answer_data = json.loads(question.answer)
-        content_data = json.loads(question.content)
-        if question.question_type == "单项选择题":
-            correct_answer_display = content_data["options"][answer_data["correct_option_index"]]
-            is_correct = (user_answer == correct_answer_display)
-        elif question.question_type == "判断题":
-            correct_answer_display = "正确" if answer_data["correct_answer"] else "错误"
+        correct_answer_display = question.correct_answer_text
+        if question.question_type in ["单项选择题", "判断题"]:
             is_correct = (user_answer == correct_answer_display)
         elif question.question_type == "简答题":
-            correct_answer_display = answer_data["text"]
             is_correct = False 
         elif question.question_type == "填空题":
-            correct_answer_list = answer_data["blanks"]
+            correct_answer_list = question.answer_data["blanks"]
             is_correct = (isinstance(user_answer, list) and len(user_answer) == len(correct_answer_list) and all(ua.strip().lower() == ca.strip().lower() for ua, ca in zip(user_answer, correct_answer_list)))
-            correct_answer_display = ", ".join(correct_answer_list)
         
         st.session_state.submitted_feedback[q_id] = {
             'is_correct': is_correct, 
@@ -132,7 +149,7 @@ def submit_current_answer():
 def render_question_and_feedback_area(question):
     # ... (代码与上一版相同)
     q_id = question.id
-    content = json.loads(question.content)
+    content = question.content_data
     is_submitted = q_id in st.session_state.submitted_feedback
     
     # 将题目和作答区域放在一个带边框的容器中
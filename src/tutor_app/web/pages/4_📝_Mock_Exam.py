@@ -1,6 +1,5 @@
 # src/tutor_app/web/pages/4_📝_Mock_Exam.py
 import streamlit as st
-import json
 import time
 import re
 import pandas as pd
@@ -15,7 +14,7 @@ from src.tutor_app.crud.crud_question import (
     create_log_for_grading,
     get_grading_results
 )
-from src.tutor_app.tasks.grading import grade_short_answer_task
+from src.tutor_app.tasks.grading import grade_short_answers_batch_task
 from src.tutor_app.web.components.task_monitor import display_global_task_monitor
 
 st.set_page_config(page_title="模拟考试", layout="wide")
@@ -32,17 +31,8 @@ def analyze_exam_by_tag(questions, user_answers):
         if tag not in tag_stats: tag_stats[tag] = {"correct": 0, "total": 0}
         tag_stats[tag]["total"] += 1
         user_ans = user_answers.get(q_id)
-        is_correct = False
-        try:
-            content = json.loads(q['content'])
-            answer_data = json.loads(q['answer'])
-            if q['question_type'] == "单项选择题":
-                correct_answer_text = content["options"][answer_data["correct_option_index"]]
-                if user_ans == correct_answer_text: is_correct = True
-            elif q['question_type'] == "判断题":
-                correct_answer_text = "正确" if answer_data["correct_answer"] else "错误"
-                if user_ans == correct_answer_text: is_correct = True
-        except Exception: pass
+        is_correct = q['question_type'] in ("单项选择题", "判断题") and q.get('correct_answer') is not None \
+            and user_ans == q['correct_answer']
         if is_correct: tag_stats[tag]["correct"] += 1
     if not tag_stats: return pd.DataFrame()
     df_data = []
@@ -52,7 +42,13 @@ def analyze_exam_by_tag(questions, user_answers):
     return pd.DataFrame(df_data)
 
 def question_to_dict(q):
-    return {"id": q.id, "question_type": q.question_type, "content": q.content, "answer": q.answer, "analysis": q.analysis, "knowledge_tag": q.knowledge_tag}
+    """转换为存入 session_state 的字典：内容/答案只在这里解码一次，正确答案文本预先算好，倒计时每秒重跑页面时不再重复解析。"""
+    try:
+        correct_answer = q.correct_answer_text
+    except Exception:
+        correct_answer = None
+    return {"id": q.id, "question_type": q.question_type, "content": q.content_data, "answer": q.answer_data,
+            "correct_answer": correct_answer, "analysis": q.analysis, "knowledge_tag": q.knowledge_tag}
 
 if 'exam_state' not in st.session_state: st.session_state.exam_state = "setup"
 if 'exam_questions' not in st.session_state: st.session_state.exam_questions = []
@@ -136,7 +132,7 @@ elif st.session_state.exam_state == "running":
             q_id = q['id']
             st.subheader(f"第 {i+1} 题: {q['question_type']}")
             try:
-                content = json.loads(q['content'])
+                content = q['content']
                 if q['question_type'] in ["单项选择题", "判断题"]:
                     st.write(content["question"])
                     options = content.get("options", ["正确", "错误"])
@@ -176,25 +172,16 @@ elif st.session_state.exam_state == "running":
                         # 1. 为简答题创建评分日志
                         log_id = create_log_for_grading(db, q_id, user_ans)
                         grading_log_ids_map[q_id] = log_id
-                        # 2. 派发异步评分任务
-                        grade_short_answer_task.delay(log_id)
                     else:
-                        # 3. 为客观题直接评分
-                        is_correct = False
-                        try:
-                            content = json.loads(q['content'])
-                            answer_data = json.loads(q['answer'])
-                            if q['question_type'] == "单项选择题":
-                                correct_answer_text = content["options"][answer_data["correct_option_index"]]
-                                if user_ans == correct_answer_text: is_correct = True
-                            elif q['question_type'] == "判断题":
-                                correct_answer_text = "正确" if answer_data["correct_answer"] else "错误"
-                                if user_ans == correct_answer_text: is_correct = True
-                            if is_correct:
-                                score += 1
-                        except Exception:
-                            continue
+                        # 2. 为客观题直接评分
+                        if q['question_type'] in ("单项选择题", "判断题") and q.get('correct_answer') is not None \
+                                and user_ans == q['correct_answer']:
+                            score += 1
                 
+                # 3. 所有简答题合并为一个批量评分任务，同题同答案只评一次
+                if grading_log_ids_map:
+                    grade_short_answers_batch_task.delay(list(grading_log_ids_map.values()))
+
                 # 4. 保存考试结果，包括简答题的log_id映射
                 save_exam_result(
                     db, st.session_state.exam_id, score, total, 
@@ -258,8 +245,9 @@ elif st.session_state.exam_state == "finished":
         st.subheader("题目详情回顾")
         for i, q in enumerate(result['questions']):
             q_id = q['id']
-            with st.expander(f"第 {i+1} 题 ({q['question_type']}): {json.loads(q['content']).get('question', '')[:30]}..."):
-                st.markdown(f"**题目**: {json.loads(q['content']).get('question', '题目加载失败')}")
+            question_text = q['content'].get('question') or q['content'].get('stem', '')
+            with st.expander(f"第 {i+1} 题 ({q['question_type']}): {question_text[:30]}..."):
+                st.markdown(f"**题目**: {question_text or '题目加载失败'}")
                 user_ans = result['user_answers'].get(q_id)
                 st.error(f"**你的答案**: {user_ans or '未作答'}")
 
@@ -274,16 +262,9 @@ elif st.session_state.exam_state == "finished":
                     else:
                         st.info("🤖 AI 助教正在批阅您的答案，请稍后刷新...")
                 else: # 客观题
-                    try:
-                        content = json.loads(q['content'])
-                        answer_data = json.loads(q['answer'])
-                        correct_answer_text = ""
-                        if q['question_type'] == "单项选择题":
-                            correct_answer_text = content["options"][answer_data["correct_option_index"]]
-                        elif q['question_type'] == "判断题":
-                            correct_answer_text = "正确" if answer_data["correct_answer"] else "错误"
-                        st.success(f"**正确答案**: {correct_answer_text}")
-                    except:
+                    if q.get('correct_answer') is not None:
+                        st.success(f"**正确答案**: {q['correct_answer']}")
+                    else:
                         st.warning("答案解析失败。")
 
                 if q.get('analysis'):
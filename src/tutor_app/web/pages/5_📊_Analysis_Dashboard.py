@@ -1,6 +1,5 @@
 # src/tutor_app/web/pages/5_📊_Analysis_Dashboard.py
 import streamlit as st
-import json
 import datetime
 import pandas as pd
 from src.tutor_app.db.session import SessionLocal
@@ -9,11 +8,17 @@ from src.tutor_app.db.models import KnowledgeSource
 from src.tutor_app.analytics.dashboard_data import (
     get_practice_summary, 
     get_performance_by_source, 
-    get_mistake_notebook,
+    get_mistake_summary,
+    get_mistake_notebook_page,
+    iter_mistake_question_ids,
     get_srs_review_forecast,
-    get_hardest_questions
+    get_hardest_questions,
+    MISTAKE_PAGE_SIZE
 )
+from src.tutor_app.analytics.cache import get_analytics_cache_report
+from src.tutor_app.analytics.loader import load_dashboard_data
 from src.tutor_app.web.components.task_monitor import display_global_task_monitor
+from src.tutor_app.web.components.load_timings import display_load_timings
 
 st.set_page_config(page_title="学习分析", layout="wide")
 display_global_task_monitor()
@@ -34,22 +39,55 @@ with st.container(border=True):
     today = datetime.date.today()
     start_date = col1.date_input("开始日期", today - datetime.timedelta(days=30))
     end_date = col2.date_input("结束日期", today)
-
-# --- 【优化2】获取所有分析所需的数据 ---
-summary = get_practice_summary(db, source_ids=selected_source_ids, start_date=start_date, end_date=end_date)
-performance_df = get_performance_by_source(db, source_ids=selected_source_ids, start_date=start_date, end_date=end_date)
-grouped_mistakes = get_mistake_notebook(db, source_ids=selected_source_ids, start_date=start_date, end_date=end_date)
-# 调用新函数获取记忆健康度数据
-review_forecast_df = get_srs_review_forecast(db)
-hardest_questions = get_hardest_questions(db)
 db.close()
 
+# 错题本键集分页：mistake_cursors[i] 是第 i 页的起始游标，筛选条件变化时回到第一页
+mistake_filter_key = (tuple(selected_source_ids), start_date, end_date)
+if st.session_state.get("mistake_filter_key") != mistake_filter_key:
+    st.session_state.mistake_filter_key = mistake_filter_key
+    st.session_state.mistake_cursors = [None]
+mistake_cursor = st.session_state.mistake_cursors[-1]
+
+# --- 【优化2】并发获取所有分析所需的数据（各查询互不依赖，每个查询使用独立会话） ---
+filters = dict(source_ids=selected_source_ids, start_date=start_date, end_date=end_date)
+bundle = load_dashboard_data("analysis_dashboard", {
+    "summary": lambda s: get_practice_summary(s, **filters),
+    "performance": lambda s: get_performance_by_source(s, **filters),
+    "mistake_summary": lambda s: get_mistake_summary(s, **filters),
+    "mistake_page": lambda s: get_mistake_notebook_page(s, cursor=mistake_cursor, **filters),
+    # 记忆健康度数据
+    "review_forecast": lambda s: get_srs_review_forecast(s),
+    "hardest_questions": lambda s: get_hardest_questions(s),
+}, defaults={
+    "summary": {"total": 0, "correct": 0, "accuracy": 0},
+    "performance": pd.DataFrame(),
+    "mistake_summary": pd.DataFrame(),
+    "mistake_page": ([], None),
+    "review_forecast": pd.DataFrame(),
+    "hardest_questions": [],
+})
+display_load_timings(bundle)
+if bundle.errors:
+    st.error(f"部分数据加载失败: {', '.join(bundle.errors)}")
+
+summary = bundle["summary"]
+performance_df = bundle["performance"]
+mistake_summary_df = bundle["mistake_summary"]
+total_mistakes = int(mistake_summary_df['错题数'].sum()) if not mistake_summary_df.empty else 0
+mistake_page, next_mistake_cursor = bundle["mistake_page"]
+review_forecast_df = bundle["review_forecast"]
+hardest_questions = bundle["hardest_questions"]
+
+cache_report = get_analytics_cache_report()
+st.caption(f"统计缓存：命中 {cache_report['hit']} 次，未命中 {cache_report['miss']} 次，命中率 {cache_report['hit_rate']:.0%}"
+           + (f"，Redis不可用时直接查库 {cache_report['bypass']} 次" if cache_report['bypass'] else ""))
+
 # --- 【优化3】增加新的Tab并重新排序 ---
 tab1, tab2, tab3, tab4 = st.tabs([
     f"📈 数据总览", 
     f"🧠 记忆健康度", # 新增的Tab
     f"📚 各知识库表现", 
-    f"📒 错题本 ({sum(len(data['mistakes']) for data in grouped_mistakes.values())})"
+    f"📒 错题本 ({total_mistakes})"
 ])
 
 with tab1:
@@ -77,9 +115,9 @@ with tab2:
     st.warning("这些是您最容易忘记或感到困难的题目（基于简易度因子 `ease_factor` 排序），请重点关注。")
     if hardest_questions:
         for i, (question, stats) in enumerate(hardest_questions):
-            with st.expander(f"**Top {i+1}:** {json.loads(question.content)['question'][:50]}..."):
-                st.error(f"**题目**:{json.loads(question.content)['question']}")
-                st.info(f"**答案**:{json.loads(question.answer)}")
+            with st.expander(f"**Top {i+1}:** {question.question_text[:50]}..."):
+                st.error(f"**题目**:{question.question_text}")
+                st.info(f"**答案**:{question.answer_data}")
                 st.divider()
                 stat_cols = st.columns(3)
                 stat_cols[0].metric("简易度因子", f"{stats.ease_factor:.2f}", help="值越低表示越难，最低为1.3")
@@ -97,34 +135,47 @@ with tab3:
     else:
         st.info("所选范围内暂无练习数据。")
 
+def start_mistake_practice():
+    """只流式读取错题ID，题目内容交给刷题页面按ID加载。"""
+    db = SessionLocal()
+    try:
+        st.session_state.practice_from_mistakes = list(iter_mistake_question_ids(
+            db, source_ids=selected_source_ids, start_date=start_date, end_date=end_date))
+    finally:
+        db.close()
+
+def next_mistake_page():
+    st.session_state.mistake_cursors.append(next_mistake_cursor)
+
+def prev_mistake_page():
+    st.session_state.mistake_cursors.pop()
+
 with tab4:
     st.header("错题本")
-    all_mistake_ids = [q.id for data in grouped_mistakes.values() for q, log in data['mistakes']]
-    
-    if all_mistake_ids:
-        if st.button("🧠 开始本次错题集训", type="primary", use_container_width=True):
-            st.session_state.practice_from_mistakes = all_mistake_ids
+
+    if total_mistakes:
+        if st.button("🧠 开始本次错题集训", type="primary", use_container_width=True, on_click=start_mistake_practice):
             st.switch_page("pages/3_✍️_Practice_Mode.py")
 
-    if grouped_mistakes:
-        for source_id, data in grouped_mistakes.items():
-            with st.expander(f"**{data['name']}** ({len(data['mistakes'])} 道错题)"):
-                # ... (错题本内部逻辑保持不变)
-                for i, (question, log) in enumerate(data['mistakes']):
-                    st.markdown(f"**错题 {i+1} (ID: {question.id})**: {json.loads(question.content)['question']}")
-                    st.error(f"**你的错误答案**: {log.user_answer}")
-                    correct_answer_text = "解析失败"
-                    try:
-                        content = json.loads(question.content)
-                        answer_data = json.loads(question.answer)
-                        if question.question_type == "单项选择题": correct_answer_text = content["options"][answer_data["correct_option_index"]]
-                        elif question.question_type == "判断题": correct_answer_text = "正确" if answer_data["correct_answer"] else "错误"
-                        elif question.question_type == "填空题": correct_answer_text = ", ".join(answer_data["blanks"])
-                        elif question.question_type == "简答题": correct_answer_text = answer_data["text"]
-                    except Exception: pass
-                    st.success(f"**正确答案**: {correct_answer_text}")
-                    if question.analysis:
-                        st.info(f"**解析**: {question.analysis}")
-                    st.divider()
+        st.dataframe(mistake_summary_df.drop(columns=['source_id']), use_container_width=True, hide_index=True)
+
+        page_number = len(st.session_state.mistake_cursors)
+        for i, entry in enumerate(mistake_page):
+            index = (page_number - 1) * MISTAKE_PAGE_SIZE + i + 1
+            with st.expander(f"**错题 {index}** [{entry.source_name}] {entry.question_text[:40]}（答错 {entry.mistake_count} 次）"):
+                st.markdown(f"**题目 (ID: {entry.id})**: {entry.question_text}")
+                st.error(f"**最近一次错误答案** ({entry.last_wrong_at:%Y-%m-%d %H:%M}): {entry.last_wrong_answer}")
+                correct_answer_text = "解析失败"
+                try:
+                    correct_answer_text = entry.correct_answer_text
+                except Exception: pass
+                st.success(f"**正确答案**: {correct_answer_text}")
+                if entry.analysis:
+                    st.info(f"**解析**: {entry.analysis}")
+
+        nav_cols = st.columns([1, 2, 1])
+        nav_cols[0].button("⬅️ 上一页", disabled=page_number == 1, on_click=prev_mistake_page, use_container_width=True)
+        nav_cols[1].caption(f"第 {page_number} 页，每页 {MISTAKE_PAGE_SIZE} 道题")
+        nav_cols[2].button("下一页 ➡️", disabled=next_mistake_cursor is None, on_click=next_mistake_page, use_container_width=True)
     else:
-        st.success("太棒了！所选范围内没有发现错题。")
\ No newline at end of file
+        st.success("太棒了！所选范围内没有发现错题。")